@@ -166,6 +166,70 @@ class PythonVerificationService {
             `Make sure the Python server is running.`
         );
     }
+
+    /**
+     * Send all files of one application to Python server, verified as a single bundle
+     * @param {Array<{buffer: Buffer, filename: string}>} files - PDF form, annexures, CSVs, photos or a ZIP
+     * @returns {Promise<Object>} Verification results for the whole application
+     */
+    async verifyBundleFromFiles(files) {
+        if (!files || files.length === 0) {
+            throw new Error('At least one file is required');
+        }
+
+        let lastError = null;
+        const urls = this.primaryUrl ? [this.primaryUrl, this.fallbackUrl] : [this.fallbackUrl];
+
+        // Try primary URL first, then fallback
+        for (const serverUrl of urls) {
+            try {
+                console.log(`Attempting to send ${files.length} file(s) as a bundle to Python server: ${serverUrl}`);
+
+                const formData = new FormData();
+                for (const file of files) {
+                    formData.append('files', file.buffer, file.filename);
+                }
+
+                const response = await axios.post(
+                    `${serverUrl}/api/verify-bundle`,
+                    formData,
+                    {
+                        timeout: this.timeout,
+                        headers: {
+                            ...formData.getHeaders()
+                        }
+                    }
+                );
+
+                if (response.data.success) {
+                    console.log('Bundle verification successful');
+                    return {
+                        success: true,
+                        data: response.data.data,
+                        serverUsed: serverUrl
+                    };
+                } else {
+                    throw new Error(response.data.error || 'Verification failed');
+                }
+            } catch (error) {
+                lastError = error;
+                console.error(`Failed to connect to Python server at ${serverUrl}:`, error.message);
+
+                // If this is not the last URL, continue to next one
+                if (serverUrl !== urls[urls.length - 1]) {
+                    console.log('Trying fallback server...');
+                    continue;
+                }
+            }
+        }
+
+        // If all attempts failed, throw the last error
+        throw new Error(
+            `Failed to connect to Python verification server. ` +
+            `Last error: ${lastError?.response?.data?.error || lastError?.message || 'Unknown error'}. ` +
+            `Make sure the Python server is running.`
+        );
+    }
 }
 
 // Export singleton instance
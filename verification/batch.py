@@ -0,0 +1,174 @@
+"""Batch verification for whole application cycles.
+
+Usage:
+    python batch.py <dir|file|url> ... [--manifest list.txt] [--out results.jsonl]
+                    [--workers 4] [--no-resume]
+
+Inputs can be directories (searched recursively), single files, URLs, or
+a manifest listing one path/URL per line. Documents run concurrently on a
+bounded thread pool that shares the process-wide YOLO models, and each
+result is appended to the JSONL output as soon as it finishes. Re-running
+with the same output file skips documents that already have a result.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import itertools
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from ai import process_file
+from downloader import download
+
+BATCH_WORKERS = int(os.getenv("BATCH_WORKERS", "4"))
+SUPPORTED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.csv', '.json', '.jpg', '.jpeg', '.png'}
+
+
+def is_url(source):
+    return source.startswith(("http://", "https://"))
+
+
+def collect_inputs(sources, manifests=()):
+    """Expand directories and manifests into an ordered, de-duplicated list of inputs."""
+    items = []
+    for manifest in manifests:
+        with open(manifest, "r", encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    items.append(line)
+
+    for source in sources:
+        if is_url(source) or os.path.isfile(source):
+            items.append(source)
+        elif os.path.isdir(source):
+            for root, _, files in os.walk(source):
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in SUPPORTED_EXTENSIONS:
+                        items.append(os.path.join(root, name))
+        else:
+            print(f"⚠️ Skipping unknown input: {source}")
+
+    return list(dict.fromkeys(items))
+
+
+def completed_sources(output_path):
+    """Sources that already have a successful result line in `output_path`.
+
+    Failed documents are left out, so a re-run retries them.
+    """
+    done = set()
+    if not os.path.exists(output_path):
+        return done
+    with open(output_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+                if record.get("success"):
+                    done.add(record["source"])
+            except (ValueError, KeyError, AttributeError):
+                continue  # a line cut short by an interruption
+    return done
+
+
+def verify_one(source, process=process_file):
+    """Verify a single path or URL and return its JSONL record."""
+    t0 = time.perf_counter()
+    downloaded = None
+    try:
+        if is_url(source):
+            downloaded = download(source)
+        data = process(downloaded.source if downloaded else source)
+        record = {"source": source, "success": True, "data": data}
+    except Exception as e:
+        record = {"source": source, "success": False, "error": str(e)}
+    finally:
+        if downloaded is not None:
+            downloaded.cleanup()
+    record["seconds"] = round(time.perf_counter() - t0, 3)
+    return record
+
+
+def iter_batch_results(items, workers=BATCH_WORKERS, process=process_file):
+    """Yield one record per item as soon as it finishes (not in input order).
+
+    Only `workers` items are submitted at a time, so closing the generator
+    early (a client that disconnects) waits for those and starts no more.
+    """
+    workers = max(1, workers)
+    items = iter(items)
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify-batch") as pool:
+        pending = {pool.submit(verify_one, item, process) for item in itertools.islice(items, workers)}
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                yield future.result()
+            pending |= {pool.submit(verify_one, item, process) for item in itertools.islice(items, len(done))}
+
+
+def run_batch(items, output_path, workers=BATCH_WORKERS, resume=True, process=process_file):
+    """Verify `items`, appending results to `output_path`; returns a run summary."""
+    skipped = 0
+    if resume:
+        done = completed_sources(output_path)
+        skipped = sum(1 for item in items if item in done)
+        items = [item for item in items if item not in done]
+
+    print(f"\n📦 Batch verification: {len(items)} document(s), {workers} worker(s), {skipped} already done")
+    t0 = time.perf_counter()
+    succeeded = failed = 0
+    latencies = []
+
+    with open(output_path, "a", encoding="utf-8") as out:
+        for record in iter_batch_results(items, workers, process):
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+            out.flush()
+            latencies.append(record["seconds"])
+            if record["success"]:
+                succeeded += 1
+            else:
+                failed += 1
+                print(f"❌ {record['source']}: {record['error']}")
+
+    elapsed = time.perf_counter() - t0
+    return {
+        "documents": len(items),
+        "succeeded": succeeded,
+        "failed": failed,
+        "skipped": skipped,
+        "seconds": round(elapsed, 2),
+        "docs_per_minute": round(len(items) / elapsed * 60, 2) if elapsed > 0 else 0,
+        "avg_seconds_per_doc": round(sum(latencies) / len(latencies), 3) if latencies else 0,
+    }
+
+
+def print_summary(summary):
+    print("\n📊 BATCH SUMMARY")
+    print(f"   Documents:   {summary['documents']} ({summary['skipped']} skipped as already done)")
+    print(f"   Succeeded:   {summary['succeeded']}")
+    print(f"   Failed:      {summary['failed']}")
+    print(f"   Wall time:   {summary['seconds']}s")
+    print(f"   Throughput:  {summary['docs_per_minute']} docs/min")
+    print(f"   Avg latency: {summary['avg_seconds_per_doc']}s per document")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Verify many AICTE submissions in one run.")
+    parser.add_argument("inputs", nargs="*", help="Files, directories or URLs to verify")
+    parser.add_argument("--manifest", action="append", default=[], help="File listing one path/URL per line")
+    parser.add_argument("--out", default="batch_results.jsonl", help="JSONL file to append results to")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS, help="Documents processed concurrently")
+    parser.add_argument("--no-resume", action="store_true", help="Re-verify documents already in --out")
+    args = parser.parse_args(argv)
+
+    items = collect_inputs(args.inputs, args.manifest)
+    if not items:
+        parser.error("no inputs found")
+
+    summary = run_batch(items, args.out, workers=args.workers, resume=not args.no_resume)
+    print_summary(summary)
+    return 0 if summary["failed"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
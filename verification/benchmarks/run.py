@@ -0,0 +1,329 @@
+"""Benchmark the verification pipeline stage by stage.
+
+Usage:
+    python benchmarks/run.py [--pages 20] [--images-per-page 1] [--hindi 0.3]
+                             [--repeat 3] [--out benchmarks/results.json]
+                             [--baseline benchmarks/baseline.json] [--save-baseline]
+                             [--threshold 1.25] [--translate-latency 0] [--verbose]
+
+Everything runs offline on CPU: documents come from synthetic.py, the YOLO
+models are tiny random-weight detectors built from a yaml (stubs.py) and the
+translator is an echo stub. Where onnxruntime is installed the merged model is
+also timed on the ONNX backends, and `cold_start_*` loads it in a fresh
+interpreter per backend, recording its peak resident memory; `import_server`
+times a bare server import, which should not pull in any of them.
+`process_file_pdf_resubmitted` verifies the PDF with one page changed after
+the original has been cached page by page, `process_file_pdf_scanned` OCRs a
+PDF of page scans with a stub engine that takes OCR_LATENCY per page,
+`process_bundle` verifies a PDF form, DOCX annexure, faculty CSV and photos
+as one application (`process_bundle_file_by_file` one call per file), and
+`rescore_compare_*` compares two policies over a cycle of synthetic
+institutions with rescoring.py and one institution at a time. Each benchmark
+is run once to warm up and then `--repeat` times with caches disabled (unless
+it says otherwise); results (median/min/mean seconds) are written as JSON and
+compared with the stored baseline. The exit status is 1 if any benchmark got
+slower than `--threshold` times its baseline median.
+"""
+import io
+import os
+import sys
+import copy
+import json
+import time
+import shutil
+import argparse
+import platform
+import statistics
+import tempfile
+import subprocess
+import importlib.util
+from functools import partial
+from contextlib import redirect_stdout
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+sys.path.insert(0, BENCH_DIR)
+
+import translation  # noqa: E402
+import ocr  # noqa: E402
+from cache import LRUCache  # noqa: E402
+from synthetic import FIELDS, make_corpus, make_institutions, make_resubmission, make_scanned_pdf, make_bundle  # noqa: E402
+from stubs import make_tiny_models, make_tiny_merged_model, model_memory, StubTranslator, StubOcrEngine  # noqa: E402
+import ai  # noqa: E402
+import document_source  # noqa: E402
+import result_cache  # noqa: E402
+import rescoring  # noqa: E402
+import bundle  # noqa: E402
+from model_registry import ModelRegistry, load_model, INFERENCE_BACKENDS  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(BENCH_DIR, "results.json")
+# Institutions in the rescore_compare_* benchmarks
+RESCORE_INSTITUTIONS = 20000
+# Seconds the OCR stub takes per scanned page (Tesseract at 300 DPI is ~1s)
+OCR_LATENCY = 0.2
+
+# A fresh interpreter that loads one model and runs one image through it,
+# reporting the elapsed time and its peak resident memory
+COLD_START = """
+import sys, time, resource
+t0 = time.perf_counter()
+from PIL import Image
+from model_registry import load_model
+load_model(sys.argv[1], sys.argv[2])([Image.new("RGB", (640, 480))], verbose=False)
+try:
+    # ru_maxrss survives exec on Linux and would report the parent's peak
+    with open("/proc/self/status") as f:
+        rss = next(int(line.split()[1]) * 1024 for line in f if line.startswith("VmHWM"))
+except OSError:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024)
+print(time.perf_counter() - t0, rss, "torch" in sys.modules)
+"""
+
+
+def fresh_translation_cache():
+    # A private in-memory cache, so runs never touch TRANSLATION_CACHE_DB
+    translation._cache = LRUCache(translation.TRANSLATION_CACHE_SIZE)
+
+
+def private_result_caches():
+    # In-memory copies of the result caches, so clearing them between runs
+    # never touches RESULT_CACHE_DB
+    for name, cache in result_cache.CACHES.items():
+        private = LRUCache(cache.max_entries)
+        setattr(result_cache, name, private)
+        result_cache.CACHES[name] = private
+
+
+def measure(fn, repeat, setup=None, verbose=False):
+    """Run `fn` once to warm up and then `repeat` times; returns timing stats."""
+    seconds = []
+    for i in range(repeat + 1):
+        if setup:
+            setup()
+        out = sys.stdout if verbose else io.StringIO()
+        with redirect_stdout(out):
+            t0 = time.perf_counter()
+            fn()
+            elapsed = time.perf_counter() - t0
+        if i:
+            seconds.append(elapsed)
+    return {
+        "median": round(statistics.median(seconds), 4),
+        "min": round(min(seconds), 4),
+        "mean": round(statistics.mean(seconds), 4),
+        "runs": len(seconds),
+    }
+
+
+def import_server():
+    subprocess.run([sys.executable, "-c", "import server"], cwd=os.path.dirname(BENCH_DIR),
+                   env=dict(os.environ, PRELOAD_MODELS="false"), capture_output=True, check=True)
+
+
+def backends():
+    """Inference backends that can run here."""
+    if importlib.util.find_spec("onnxruntime") is None:
+        return ["torch"]
+    return list(INFERENCE_BACKENDS)
+
+
+def cold_start(path, backend, peak_rss):
+    out = subprocess.run([sys.executable, "-c", COLD_START, path, backend], cwd=os.path.dirname(BENCH_DIR),
+                         capture_output=True, text=True, check=True)
+    peak_rss[backend] = int(out.stdout.split()[-2])
+
+
+def with_backend(backend, fn):
+    """Run `fn` against a registry that loads models with `backend`."""
+    def run():
+        shared = ai.registry
+        ai.registry = registries.setdefault(backend, ModelRegistry(loader=partial(load_model, backend=backend)))
+        try:
+            return fn()
+        finally:
+            ai.registry = shared
+    registries = {}
+    return run
+
+
+def build_benchmarks(docs, models, merged, peak_rss):
+    """(name, fn, setup) for every stage and each document type end to end."""
+    with redirect_stdout(io.StringIO()):
+        pdf_text = ai.extract_text_from_pdf(docs["pdf"], translate=False)
+        images = ai.extract_images_from_pdf(docs["pdf"])
+        fresh_translation_cache()
+        translated = ai.translate_to_english(pdf_text)
+
+    benches = [
+        ("extract_text_from_pdf", lambda: ai.extract_text_from_pdf(docs["pdf"], translate=False), None),
+        ("extract_images_from_pdf", lambda: ai.extract_images_from_pdf(docs["pdf"]), None),
+        ("translate_pdf_text", lambda: ai.translate_to_english(pdf_text), fresh_translation_cache),
+        ("extract_institution_data", lambda: ai.extract_institution_data(translated), None),
+        ("analyze_images_aicte", lambda: ai.analyze_images_aicte(images, *models, use_cache=False), None),
+        ("analyze_images_cascade", lambda: ai.analyze_images_aicte(images, *models, use_cache=False, mode="cascade"), None),
+        ("analyze_images_merged", lambda: ai.analyze_images_aicte(images, use_cache=False, merged_model_path=merged), None),
+    ]
+    for backend in backends():
+        if backend == "torch":
+            continue  # the analyze_images_* benchmarks above
+        suffix = backend.replace("-", "_")
+        benches.append((f"analyze_images_merged_{suffix}", with_backend(backend, lambda: ai.analyze_images_aicte(
+            images, use_cache=False, merged_model_path=merged)), None))
+    benches.append(("import_server", import_server, None))
+    for backend in backends():
+        benches.append((f"cold_start_{backend.replace('-', '_')}", partial(cold_start, merged, backend, peak_rss), None))
+    for kind in ("docx", "csv", "txt"):
+        benches.append((f"extract_text_{kind}", lambda p=docs[kind]: ai.extract_text_universal(p, translate=False), None))
+    for kind, path in docs.items():
+        benches.append((f"process_file_{kind}", lambda p=path: ai.process_file(p, *models, use_cache=False), fresh_translation_cache))
+    with open(docs["pdf"], "rb") as f:
+        upload = document_source.from_bytes(f.read(), "upload.pdf")
+    benches.append(("process_file_pdf_in_memory", lambda: ai.process_file(upload, *models, use_cache=False),
+                    fresh_translation_cache))
+    resubmitted = make_resubmission(docs["pdf"], os.path.join(os.path.dirname(docs["pdf"]), "resubmitted.pdf"))
+
+    def after_original():
+        # The original is verified (and cached page by page) before each run
+        result_cache.clear()
+        fresh_translation_cache()
+        with redirect_stdout(io.StringIO()):
+            ai.process_file(docs["pdf"], *models)
+
+    benches.append(("process_file_pdf_resubmitted", lambda: ai.process_file(resubmitted, *models), after_original))
+    scanned = make_scanned_pdf(os.path.join(os.path.dirname(docs["pdf"]), "scanned.pdf"), pages=8)
+    benches.append(("process_file_pdf_scanned", lambda: ai.process_file(scanned, *models, use_cache=False),
+                    result_cache.ocr.clear))
+    files = make_bundle(os.path.join(os.path.dirname(docs["pdf"]), "bundle"))
+    benches.append(("process_bundle", lambda: bundle.process_bundle(files, *models, use_cache=False),
+                    fresh_translation_cache))
+    benches.append(("process_bundle_file_by_file", lambda: [ai.process_file(p, *models, use_cache=False) for p in files],
+                    fresh_translation_cache))
+    benches += rescoring_benchmarks(RESCORE_INSTITUTIONS)
+    return benches
+
+
+def rescoring_benchmarks(n):
+    """A what-if policy comparison over `n` institutions, vectorized and one by one."""
+    text_data, visual_data, draws = make_institutions(n, ai.AICTE_POLICY)
+    table = rescoring.InstitutionTable(text_data, visual_data, draws)
+    revised = copy.deepcopy(ai.AICTE_POLICY)
+    revised["INSTITUTE"]["FACULTY_RATIO"] -= 2
+
+    def scalar():
+        for policy in (ai.AICTE_POLICY, revised):
+            for t, v, d in zip(text_data, visual_data, draws):
+                ai.build_aicte_json(t, v, *ai.calculate_and_verify(t, v, policy, d))
+
+    return [
+        ("rescore_compare_vectorized", lambda: rescoring.compare(table, ai.AICTE_POLICY, revised), None),
+        ("rescore_compare_scalar", scalar, None),
+    ]
+
+
+def compare(results, baseline, threshold):
+    """Print a comparison table; returns the names of benchmarks that regressed."""
+    regressions = []
+    print(f"\n{'benchmark':<34}{'median':>10}{'baseline':>10}{'ratio':>8}")
+    for name, stats in results["benchmarks"].items():
+        base = baseline.get("benchmarks", {}).get(name) if baseline else None
+        if not base:
+            print(f"{name:<34}{stats['median']:>10.4f}{'-':>10}{'':>8}")
+            continue
+        ratio = stats["median"] / base["median"] if base["median"] else 1.0
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{name:<34}{stats['median']:>10.4f}{base['median']:>10.4f}{ratio:>8.2f}{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the verification pipeline.")
+    parser.add_argument("--pages", type=int, default=20, help="PDF pages (other formats scale with it)")
+    parser.add_argument("--images-per-page", type=int, default=1)
+    parser.add_argument("--hindi", type=float, default=0.3, help="Share of lines written in Hindi")
+    parser.add_argument("--repeat", type=int, default=3, help="Timed runs per benchmark")
+    parser.add_argument("--translate-latency", type=float, default=0.0, help="Seconds the translator stub sleeps per call")
+    parser.add_argument("--only", action="append", default=[], help="Run only benchmarks containing this text")
+    parser.add_argument("--out", default=DEFAULT_OUTPUT, help="Where to write the JSON results")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="Baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="Store these results as the new baseline")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio reported as a regression")
+    parser.add_argument("--verbose", action="store_true", help="Show pipeline output while timing")
+    args = parser.parse_args(argv)
+
+    params = {
+        "pages": args.pages,
+        "images_per_page": args.images_per_page,
+        "hindi": args.hindi,
+        "translate_latency": args.translate_latency,
+    }
+    workdir = tempfile.mkdtemp(prefix="verification-bench-")
+    try:
+        print(f"🧪 Generating synthetic documents in {workdir} ...")
+        docs = make_corpus(os.path.join(workdir, "docs"), args.pages, args.images_per_page, args.hindi)
+        with redirect_stdout(io.StringIO()):
+            models = make_tiny_models(os.path.join(workdir, "models"))
+            merged = make_tiny_merged_model(os.path.join(workdir, "models"))
+            memory = {"three_models": model_memory(models), "merged_model": model_memory([merged])}
+            for backend in backends()[1:]:
+                load_model(merged, backend)  # export once, outside the timings
+        translation.set_translator(StubTranslator(args.translate_latency))
+        ocr.set_engine(StubOcrEngine("\n".join(f"{label}: {value}" for label, value in FIELDS), OCR_LATENCY))
+        private_result_caches()
+
+        results = {
+            "meta": {
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "params": params,
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            },
+            "model_memory_bytes": memory,
+            "peak_rss_bytes": {},
+            "benchmarks": {},
+        }
+        print(f"🧠 Model memory: three models {memory['three_models']:,} bytes, merged {memory['merged_model']:,} bytes")
+        for name, fn, setup in build_benchmarks(docs, models, merged, results["peak_rss_bytes"]):
+            if args.only and not any(text in name for text in args.only):
+                continue
+            stats = measure(fn, args.repeat, setup, args.verbose)
+            results["benchmarks"][name] = stats
+            print(f"⏱️ {name}: median {stats['median']}s (min {stats['min']}s)")
+        for backend, rss in results["peak_rss_bytes"].items():
+            print(f"🧠 Cold start peak RSS ({backend}): {rss:,} bytes")
+    finally:
+        ocr.shutdown_pool()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+    print(f"\n✅ Results saved to {args.out}")
+
+    baseline = None
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("meta", {}).get("params") != params:
+            print("⚠️ Baseline was recorded with different parameters; ratios are not comparable")
+    regressions = compare(results, baseline, args.threshold)
+
+    if args.save_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+        print(f"📌 Baseline updated: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than {args.threshold}x baseline: {', '.join(regressions)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
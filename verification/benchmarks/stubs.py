@@ -0,0 +1,101 @@
+"""Offline stand-ins for the YOLO weights, the translation provider and Tesseract."""
+import os
+import time
+
+# A three-stride detector with ~0.2M parameters: same Detect head and
+# post-processing as the real models, a fraction of the compute. Weights are
+# random, so it exercises the inference path without needing the .pt files.
+TINY_DETECTOR = {
+    "nc": 1,
+    "scale": "t",
+    "scales": {"t": [0.33, 0.0625, 1024]},
+    "backbone": [
+        [-1, 1, "Conv", [64, 3, 2]],
+        [-1, 1, "Conv", [128, 3, 2]],
+        [-1, 1, "Conv", [256, 3, 2]],
+        [-1, 1, "Conv", [512, 3, 2]],
+        [-1, 1, "Conv", [1024, 3, 2]],
+    ],
+    "head": [[[2, 3, 4], 1, "Detect", ["nc"]]],
+}
+
+MODEL_NAMES = ("classroom_classification.pt", "library_classification.pt", "laboratory_detection.pt")
+MERGED_NAME = "aicte_scenes.pt"
+MERGED_CLASSES = {0: "Classroom", 1: "Library", 2: "Laboratory", 3: "College Building"}
+
+
+def _build(folder, nc, names=None):
+    import yaml
+    from ultralytics import YOLO
+    os.makedirs(folder, exist_ok=True)
+    cfg = os.path.join(folder, f"tiny{nc}.yaml")
+    with open(cfg, "w") as f:
+        yaml.safe_dump(dict(TINY_DETECTOR, nc=nc), f)
+    model = YOLO(cfg)
+    if names:
+        model.model.names = names
+    return model
+
+
+def make_tiny_models(folder):
+    """Build the tiny detector from its yaml and save it under the real model names."""
+    paths = [os.path.join(folder, name) for name in MODEL_NAMES]
+    if not all(os.path.exists(p) for p in paths):
+        model = _build(folder, 1)
+        for path in paths:
+            model.save(path)
+    return paths
+
+
+def make_tiny_merged_model(folder):
+    """The same tiny network with one head for all four scene classes."""
+    path = os.path.join(folder, MERGED_NAME)
+    if not os.path.exists(path):
+        _build(folder, len(MERGED_CLASSES), MERGED_CLASSES).save(path)
+    return path
+
+
+def model_memory(paths):
+    """Parameter and buffer bytes of the given models once loaded."""
+    from ultralytics import YOLO
+    total = 0
+    for path in paths:
+        net = YOLO(path).model
+        total += sum(t.numel() * t.element_size() for t in list(net.parameters()) + list(net.buffers()))
+    return total
+
+
+class StubTranslator:
+    """Echoes its input, optionally sleeping to mimic a provider round trip."""
+
+    max_chars = 4500
+
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.calls = 0
+
+    def translate(self, text):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return text
+
+
+class StubOcrEngine:
+    """Reads every page as the same text, optionally sleeping like a real OCR pass.
+
+    Picklable, so it also runs in the OCR process pool.
+    """
+
+    name = "stub-ocr"
+
+    def __init__(self, text, latency=0.0):
+        self.text = text
+        self.latency = latency
+        self.calls = 0
+
+    def recognize(self, png):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        return self.text
@@ -0,0 +1,231 @@
+"""Synthetic AICTE submissions for benchmarking.
+
+Documents look like real submissions: an institution details section with
+the labels extract_institution_data looks for, a key/value table, filler
+paragraphs, and embedded campus-sized photos. `hindi` sets the share of
+lines written in Devanagari so the translation path gets exercised.
+make_scanned_pdf has no text layer at all, for the OCR fallback,
+make_bundle splits one application over several files, and
+make_institutions generates extracted details for rescoring a whole cycle.
+"""
+import io
+import os
+import csv
+import random
+import numpy as np
+from PIL import Image
+
+FIELDS = [
+    ("Name of the Institution", "Synthetic Institute of Technology"),
+    ("Principal", "Dr. R. K. Sharma"),
+    ("Corpus Fund", "Rs. 75,00,000"),
+    ("Total Students", "1200"),
+    ("Total Faculty", "60"),
+    ("Total Computers", "300"),
+    ("Admin Area", "5200 sq ft"),
+]
+
+ENGLISH_WORDS = (
+    "the institution maintains classrooms laboratories library hostel campus faculty students "
+    "department curriculum examination infrastructure approval committee report annual"
+).split()
+HINDI_WORDS = (
+    "संस्थान कक्षा प्रयोगशाला पुस्तकालय छात्रावास परिसर संकाय छात्र विभाग पाठ्यक्रम परीक्षा "
+    "बुनियादी ढांचा अनुमोदन समिति वार्षिक रिपोर्ट"
+).split()
+
+
+def sentence(rng, hindi):
+    words = HINDI_WORDS if rng.random() < hindi else ENGLISH_WORDS
+    return " ".join(rng.choice(words) for _ in range(rng.randint(8, 16))).capitalize() + "."
+
+
+def lines(rng, count, hindi):
+    return [sentence(rng, hindi) for _ in range(count)]
+
+
+def photo(rng, width=800, height=600):
+    """A distinct, photo-sized image (gradient plus noise, so no two are identical)."""
+    y, x = np.mgrid[0:height, 0:width]
+    base = np.stack([
+        (x * rng.uniform(0.1, 0.4)) % 256,
+        (y * rng.uniform(0.1, 0.4)) % 256,
+        ((x + y) * rng.uniform(0.05, 0.2)) % 256,
+    ], axis=-1)
+    noise = np.random.default_rng(rng.randrange(2 ** 32)).integers(0, 40, base.shape)
+    return Image.fromarray(np.clip(base + noise, 0, 255).astype("uint8"))
+
+
+def photo_bytes(rng, fmt="JPEG"):
+    buf = io.BytesIO()
+    photo(rng).save(buf, format=fmt, quality=85)
+    return buf.getvalue()
+
+
+def make_pdf(path, pages=10, images_per_page=1, hindi=0.3, lines_per_page=30, seed=0, fields=FIELDS):
+    import fitz
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        body = lines(rng, lines_per_page, hindi)
+        if n == 0:
+            body = [f"{label}: {value}" for label, value in fields] + body
+        # insert_htmlbox shapes non-Latin scripts with fallback fonts
+        page.insert_htmlbox(fitz.Rect(40, 40, 555, 560), "<br>".join(body), css="* {font-size: 8px;}")
+        for i in range(images_per_page):
+            top = 570 + i * 60 % 200
+            page.insert_image(fitz.Rect(40 + i * 90 % 450, top, 120 + i * 90 % 450, top + 60), stream=photo_bytes(rng))
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_resubmission(path, out_path, page=1, seed=1):
+    """`path` with a correction on one page and a photo added to it, saved as a new file."""
+    import fitz
+    doc = fitz.open(path)
+    doc[page].insert_text((50, 780), "Corrected: Total Faculty: 40")
+    doc[page].insert_image(fitz.Rect(300, 700, 400, 780), stream=photo_bytes(random.Random(seed)))
+    doc.save(out_path)
+    doc.close()
+    return out_path
+
+
+def make_scanned_pdf(path, pages=3, seed=0):
+    """A PDF of page scans: each page is one full-page image with no text layer."""
+    import fitz
+    from PIL import ImageDraw
+    rng = random.Random(seed)
+    doc = fitz.open()
+    for n in range(pages):
+        body = lines(rng, 30, 0)
+        if n == 0:
+            body = [f"{label}: {value}" for label, value in FIELDS] + body
+        scan = Image.new("L", (1240, 1754), 255)  # A4 at 150 DPI
+        draw = ImageDraw.Draw(scan)
+        for i, line in enumerate(body):
+            draw.text((80, 80 + i * 30), line, fill=0)
+        buf = io.BytesIO()
+        scan.save(buf, format="PNG")
+        page = doc.new_page()
+        page.insert_image(page.rect, stream=buf.getvalue())
+    doc.save(path)
+    doc.close()
+    return path
+
+
+def make_docx(path, paragraphs=200, images=10, hindi=0.3, seed=0):
+    from docx import Document
+    from docx.shared import Inches
+    rng = random.Random(seed)
+    doc = Document()
+    table = doc.add_table(rows=len(FIELDS), cols=2)
+    for row, (label, value) in zip(table.rows, FIELDS):
+        row.cells[0].text = label
+        row.cells[1].text = value
+    for i, text in enumerate(lines(rng, paragraphs, hindi)):
+        doc.add_paragraph(text)
+        if images and i % max(1, paragraphs // images) == 0 and i // max(1, paragraphs // images) < images:
+            doc.add_picture(io.BytesIO(photo_bytes(rng)), width=Inches(2))
+    doc.save(path)
+    return path
+
+
+def make_csv(path, rows=2000, hindi=0.3, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerows([label, value] for label, value in FIELDS)
+        for i in range(rows):
+            writer.writerow([f"Item {i}", sentence(rng, hindi), rng.randint(1, 500)])
+    return path
+
+
+def make_txt(path, lines_count=2000, hindi=0.3, seed=0):
+    rng = random.Random(seed)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("\n".join([f"{label}: {value}" for label, value in FIELDS] + lines(rng, lines_count, hindi)))
+    return path
+
+
+def make_corpus(folder, pages=10, images_per_page=1, hindi=0.3, seed=0):
+    """Write one document of each type into `folder`; returns {kind: path}."""
+    os.makedirs(folder, exist_ok=True)
+    return {
+        "pdf": make_pdf(os.path.join(folder, "report.pdf"), pages, images_per_page, hindi, seed=seed),
+        "docx": make_docx(os.path.join(folder, "report.docx"), pages * 20, pages * images_per_page, hindi, seed=seed),
+        "csv": make_csv(os.path.join(folder, "report.csv"), pages * 100, hindi, seed=seed),
+        "txt": make_txt(os.path.join(folder, "report.txt"), pages * 100, hindi, seed=seed),
+    }
+
+
+def make_bundle(folder, pages=4, photos=3, seed=0):
+    """One application split over several files, the way institutions send it:
+    a PDF form, a DOCX annexure, a CSV of faculty and JPG campus photos.
+
+    Each field is in one file only, except the name, which the annexure
+    repeats differently. Returns the file paths, form first.
+    """
+    from docx import Document
+    from docx.shared import Inches
+    os.makedirs(folder, exist_ok=True)
+    rng = random.Random(seed)
+    fields = dict(FIELDS)
+    # Name, head, corpus and students are on the form; the rest are in the annexures
+    form = make_pdf(os.path.join(folder, "form.pdf"), pages, 1, 0, seed=seed, fields=FIELDS[:4])
+
+    annexure = Document()
+    table = annexure.add_table(rows=3, cols=2)
+    rows = [("Name of the Institution", "Synthetic Institute (Annexure)"),
+            ("Total Computers", fields["Total Computers"]), ("Admin Area", fields["Admin Area"])]
+    for row, (label, value) in zip(table.rows, rows):
+        row.cells[0].text = label
+        row.cells[1].text = value
+    for text in lines(rng, 20, 0):
+        annexure.add_paragraph(text)
+    annexure.add_picture(io.BytesIO(photo_bytes(rng)), width=Inches(2))
+    annexure_path = os.path.join(folder, "annexure.docx")
+    annexure.save(annexure_path)
+
+    faculty_path = os.path.join(folder, "faculty.csv")
+    with open(faculty_path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["Name", "Designation", "Department"])
+        for i in range(int(fields["Total Faculty"])):
+            writer.writerow([f"Faculty {i}", rng.choice(["Professor", "Lecturer"]), rng.choice(ENGLISH_WORDS)])
+        writer.writerow(["Total Faculty", fields["Total Faculty"], ""])
+
+    photo_paths = []
+    for i in range(photos):
+        photo_paths.append(os.path.join(folder, f"campus_{i + 1}.jpg"))
+        with open(photo_paths[-1], "wb") as f:
+            f.write(photo_bytes(rng))
+    return [form, annexure_path, faculty_path] + photo_paths
+
+
+def make_institutions(n, policy, seed=0):
+    """(text_data, visual_data, draws) for `n` institutions around `policy`'s norms,
+    including the edge cases of each check (no faculty, exactly at the norm)."""
+    rng = random.Random(seed)
+    scenes = ["Classroom", "Library", "Laboratory", "College Building"]
+    text_data, visual_data = [], []
+    for i in range(n):
+        category = rng.choice(sorted(policy))
+        rules = policy[category]
+        faculty = rng.choice([0, 1, rng.randint(1, 400)])
+        text_data.append({
+            "name": f"Institution {i}" + (" University" if category == "UNIVERSITY" else ""),
+            "category": category,
+            "head_title": rules["HEAD_TITLE"],
+            "head_name": "Dr. Test",
+            "corpus_fund": rng.choice([0, rules["CORPUS_FUND_MIN"], rng.randint(0, 2 * rules["CORPUS_FUND_MIN"])]),
+            "students": rng.choice([0, faculty * rules["FACULTY_RATIO"], rng.randint(0, 8000)]),
+            "faculty": faculty,
+            "admin_area": rng.choice([0, rules["MIN_ADMIN_AREA"], rng.randint(0, 2000)]),
+            "computers": rng.choice([0, rng.randint(1, 500)]),
+        })
+        visual_data.append([{"type": t, "confidence": f"{rng.uniform(40, 99):.2f}%"}
+                            for t in rng.sample(scenes, rng.randint(0, 4))])
+    draws = [(rng.random(), rng.random()) for _ in range(n)]
+    return text_data, visual_data, draws
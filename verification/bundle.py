@@ -0,0 +1,310 @@
+import os
+import sys
+import copy
+import json
+import time
+import zipfile
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+import ai
+import metrics
+import result_cache
+import document_source
+from cache import content_hash
+from document_source import as_source, opened
+from image_extraction import iter_images
+from pdf_extraction import extract_pdf
+from table_extraction import tables_from_blocks
+from translation import start_translation_stats
+from result_cache import stage_key, policy_fingerprint, image_fingerprint
+
+# ==========================================================
+# MULTI-FILE APPLICATION BUNDLES
+# ==========================================================
+# An application usually comes as several files: the PDF form, DOCX
+# annexures, a CSV of faculty and JPG campus photos. A bundle (a ZIP, a
+# list of files, or both) is verified as one application. All files are
+# extracted and translated at the same time, and each institution field is
+# taken from the highest-priority file that has it. The images of every
+# file go through YOLO together, so the models run on full batches once
+# per bundle, and the result is a single build_aicte_json result.
+
+# Fields come from the first of these file types that has them
+BUNDLE_SOURCE_PRIORITY = [ext.strip() for ext in os.getenv("BUNDLE_SOURCE_PRIORITY", "pdf,docx,csv,json,txt").split(",")
+                          if ext.strip()]
+# Files of one bundle extracted at once
+BUNDLE_WORKERS = int(os.getenv("BUNDLE_WORKERS", "4"))
+# What a bundle may unpack to (guards against zip bombs)
+BUNDLE_MAX_FILES = int(os.getenv("BUNDLE_MAX_FILES", "50"))
+BUNDLE_MAX_BYTES = int(os.getenv("BUNDLE_MAX_BYTES", str(200 * 1024 * 1024)))
+
+SUPPORTED_EXTENSIONS = {"pdf", "docx", "txt", "csv", "json", "jpg", "jpeg", "png"}
+IMAGE_EXTENSIONS = {"jpg", "jpeg", "png"}
+# Result keys filled by each extracted field (see field_extraction)
+FIELD_KEYS = {"name": ("name", "category"), "head": ("head_title", "head_name")}
+
+
+class BundleError(ValueError):
+    """The bundle has no usable files, is too large, or is not a valid ZIP."""
+
+
+def _wanted(name):
+    base = os.path.basename(name)
+    if name.startswith("__MACOSX/") or base.startswith("."):
+        return False
+    if base.lower().split(".")[-1] not in SUPPORTED_EXTENSIONS:
+        print(f"⚠️ Skipping unsupported file in bundle: {name}")
+        return False
+    return True
+
+
+def unpack_zip(source):
+    """DocumentSources for the supported files in a ZIP (a path or DocumentSource).
+
+    Members are named by their path inside the archive. Sizes are checked
+    against the limits before anything is decompressed.
+    """
+    with opened(source) as source, source.open() as stream:
+        try:
+            archive = zipfile.ZipFile(stream)
+        except zipfile.BadZipFile as e:
+            raise BundleError(f"Not a valid ZIP file: {source.name}") from e
+        with archive:
+            members = [info for info in archive.infolist() if not info.is_dir() and _wanted(info.filename)]
+            if len(members) > BUNDLE_MAX_FILES:
+                raise BundleError(f"Bundle has {len(members)} files; at most {BUNDLE_MAX_FILES} are allowed")
+            size = sum(info.file_size for info in members)
+            if size > BUNDLE_MAX_BYTES:
+                raise BundleError(f"Bundle unpacks to {size:,} bytes; at most {BUNDLE_MAX_BYTES:,} are allowed")
+            files = []
+            try:
+                for info in members:
+                    with archive.open(info) as member:
+                        files.append(document_source.from_stream(member, info.filename))
+            except Exception:
+                for f in files:
+                    f.close()
+                raise
+    return files
+
+
+def _priority(ext):
+    if ext in BUNDLE_SOURCE_PRIORITY:
+        return BUNDLE_SOURCE_PRIORITY.index(ext)
+    return len(BUNDLE_SOURCE_PRIORITY)  # images, or types left out of the list
+
+
+def read_file(source, doc_hash, use_cache=True):
+    """Translated text, page lines, tables and images of one file of a bundle.
+
+    Uses the same per-document (and, for PDFs, per-page) caches as
+    process_file, so files shared with earlier submissions aren't read again.
+    "images" is a lazy iterable: pages reused from the cache give ImageRefs,
+    and other files are only decoded when detection reaches them.
+    """
+    ext = source.ext
+    doc = {"name": source.name, "type": ext, "text": "", "page_lines": None, "tables": [], "images": [],
+           "ocr_pending": 0, "fields": []}
+    if ext == "pdf" and use_cache and ai.PDF_INCREMENTAL:
+        pdf = ai.read_pdf_pages(source)
+        doc.update(text=pdf["text"], page_lines=pdf["page_lines"], tables=pdf["tables"], images=pdf["images"],
+                   ocr_pending=pdf["ocr_pending"])
+        return doc
+    if ext == "pdf":
+        with metrics.stage("extract"):
+            pdf = extract_pdf(source, want_images=False, want_tables=True)
+        with metrics.stage("translate"):
+            doc.update(text=ai.translate_to_english(pdf["text"]), tables=ai.translate_tables(pdf["tables"]))
+        doc.update(page_lines=ai.pdf_page_lines(pdf["pages"]), images=iter_images(source), ocr_pending=pdf["ocr_pending"])
+        return doc
+
+    if ext not in IMAGE_EXTENSIONS:
+        text = tables = None
+        if use_cache:
+            text = result_cache.translated_text.get(doc_hash)
+            tables = result_cache.tables.get(doc_hash)
+        if text is None or tables is None:
+            with metrics.stage("extract"):
+                blocks = ai.extract_text_universal(source, translate=False)
+            with metrics.stage("translate"):
+                text = ai.translate_to_english("\n".join(b.get("text", "") for b in blocks))
+                tables = ai.translate_tables(tables_from_blocks(blocks))
+            if use_cache:
+                result_cache.translated_text.set(doc_hash, text)
+                result_cache.tables.set(doc_hash, tables)
+        doc.update(text=text, tables=tables)
+    doc["images"] = iter_images(source)
+    return doc
+
+
+def _unique_images(documents):
+    """The images of every file in turn, decoded one at a time as detection
+    asks for them; a photo sent twice is analysed once. Counts each file's
+    images in its "image_count"."""
+    seen = set()
+    for doc in documents:
+        doc["image_count"] = 0
+        for img in doc["images"]:
+            fingerprint = image_fingerprint(img)
+            if fingerprint not in seen:
+                seen.add(fingerprint)
+                doc["image_count"] += 1
+                yield img
+
+
+def merge_fields(documents):
+    """Institution details taken field by field from the first of `documents`
+    (in priority order) that has each field.
+
+    "sources" records where each field came from, including the file name,
+    and each document's "fields" lists the fields taken from it.
+    """
+    merged = ai.extract_institution_data("")
+    merged["sources"] = {}
+    for doc in documents:
+        if doc["type"] in IMAGE_EXTENSIONS:
+            continue
+        data = ai.extract_institution_data(doc["text"], doc["page_lines"], doc["tables"])
+        for field, source in data["sources"].items():
+            if field in merged["sources"]:
+                continue
+            for key in FIELD_KEYS.get(field, (field,)):
+                merged[key] = data[key]
+            merged["sources"][field] = dict(source, file=doc["name"])
+            doc["fields"].append(field)
+    return merged
+
+
+def process_bundle(files, classroom_model=None, library_model=None, lab_model=None, progress=None, use_cache=True, detection_mode=None, scoring_mode=None):
+    """Verify several files (paths or DocumentSources; ZIPs are unpacked) as one application.
+
+    Takes the same options as ai.process_file and returns its JSON for the
+    whole bundle, plus "bundle": the files read, the images each one gave
+    and the fields taken from it. Raises BundleError for an unusable bundle.
+    """
+    t0 = time.perf_counter()
+    outcome = "error"
+    sources, owned = [], []  # owned: sources made here, closed at the end
+    try:
+        for f in files:
+            source = as_source(f)
+            if source is not f:
+                owned.append(source)
+            if source.ext == "zip":
+                members = unpack_zip(source)
+                owned.extend(members)
+                sources.extend(members)
+            elif _wanted(source.name):
+                sources.append(source)
+        if not sources:
+            raise BundleError("No supported files in the bundle")
+        if len(sources) > BUNDLE_MAX_FILES:
+            raise BundleError(f"Bundle has {len(sources)} files; at most {BUNDLE_MAX_FILES} are allowed")
+        final_json, outcome = _process_bundle(sources, classroom_model, library_model, lab_model,
+                                              progress or (lambda stage: None), use_cache,
+                                              detection_mode or ai.DETECTION_MODE, scoring_mode or ai.SCORING_MODE)
+        return final_json
+    finally:
+        for source in owned:
+            source.close()
+        metrics.BUNDLES.inc(result=outcome)
+        metrics.BUNDLE_SECONDS.observe(time.perf_counter() - t0, result=outcome)
+
+
+def _process_bundle(sources, classroom_model, library_model, lab_model, report, use_cache, detection_mode, scoring_mode):
+    """process_bundle's pipeline; returns (final_json, "processed" or "cached")."""
+    print(f"\n📦 Processing bundle of {len(sources)} file(s)")
+    start_translation_stats()
+
+    with metrics.stage("hash"):
+        hashes = {id(s): content_hash(s.buffer()) for s in sources}
+        # Named files in a fixed order, so the upload order doesn't matter
+        sources = sorted(sources, key=lambda s: (_priority(s.ext), s.name, hashes[id(s)]))
+        bundle_hash = content_hash(json.dumps([[s.name, hashes[id(s)]] for s in sources]).encode())
+        models_fp = ai.models_key(classroom_model, library_model, lab_model, detection_mode, scoring_mode)
+    rng = ai.scoring_rng(scoring_mode, bundle_hash)
+    draws = (rng.random(), rng.random())
+    result_key = stage_key(bundle_hash, models_fp, policy_fingerprint(ai.AICTE_POLICY, ai.POLICY_VERSION))
+    if use_cache:
+        cached = result_cache.results.get(result_key)
+        if cached is not None:
+            print("⚡ Returning cached bundle verification result")
+            return copy.deepcopy(cached), "cached"
+    metrics.FILES_PER_BUNDLE.observe(len(sources))
+
+    report("extract")
+    print(f"📝 Extracting {len(sources)} file(s) concurrently...")
+    with ThreadPoolExecutor(max_workers=max(1, min(BUNDLE_WORKERS, len(sources)))) as pool:
+        # Each file runs in a copy of this context, so stats and traces land in this request's
+        futures = [pool.submit(contextvars.copy_context().run, read_file, s, hashes[id(s)], use_cache)
+                   for s in sources]
+        documents = [f.result() for f in futures]
+
+    print("🏫 Merging institution data...")
+    with metrics.stage("fields"):
+        text_data = merge_fields(documents)
+
+    report("detect")
+    print("🔍 Analyzing the images of every file with YOLO models...")
+    with metrics.stage("detect"):
+        images = metrics.timed_iter(_unique_images(documents), "image_extract")
+        required = ai.AICTE_POLICY[text_data["category"]]["REQUIRED_IMAGES"]
+        visual_data = ai.analyze_images_aicte(images, classroom_model, library_model, lab_model, use_cache=use_cache,
+                                              mode=detection_mode, required=required, rng=rng)
+    metrics.IMAGES_PER_DOCUMENT.observe(len(visual_data))
+
+    report("score")
+    with metrics.stage("score"):
+        scores, red_flags = ai.calculate_and_verify(text_data, visual_data, draws=draws)
+
+    with metrics.stage("build"):
+        final_json = ai.build_aicte_json(text_data, visual_data, scores, red_flags)
+        final_json["bundle"] = {
+            "files": [
+                {
+                    "name": doc["name"],
+                    "type": doc["type"],
+                    "images": doc["image_count"],
+                    "fields": doc["fields"],
+                }
+                for doc in documents
+            ]
+        }
+
+    # A scan that couldn't be OCR'd gets another go next time
+    if use_cache and not any(doc["ocr_pending"] for doc in documents):
+        result_cache.results.set(result_key, copy.deepcopy(final_json))
+
+    return final_json, "processed"
+
+
+# ==========================================================
+# RUN
+# ==========================================================
+
+if __name__ == "__main__":
+    # Usage: python bundle.py <file|bundle.zip> ... [--out output.json]
+    args = sys.argv[1:]
+    output_path = "aicte_output.json"
+    if "--out" in args:
+        i = args.index("--out")
+        output_path = args[i + 1]
+        del args[i:i + 2]
+    if not args:
+        print("Usage: python bundle.py <file|bundle.zip> ... [--out output.json]")
+        sys.exit(1)
+
+    missing = [path for path in args if not os.path.exists(path)]
+    if missing:
+        print("❌ File not found:", ", ".join(missing))
+        sys.exit(1)
+
+    output = process_bundle(args)
+
+    print("\n📦 FINAL AICTE VALIDATION JSON:")
+    print(json.dumps(output, indent=4, ensure_ascii=False))
+
+    with open(output_path, "w", encoding="utf-8") as f:
+        json.dump(output, f, indent=4, ensure_ascii=False)
+
+    print(f"\n✅ JSON saved as {output_path}")
@@ -0,0 +1,149 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+
+# ==========================================================
+# SHARED CACHE PRIMITIVES
+# ==========================================================
+
+
+def content_hash(data):
+    """SHA-256 hex digest of a str or bytes value."""
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    return hashlib.sha256(data).hexdigest()
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """SHA-256 hex digest of a file's bytes, read in chunks."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class SqliteStore:
+    """Tiny persistent key/value store; values are stored as JSON.
+
+    With `max_entries`, the oldest writes are dropped once the table grows
+    past that size.
+    """
+
+    def __init__(self, path, table="cache", max_entries=None):
+        self.path = path
+        self.table = table
+        self.max_entries = max_entries
+        folder = os.path.dirname(os.path.abspath(path))
+        os.makedirs(folder, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._lock:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            self._conn.commit()
+
+    def get(self, key):
+        with self._lock:
+            row = self._conn.execute(f"SELECT value FROM {self.table} WHERE key = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _trim(self):
+        if self.max_entries:
+            # INSERT OR REPLACE gives rewritten keys a fresh rowid, so low rowids are the stalest
+            self._conn.execute(
+                f"DELETE FROM {self.table} WHERE rowid <= (SELECT MAX(rowid) FROM {self.table}) - ?",
+                (self.max_entries,),
+            )
+
+    def set(self, key, value):
+        with self._lock:
+            self._conn.execute(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                (key, json.dumps(value, ensure_ascii=False)),
+            )
+            self._trim()
+            self._conn.commit()
+
+    def set_many(self, items):
+        with self._lock:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {self.table} (key, value) VALUES (?, ?)",
+                [(k, json.dumps(v, ensure_ascii=False)) for k, v in items],
+            )
+            self._trim()
+            self._conn.commit()
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+class LRUCache:
+    """Thread-safe in-memory LRU, optionally backed by a persistent store."""
+
+    def __init__(self, max_entries=10000, store=None):
+        self.max_entries = max_entries
+        self.store = store
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _put(self, key, value):
+        self._data[key] = value
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+
+        value = self.store.get(key) if self.store is not None else None
+        with self._lock:
+            if value is None:
+                self.misses += 1
+                return default
+            self.hits += 1
+            self._put(key, value)
+        return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._put(key, value)
+        if self.store is not None:
+            self.store.set(key, value)
+
+    def set_many(self, items):
+        items = list(items)
+        with self._lock:
+            for key, value in items:
+                self._put(key, value)
+        if self.store is not None:
+            self.store.set_many(items)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+        if self.store is not None:
+            self.store.clear()
+
+    def stats(self):
+        return {"entries": len(self._data), "hits": self.hits, "misses": self.misses, "evictions": self.evictions}
+
+    def __len__(self):
+        return len(self._data)
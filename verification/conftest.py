@@ -0,0 +1,23 @@
+"""Shared fixtures: stand-in YOLO models served by a private registry"""
+import pytest
+import ai
+from model_registry import ModelRegistry
+
+MODEL_FILES = ("classroom.pt", "library.pt", "lab.pt")
+
+
+@pytest.fixture
+def fake_models(tmp_path, monkeypatch):
+    """Call with a loader (path -> detector) to serve every model through it.
+
+    Writes placeholder weight files (the three category models unless
+    `names` says otherwise) and returns their paths.
+    """
+    def install(loader, names=MODEL_FILES):
+        monkeypatch.setattr(ai, "registry", ModelRegistry(loader=loader))
+        paths = []
+        for name in names:
+            (tmp_path / name).write_bytes(b"weights")
+            paths.append(str(tmp_path / name))
+        return paths
+    return install
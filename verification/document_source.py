@@ -0,0 +1,237 @@
+import io
+import os
+import mmap
+import tempfile
+from contextlib import contextmanager
+
+# ==========================================================
+# IN-MEMORY DOCUMENT SOURCES
+# ==========================================================
+# Uploads and downloads are held in memory and handed to the extractors
+# as bytes (PyMuPDF reads a stream, pdfplumber, python-docx and zipfile
+# read a file-like object). Only a document larger than DOCUMENT_SPILL_BYTES
+# is written to disk, to a private temporary file of its own that is
+# memory-mapped for reading and removed when the source is closed. Files
+# that already live on disk (the CLI, the download cache) are mapped in
+# place and never copied, and so are uploads werkzeug has spooled already
+# (see from_upload).
+
+DOCUMENT_SPILL_BYTES = int(os.getenv("DOCUMENT_SPILL_BYTES", str(16 * 1024 * 1024)))
+CHUNK_SIZE = 64 * 1024
+
+
+class DocumentSource:
+    """A document's bytes plus the name its format is taken from.
+
+    `path` is set when the bytes live on disk. Sources pickle to the path
+    (or the bytes), so a page range can be sent to a worker process.
+    """
+
+    def __init__(self, name, data=None, path=None, temporary=False, upload=None):
+        self.name = name
+        self.path = path
+        self.temporary = temporary  # `path` is our own spill file
+        self._data = data
+        self._upload = upload  # an upload spooled to an unnamed temporary file, owned by werkzeug
+        self._file = None
+        self._map = None
+
+    @classmethod
+    def from_path(cls, path):
+        return cls(os.path.basename(path), path=path)
+
+    @property
+    def ext(self):
+        return self.name.lower().split(".")[-1]
+
+    @property
+    def size(self):
+        if self._data is not None:
+            return len(self._data)
+        if self._upload is not None:
+            return os.fstat(self._upload.fileno()).st_size
+        return os.path.getsize(self.path)
+
+    def buffer(self):
+        """The document's bytes: the in-memory copy, or a read-only map of the file."""
+        if self._data is not None:
+            return self._data
+        if self._map is None:
+            if self._upload is None:
+                self._file = open(self.path, "rb")
+            fileno = (self._upload or self._file).fileno()
+            if os.fstat(fileno).st_size == 0:
+                return b""  # empty files can't be mapped
+            self._map = mmap.mmap(fileno, 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)
+
+    def read(self):
+        """The document as bytes (read from the file for on-disk sources)."""
+        if self._data is not None:
+            return self._data
+        if self._upload is not None:
+            return bytes(self.buffer())
+        with open(self.path, "rb") as f:
+            return f.read()
+
+    def open(self):
+        """A binary file-like object over the document, for pdfplumber/python-docx/zipfile."""
+        if self._data is not None:
+            return io.BytesIO(self._data)
+        if self._upload is not None:
+            return io.BufferedReader(_ViewReader(self.buffer()))
+        return open(self.path, "rb")
+
+    def close(self):
+        """Release the mapping and remove our own spill file, if any."""
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a reader still holds a view; the mapping goes with it
+            self._map = None
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+        if self.temporary and self.path and os.path.exists(self.path):
+            os.remove(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __getstate__(self):
+        # Workers read the caller's copy; only the caller removes spill files.
+        # An upload's temporary file has no name, so workers get its bytes.
+        data = bytes(self.buffer()) if self._upload is not None else self._data
+        return {"name": self.name, "data": data, "path": self.path}
+
+    def __setstate__(self, state):
+        self.__init__(state["name"], state["data"], state["path"])
+
+    def __repr__(self):
+        where = self.path or f"{self.size:,} bytes {'in memory' if self._data is not None else 'spooled'}"
+        return f"<DocumentSource {self.name}: {where}>"
+
+
+class _ViewReader(io.RawIOBase):
+    """A seekable reader over a buffer, with a file position of its own."""
+
+    def __init__(self, view):
+        self._view = memoryview(view)
+        self._pos = 0
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self._pos
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self._pos, io.SEEK_END: len(self._view)}[whence]
+        self._pos = max(0, base + offset)
+        return self._pos
+
+    def readinto(self, b):
+        chunk = self._view[self._pos:self._pos + len(b)]
+        b[:len(chunk)] = chunk
+        self._pos += len(chunk)
+        return len(chunk)
+
+    def close(self):
+        self._view.release()  # so the source can close its map
+        super().close()
+
+
+class SpoolWriter:
+    """Collects a document written in chunks, in memory up to `spill_bytes`
+    and in a private temporary file beyond that."""
+
+    def __init__(self, name, spill_bytes=None):
+        self.name = name
+        self.spill_bytes = DOCUMENT_SPILL_BYTES if spill_bytes is None else spill_bytes
+        self.size = 0
+        self._buffer = io.BytesIO()
+        self._file = None
+
+    def write(self, chunk):
+        self.size += len(chunk)
+        if self._file is None and self.size > self.spill_bytes:
+            suffix = os.path.splitext(self.name)[1]
+            self._file = tempfile.NamedTemporaryFile(prefix="verification-", suffix=suffix, delete=False)
+            self._file.write(self._buffer.getbuffer())
+            self._buffer = None
+        (self._buffer if self._file is None else self._file).write(chunk)
+
+    def source(self):
+        """Finish writing and return the DocumentSource (which owns any spill file)."""
+        if self._file is None:
+            return DocumentSource(self.name, data=self._buffer.getvalue())
+        self._file.close()
+        return DocumentSource(self.name, path=self._file.name, temporary=True)
+
+    def discard(self):
+        if self._file is not None:
+            self._file.close()
+            os.remove(self._file.name)
+
+
+def from_stream(stream, name, spill_bytes=None):
+    """Read a file-like object (e.g. an upload) into a DocumentSource."""
+    writer = SpoolWriter(name, spill_bytes)
+    try:
+        for chunk in iter(lambda: stream.read(CHUNK_SIZE), b""):
+            writer.write(chunk)
+    except Exception:
+        writer.discard()
+        raise
+    return writer.source()
+
+
+def from_upload(stream, name):
+    """A DocumentSource over an upload werkzeug has spooled to a
+    SpooledTemporaryFile (see server.VerificationRequest), without copying
+    it again: the spool's own bytes while it is in memory, a map of its
+    temporary file once it has rolled to disk. Other streams, and spools
+    whose internals aren't the ones checked for here, are read with
+    from_stream.
+
+    The source must be closed before the request (and so the spool) ends.
+    """
+    # SpooledTemporaryFile has no public way to ask whether it has rolled
+    # over, or for its in-memory bytes; calling fileno() would force a copy
+    # to disk. Both internals are checked before use.
+    rolled = getattr(stream, "_rolled", None) if isinstance(stream, tempfile.SpooledTemporaryFile) else None
+    if rolled is True:
+        stream.flush()
+        return DocumentSource(name, upload=stream)  # mapped through stream.fileno()
+    memory = getattr(stream, "_file", None)
+    if rolled is False and isinstance(memory, io.BytesIO):
+        return DocumentSource(name, data=memory.getvalue())  # BytesIO shares its bytes
+    return from_stream(stream, name)
+
+
+def from_bytes(data, name):
+    return DocumentSource(name, data=bytes(data))
+
+
+def as_source(doc):
+    """A DocumentSource for `doc`, which is one already or a path on disk."""
+    return doc if isinstance(doc, DocumentSource) else DocumentSource.from_path(doc)
+
+
+@contextmanager
+def opened(doc):
+    """as_source(doc) for a `with` block: a source made here from a path is
+    closed at the end, one passed in by the caller is left open."""
+    source = as_source(doc)
+    try:
+        yield source
+    finally:
+        if source is not doc:
+            source.close()
@@ -0,0 +1,334 @@
+import io
+import os
+import json
+import time
+import tempfile
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from urllib3.exceptions import ReadTimeoutError
+from cache import content_hash
+from document_source import DocumentSource, SpoolWriter
+import metrics
+
+# ==========================================================
+# POOLED, STREAMING DOCUMENT DOWNLOADER
+# ==========================================================
+# One keep-alive Session is shared by every request in the process, bodies
+# are streamed in chunks with a hard size cap, and documents are kept in a
+# local cache so repeat downloads become conditional requests (ETag /
+# Last-Modified) answered with 304. Documents that can't be cached stay in
+# memory unless they are large (see document_source). Every download is
+# cached under a name of its own and pruning skips files that are in use,
+# so a file another request is still reading is never replaced or removed.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DOWNLOAD_MAX_BYTES = int(os.getenv("DOWNLOAD_MAX_BYTES", str(100 * 1024 * 1024)))
+DOWNLOAD_CACHE_DIR = os.getenv("DOWNLOAD_CACHE_DIR", os.path.join(SCRIPT_DIR, "cache", "downloads"))
+DOWNLOAD_CACHE_MAX_FILES = int(os.getenv("DOWNLOAD_CACHE_MAX_FILES", "200"))  # 0 disables the cache
+# Cached files used this recently are never pruned; another server process may be reading them
+DOWNLOAD_CACHE_MIN_AGE = int(os.getenv("DOWNLOAD_CACHE_MIN_AGE", "600"))
+DOWNLOAD_RETRIES = int(os.getenv("DOWNLOAD_RETRIES", "3"))
+CONNECT_TIMEOUT = 5
+READ_TIMEOUT = 30
+CHUNK_SIZE = 64 * 1024
+
+CONTENT_TYPE_EXTENSIONS = {
+    "application/pdf": ".pdf",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document": ".docx",
+    "text/plain": ".txt",
+    "text/csv": ".csv",
+    "application/json": ".json",
+    "image/jpeg": ".jpg",
+    "image/png": ".png",
+}
+
+
+class DownloadTooLargeError(Exception):
+    """Raised when a document is bigger than DOWNLOAD_MAX_BYTES."""
+
+
+def _make_session():
+    retry = Retry(
+        total=DOWNLOAD_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=[429, 500, 502, 503, 504],
+        allowed_methods=["GET", "HEAD"],
+        respect_retry_after_header=True,
+    )
+    adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32, max_retries=retry)
+    session = requests.Session()
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    return session
+
+
+_session = _make_session()
+_cache_lock = threading.Lock()
+_in_use = {}  # cached path -> Downloads of it still open in this process
+
+
+def get_session():
+    return _session
+
+
+class Download:
+    """A downloaded document; `source` is what process_file reads.
+
+    `path` is the cached copy on disk, or None for a document held in
+    memory. `cleanup()` never removes the cached copy, it only lets it be
+    pruned again.
+    """
+
+    def __init__(self, url, source, temporary, from_cache=False):
+        self.url = url
+        self.source = source
+        self.temporary = temporary
+        self.from_cache = from_cache
+        self._released = temporary
+
+    @property
+    def path(self):
+        return self.source.path
+
+    def cleanup(self):
+        self.source.close()
+        if not self._released:
+            self._released = True
+            _release(self.path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.cleanup()
+
+
+def _extension(url, response=None):
+    ext = os.path.splitext(url.split("?")[0].split("#")[0])[1].lower()
+    if ext in CONTENT_TYPE_EXTENSIONS.values() or ext == ".jpeg":
+        return ext
+    if response is not None:
+        content_type = response.headers.get("Content-Type", "").split(";")[0].strip()
+        if content_type in CONTENT_TYPE_EXTENSIONS:
+            return CONTENT_TYPE_EXTENSIONS[content_type]
+    return ".pdf"
+
+
+def _check_length(response, max_bytes):
+    length = response.headers.get("Content-Length")
+    if length and length.isdigit() and int(length) > max_bytes:
+        raise DownloadTooLargeError(f"Document is {int(length):,} bytes; limit is {max_bytes:,}")
+
+
+def _stream_to(response, out, max_bytes):
+    received = 0
+    for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+        received += len(chunk)
+        if received > max_bytes:
+            raise DownloadTooLargeError(f"Document exceeds the {max_bytes:,} byte limit")
+        out.write(chunk)
+    return received
+
+
+def _is_read_error(e):
+    if isinstance(e, requests.exceptions.ChunkedEncodingError):
+        return True
+    # iter_content reports a read timeout in the middle of the body as a ConnectionError
+    return (isinstance(e, requests.exceptions.ConnectionError) and bool(e.args)
+            and isinstance(e.args[0], ReadTimeoutError))
+
+
+def _with_retries(fn):
+    """Retry body-read failures that happen after the response has started.
+
+    Connection failures are left to the session's Retry, which has already
+    retried them by the time they get here.
+    """
+    for attempt in range(DOWNLOAD_RETRIES + 1):
+        try:
+            return fn()
+        except requests.exceptions.RequestException as e:
+            if attempt == DOWNLOAD_RETRIES or not _is_read_error(e):
+                raise
+            time.sleep(0.5 * 2 ** attempt)
+
+
+def _cache_paths(url):
+    key = content_hash(url)[:32]
+    return os.path.join(DOWNLOAD_CACHE_DIR, key + ".json"), key
+
+
+def _read_meta(meta_path):
+    try:
+        with open(meta_path, "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        return meta if os.path.exists(meta["path"]) else None
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def _acquire(path):
+    """Mark a cached file in use; False if it has been pruned. Call under _cache_lock."""
+    try:
+        os.utime(path)  # seen by the pruning of other processes
+    except FileNotFoundError:
+        return False
+    except OSError:
+        pass
+    _in_use[path] = _in_use.get(path, 0) + 1
+    return True
+
+
+def _release(path):
+    with _cache_lock:
+        if _in_use.get(path, 0) > 1:
+            _in_use[path] -= 1
+        else:
+            _in_use.pop(path, None)
+
+
+def _try_remove(path):
+    """Remove a cached file unless it is in use; False if it has to stay."""
+    try:
+        if path in _in_use or time.time() - os.path.getmtime(path) < DOWNLOAD_CACHE_MIN_AGE:
+            return False
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+    except PermissionError:
+        return False  # open in another process (Windows)
+    return True
+
+
+def _prune_cache():
+    """Drop the least recently used entries beyond DOWNLOAD_CACHE_MAX_FILES and
+    copies superseded by a newer download of the same URL. Call under _cache_lock."""
+    names = os.listdir(DOWNLOAD_CACHE_DIR)
+    metas = sorted((os.path.join(DOWNLOAD_CACHE_DIR, n) for n in names if n.endswith(".json")), key=_mtime)
+    excess = len(metas) - DOWNLOAD_CACHE_MAX_FILES
+    current = set()
+    for meta_path in metas:
+        meta = _read_meta(meta_path)
+        if meta is None or (excess > 0 and _try_remove(meta["path"])):
+            excess -= 1
+            try:
+                os.remove(meta_path)
+            except OSError:
+                pass
+        else:
+            current.add(os.path.basename(meta["path"]))
+    for name in names:
+        if not name.endswith((".json", ".part")) and name not in current:
+            _try_remove(os.path.join(DOWNLOAD_CACHE_DIR, name))
+
+
+def _mtime(path):
+    try:
+        return os.path.getmtime(path)
+    except OSError:
+        return 0
+
+
+def download(url, max_bytes=None, use_cache=True):
+    """Download `url` and return a Download.
+
+    With the local cache enabled, a previously seen URL is revalidated with
+    If-None-Match / If-Modified-Since and reused on 304 without a body.
+    """
+    max_bytes = max_bytes or DOWNLOAD_MAX_BYTES
+    use_cache = use_cache and DOWNLOAD_CACHE_MAX_FILES > 0
+    meta_path, key = _cache_paths(url)
+    meta = None
+    if use_cache:
+        with _cache_lock:
+            meta = _read_meta(meta_path)
+            if meta and not _acquire(meta["path"]):
+                meta = None
+    pinned = [meta["path"]] if meta else []  # released unless a 304 hands it to the Download
+
+    headers = {}
+    if meta:
+        if meta.get("etag"):
+            headers["If-None-Match"] = meta["etag"]
+        if meta.get("last_modified"):
+            headers["If-Modified-Since"] = meta["last_modified"]
+
+    def attempt():
+        with _session.get(url, headers=headers, stream=True, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+            if response.status_code == 304 and meta:
+                print(f"⚡ Document unchanged since last download: {url}")
+                try:
+                    os.utime(meta_path)
+                except OSError:
+                    pass
+                pinned.clear()
+                return Download(url, DocumentSource.from_path(meta["path"]), temporary=False, from_cache=True)
+
+            response.raise_for_status()
+            _check_length(response, max_bytes)
+            ext = _extension(url, response)
+            cacheable = use_cache and (response.headers.get("ETag") or response.headers.get("Last-Modified"))
+            if not cacheable:
+                spool = SpoolWriter("download" + ext)
+                try:
+                    size = _stream_to(response, spool, max_bytes)
+                except Exception:
+                    spool.discard()
+                    raise
+                print(f"📥 Downloaded {size:,} bytes from {url}")
+                return Download(url, spool.source(), temporary=True)
+
+            os.makedirs(DOWNLOAD_CACHE_DIR, exist_ok=True)
+            with tempfile.NamedTemporaryFile(delete=False, prefix=key + "-", suffix=ext + ".part",
+                                             dir=DOWNLOAD_CACHE_DIR) as temp_file:
+                try:
+                    size = _stream_to(response, temp_file, max_bytes)
+                except Exception:
+                    temp_file.close()
+                    os.remove(temp_file.name)
+                    raise
+            print(f"📥 Downloaded {size:,} bytes from {url}")
+
+            # A name of its own, so no reader of an earlier copy is disturbed
+            final_path = os.path.join(DOWNLOAD_CACHE_DIR, os.path.basename(temp_file.name)[:-len(".part")])
+            os.replace(temp_file.name, final_path)
+            with _cache_lock:
+                _acquire(final_path)
+                try:
+                    with open(meta_path, "w", encoding="utf-8") as f:
+                        json.dump({
+                            "url": url,
+                            "path": final_path,
+                            "etag": response.headers.get("ETag"),
+                            "last_modified": response.headers.get("Last-Modified"),
+                            "size": size,
+                        }, f)
+                    _prune_cache()
+                except PermissionError as e:
+                    print(f"⚠️ Download cache not updated: {e}")
+            return Download(url, DocumentSource.from_path(final_path), temporary=False)
+
+    try:
+        with metrics.stage("download"):
+            return _with_retries(attempt)
+    finally:
+        for path in pinned:
+            _release(path)
+
+
+def download_bytes(url, max_bytes=None):
+    """Stream `url` into memory (respecting the size cap) and return its bytes."""
+    max_bytes = max_bytes or DOWNLOAD_MAX_BYTES
+
+    def attempt():
+        with _session.get(url, stream=True, timeout=(CONNECT_TIMEOUT, READ_TIMEOUT)) as response:
+            response.raise_for_status()
+            _check_length(response, max_bytes)
+            buffer = io.BytesIO()
+            _stream_to(response, buffer, max_bytes)
+            return buffer.getvalue()
+
+    with metrics.stage("download"):
+        return _with_retries(attempt)
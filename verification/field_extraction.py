@@ -0,0 +1,156 @@
+import re
+from bisect import bisect_right
+
+# ==========================================================
+# SINGLE-PASS INSTITUTION FIELD EXTRACTION
+# ==========================================================
+# All field labels are found with one precompiled alternation that scans
+# the document once. Each hit is parsed from a short, bounded window after
+# the label instead of with open-ended `.*` spans, so the cost stays
+# linear in the document size. Every value records where it came from.
+
+# How far past a label we look for its value
+VALUE_WINDOW = 300
+
+# Label alternatives, highest priority first within each field
+LABELS = re.compile(
+    r"(?P<name_of>Name of (?:the )?(?:Institution|University))"
+    r"|(?P<institution_name>Institution Name)"
+    r"|(?P<vc>Vice\s*Chancellor|\bVC\b)"
+    r"|(?P<principal>Principal|Director)"
+    r"|(?P<corpus>Corpus|Fund)"
+    r"|(?P<students>(?:Total|Enrolled)\s+Students)"
+    r"|(?P<faculty>(?:Total|Regular)\s+Faculty)"
+    r"|(?P<computers>Total\s+(?:Computers|PCs))"
+    r"|(?P<admin_area>(?:Administrative|Admin)\s+Area)"
+    r"|(?P<name>Name)",
+    re.I,
+)
+
+# Which field each label fills, and its priority (lower wins)
+LABEL_FIELDS = {
+    "name_of": ("name", 0),
+    "institution_name": ("name", 1),
+    "name": ("name", 2),
+    "vc": ("head", 0),
+    "principal": ("head", 1),
+    "corpus": ("corpus_fund", 0),
+    "students": ("students", 0),
+    "faculty": ("faculty", 0),
+    "computers": ("computers", 0),
+    "admin_area": ("admin_area", 0),
+}
+
+# DOCX table rows arrive as "Label | Value", so "|" counts as a separator
+NAME_VALUE = re.compile(r"\s*[:\-|]?\s*(.+)")
+HEAD_VALUE = re.compile(r"[:\t |]+([A-Za-z \t\.]+)")
+HEAD_NEXT_LINE = re.compile(r"[ \t]*([A-Za-z \t\.]+)")
+MONEY_VALUE = re.compile(r"(?:₹|Rs\.?|INR)\s*(\d[\d,]*)", re.I)
+NUMBER_VALUE = re.compile(r"\d+")
+# Nothing but separators between a label and the end of its line
+EMPTY_REST = re.compile(r"[\s:\-|]*$")
+
+HEAD_TITLES = {0: "Vice Chancellor", 1: "Principal"}
+# Fields for which a text label beats a table cell found with a label of
+# the same priority (a table's neighbouring cell is the weaker evidence)
+TEXT_WINS_TIES = ("name",)
+NUMERIC_FIELDS = ("students", "faculty", "computers", "admin_area")
+
+
+def _line_window(text, start):
+    """The rest of the line starting at `start` plus, if that is empty, the next line."""
+    end = text.find("\n", start, start + VALUE_WINDOW)
+    if end == -1:
+        return text[start:start + VALUE_WINDOW]
+    rest = text[start:end]
+    if EMPTY_REST.match(rest):
+        # Label alone on its line (table cell layout); the value is on the next line
+        next_end = text.find("\n", end + 1, end + 1 + VALUE_WINDOW)
+        return text[start:next_end if next_end != -1 else end + 1 + VALUE_WINDOW]
+    return rest
+
+
+def _parse(field, text, end):
+    """Parse the value that follows a label ending at `end`, or None."""
+    if field == "name":
+        m = NAME_VALUE.match(text, end, end + VALUE_WINDOW)
+        return m.group(1).strip() if m and m.group(1).strip() else None
+    window = _line_window(text, end)
+    if field == "head":
+        # The name is on the label's line, or on the next one when the label
+        # stands alone (table cell layout) and that line isn't another label
+        rest, _, next_line = window.partition("\n")
+        m = HEAD_VALUE.match(rest)
+        if m is None and next_line and not LABELS.match(next_line.strip()):
+            m = HEAD_NEXT_LINE.match(next_line)
+        return m.group(1).strip() if m and m.group(1).strip() else None
+    if field == "corpus_fund":
+        m = MONEY_VALUE.search(window)
+        return int(m.group(1).replace(",", "")) if m else None
+    m = NUMBER_VALUE.search(window)
+    return int(m.group(0)) if m else None
+
+
+def _settled(field, entry, priority):
+    """Whether `entry` (priority, value, source) for `field` stands against a
+    text match with a label of `priority`."""
+    if field in TEXT_WINS_TIES and isinstance(entry[2], dict):
+        return entry[0] < priority
+    return entry[0] <= priority
+
+
+def _done(best, preferred):
+    return len(best) == len(preferred) and all(_settled(f, best[f], p) for f, p in preferred.items())
+
+
+def extract_fields(text, page_lines=None, seed=None):
+    """Extract institution details from translated text in one pass.
+
+    `page_lines`, if given, lists the line number each page starts on so
+    values can be traced back to a page. `seed` holds values already read
+    from tables ({field: (priority, value, source)}, see table_extraction);
+    the text is only scanned for fields it lacks or could improve on.
+    Returns the same fields as before plus "sources": {field: {...}}.
+    """
+    best = dict(seed or {})  # field -> (priority, value, offset or source)
+    preferred = {field: 0 for field, _ in LABEL_FIELDS.values()}
+
+    # Nothing left to look for when the tables already supplied every field
+    matches = () if _done(best, preferred) else LABELS.finditer(text)
+    for m in matches:
+        field, priority = LABEL_FIELDS[m.lastgroup]
+        current = best.get(field)
+        if current is not None and _settled(field, current, priority):
+            continue
+        value = _parse(field, text, m.end())
+        if value is not None:
+            best[field] = (priority, value, m.start())
+            if _done(best, preferred):
+                break  # every field found with its preferred label
+
+    data = {}
+    data["name"] = best["name"][1] if "name" in best else "Unknown Institution"
+    data["category"] = "UNIVERSITY" if "UNIVERSITY" in data["name"].upper() else "INSTITUTE"
+
+    if "head" in best:
+        data["head_title"] = HEAD_TITLES[best["head"][0]]
+        data["head_name"] = best["head"][1]
+    else:
+        data["head_title"] = "Not Found"
+        data["head_name"] = "N/A"
+
+    data["corpus_fund"] = best["corpus_fund"][1] if "corpus_fund" in best else 0
+    for key in NUMERIC_FIELDS:
+        data[key] = best[key][1] if key in best else 0
+
+    sources = {}
+    for field, (_, _, offset) in best.items():
+        if isinstance(offset, dict):
+            sources[field] = offset  # found in a table
+            continue
+        line = text.count("\n", 0, offset)
+        page = bisect_right(page_lines, line) if page_lines else None
+        sources[field] = {"offset": offset, "line": line + 1, "page": page}
+    data["sources"] = sources
+
+    return data
@@ -0,0 +1,79 @@
+"""Production serving for the verification server (Linux/macOS).
+
+Usage:
+    gunicorn -c gunicorn.conf.py server:app
+
+The app and the YOLO models are loaded once in the master process and the
+workers are forked from it, so model weights are shared copy-on-write
+instead of being loaded per worker. Each worker gets an equal share of the
+cores for torch/OpenMP so workers don't oversubscribe the machine.
+
+Environment:
+    PORT             port to bind (default 5000)
+    WEB_WORKERS      worker processes (default: half the cores, at least 1)
+    WEB_THREADS      request threads per worker (default 4)
+    TORCH_THREADS    torch/OpenMP threads per worker (default: cores / workers)
+    GRACEFUL_TIMEOUT seconds in-flight verifications get to finish on shutdown
+"""
+import gc
+import os
+import sys
+
+CPUS = os.cpu_count() or 1
+WEB_WORKERS = int(os.getenv("WEB_WORKERS", str(max(1, CPUS // 2))))
+WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+TORCH_THREADS = int(os.getenv("TORCH_THREADS", str(max(1, CPUS // WEB_WORKERS))))
+
+# These must be set before torch/numpy are imported, i.e. before the app is
+# preloaded. Explicit settings in the environment win.
+for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+    os.environ.setdefault(var, str(TORCH_THREADS))
+os.environ.setdefault("PDF_WORKERS", str(TORCH_THREADS))
+os.environ.setdefault("PRELOAD_MODELS", "true")
+# One request runs at a time per thread; queue briefly beyond that
+os.environ.setdefault("VERIFY_CONCURRENCY", str(WEB_THREADS))
+
+bind = f"0.0.0.0:{os.getenv('PORT', '5000')}"
+workers = WEB_WORKERS
+worker_class = "gthread"
+threads = WEB_THREADS
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "120"))
+keepalive = 5
+# Recycle workers now and then to cap memory growth from fragmentation
+max_requests = int(os.getenv("MAX_REQUESTS", "1000"))
+max_requests_jitter = 100
+accesslog = "-"
+
+
+def when_ready(server):
+    # Models are loaded by now; keep the preloaded heap out of the GC's
+    # reach so collections in the workers don't copy the shared pages
+    gc.freeze()
+    server.log.info("Verification server ready: %s workers x %s threads, %s torch threads each",
+                    WEB_WORKERS, WEB_THREADS, TORCH_THREADS)
+
+
+def post_fork(server, worker):
+    torch = sys.modules.get("torch")
+    if torch is None:
+        return  # ONNX backend: ONNX Runtime reads OMP_NUM_THREADS itself
+    torch.set_num_threads(TORCH_THREADS)
+    try:
+        torch.set_num_interop_threads(1)
+    except RuntimeError:
+        pass  # already fixed by the parent
+
+
+def post_worker_init(worker):
+    # Every new worker (including one replacing a recycled worker) takes over
+    # the queued jobs of workers that have exited; each job goes to one worker
+    import server
+    if server.RESUME_JOBS:
+        server.get_job_queue()
+
+
+def worker_exit(server, worker):
+    import server as app_module
+    app_module.shutdown()
@@ -0,0 +1,199 @@
+import io
+import os
+import zipfile
+from PIL import Image
+from cache import content_hash
+from document_source import as_source, opened
+
+# ==========================================================
+# STREAMING IMAGE EXTRACTION
+# ==========================================================
+# Images are yielded one at a time instead of being collected up front.
+# Icons, signatures and repeated letterheads are dropped before decoding
+# where possible, and every image is downsampled to the model's input
+# size while it is decoded.
+
+# Images with a shorter side below this (in pixels) are logos/icons
+IMAGE_MIN_SIDE = int(os.getenv("IMAGE_MIN_SIDE", "100"))
+# Very wide or tall strips are signatures, rules and banners
+IMAGE_MAX_ASPECT = float(os.getenv("IMAGE_MAX_ASPECT", "5"))
+# Upper bound on the images analysed per document (0 = no limit)
+IMAGE_MAX_PER_DOC = int(os.getenv("IMAGE_MAX_PER_DOC", "60"))
+# YOLO input size; nothing larger is ever kept in memory
+MODEL_INPUT_SIZE = int(os.getenv("MODEL_INPUT_SIZE", "640"))
+
+
+class ImageFilter:
+    """Per-document size, duplicate and count limits for extracted images."""
+
+    def __init__(self, min_side=IMAGE_MIN_SIDE, max_aspect=IMAGE_MAX_ASPECT, max_images=IMAGE_MAX_PER_DOC):
+        self.min_side = min_side
+        self.max_aspect = max_aspect
+        self.max_images = max_images
+        self.seen_xrefs = set()
+        self.seen_hashes = set()
+        self.accepted = 0
+        self.skipped = {"small": 0, "duplicate": 0, "limit": 0}
+
+    def full(self):
+        return bool(self.max_images) and self.accepted >= self.max_images
+
+    def wanted_size(self, width, height):
+        if min(width, height) < self.min_side:
+            self.skipped["small"] += 1
+            return False
+        if max(width, height) / max(1, min(width, height)) > self.max_aspect:
+            self.skipped["small"] += 1
+            return False
+        return True
+
+    def new_xref(self, xref):
+        if xref in self.seen_xrefs:
+            self.skipped["duplicate"] += 1
+            return False
+        self.seen_xrefs.add(xref)
+        return True
+
+    def new_content(self, digest):
+        if digest in self.seen_hashes:
+            self.skipped["duplicate"] += 1
+            return False
+        self.seen_hashes.add(digest)
+        return True
+
+    def accept(self):
+        if self.full():
+            self.skipped["limit"] += 1
+            return False
+        self.accepted += 1
+        return True
+
+
+def decode_image(data, max_side=MODEL_INPUT_SIZE):
+    """Decode image bytes to RGB, shrinking to `max_side` as early as possible."""
+    img = Image.open(io.BytesIO(data))
+    if max_side:
+        # JPEGs can be decoded directly at a reduced scale
+        img.draft("RGB", (max_side, max_side))
+    img = img.convert("RGB")
+    if max_side and max(img.size) > max_side:
+        img.thumbnail((max_side, max_side))
+    return img
+
+
+def open_pdf(source):
+    """PyMuPDF document read straight from a DocumentSource's bytes."""
+    import fitz
+    return fitz.open(stream=source.buffer(), filetype="pdf")
+
+
+class ImageRef:
+    """An image on a PDF page, known by the content hash of its encoded bytes.
+
+    It is only decoded when image() is called, so images whose detections
+    are already cached (see result_cache) never leave the PDF again.
+    """
+
+    def __init__(self, digest, source, page_num, image=None, max_side=MODEL_INPUT_SIZE):
+        self.digest = digest
+        self.source = source
+        self.page_num = page_num
+        self.max_side = max_side
+        self._image = image
+
+    @property
+    def fingerprint(self):
+        return f"{self.digest}@{self.max_side}"
+
+    def image(self):
+        if self._image is None:
+            with open_pdf(self.source) as doc:
+                for img in doc[self.page_num].get_images(full=True):
+                    data = doc.extract_image(img[0])["image"]
+                    if content_hash(data) == self.digest:
+                        self._image = decode_image(data, self.max_side)
+                        break
+                else:
+                    raise LookupError(f"Image {self.digest[:12]} not found on page {self.page_num + 1}")
+        return self._image
+
+
+def iter_pdf_page_images(doc, page_num, image_filter, max_side=MODEL_INPUT_SIZE):
+    """Yield (content hash, image) for the wanted images on one PyMuPDF page."""
+    for img in doc[page_num].get_images(full=True):
+        if image_filter.full():
+            image_filter.skipped["limit"] += 1
+            continue
+        xref, width, height = img[0], img[2], img[3]
+        if not image_filter.new_xref(xref) or not image_filter.wanted_size(width, height):
+            continue
+        data = doc.extract_image(xref)["image"]
+        digest = content_hash(data)
+        if not image_filter.new_content(digest):
+            continue
+        try:
+            decoded = decode_image(data, max_side)
+        except Exception as e:
+            print(f"PDF image extraction error on page {page_num + 1}:", e)
+            continue
+        if image_filter.accept():
+            yield digest, decoded
+
+
+def iter_pdf_images(path, image_filter=None, max_side=MODEL_INPUT_SIZE):
+    image_filter = image_filter or ImageFilter()
+    try:
+        with opened(path) as source, open_pdf(source) as doc:
+            for page_num in range(doc.page_count):
+                if image_filter.full():
+                    break
+                for _, img in iter_pdf_page_images(doc, page_num, image_filter, max_side):
+                    yield img
+    except Exception as e:
+        print("PDF image extraction error:", e)
+
+
+def iter_docx_images(path, image_filter=None, max_side=MODEL_INPUT_SIZE):
+    image_filter = image_filter or ImageFilter()
+    try:
+        with opened(path) as source, source.open() as stream, zipfile.ZipFile(stream, "r") as docx_zip:
+            for file in docx_zip.namelist():
+                if image_filter.full():
+                    break
+                if not (file.startswith("word/media/") and file.lower().endswith((".png", ".jpg", ".jpeg"))):
+                    continue
+                data = docx_zip.read(file)
+                if not image_filter.new_content(content_hash(data)):
+                    continue
+                try:
+                    # Reading the size only parses the header
+                    if not image_filter.wanted_size(*Image.open(io.BytesIO(data)).size):
+                        continue
+                    decoded = decode_image(data, max_side)
+                except Exception as e:
+                    print("DOCX image extraction error:", e)
+                    continue
+                if image_filter.accept():
+                    yield decoded
+    except Exception as e:
+        print("DOCX image extraction error:", e)
+
+
+def iter_image_file(path, max_side=MODEL_INPUT_SIZE):
+    try:
+        with opened(path) as source:
+            data = source.read()
+        yield decode_image(data, max_side)
+    except Exception:
+        return
+
+
+def iter_images(path, image_filter=None, max_side=MODEL_INPUT_SIZE):
+    """Lazily yield the analysable images of any supported document (a path or DocumentSource)."""
+    ext = as_source(path).ext
+
+    if ext == "pdf": return iter_pdf_images(path, image_filter, max_side)
+    if ext == "docx": return iter_docx_images(path, image_filter, max_side)
+    if ext in ["jpg", "jpeg", "png"]: return iter_image_file(path, max_side)
+
+    return iter([])  # TXT / CSV / JSON → no images inside
@@ -0,0 +1,80 @@
+import os
+from PIL import Image
+import metrics
+from image_extraction import ImageRef
+
+# ==========================================================
+# IN-MEMORY BATCHED YOLO INFERENCE
+# ==========================================================
+
+# Number of images sent through a model in one forward pass
+YOLO_BATCH_SIZE = int(os.getenv("YOLO_BATCH_SIZE", "16"))
+
+
+def to_model_input(img):
+    """Convert a PIL image, RGB NumPy array or ImageRef to what ultralytics expects."""
+    import numpy as np
+    if isinstance(img, ImageRef):
+        img = img.image()
+    if isinstance(img, Image.Image):
+        return img if img.mode == "RGB" else img.convert("RGB")
+    if isinstance(img, np.ndarray):
+        if img.ndim == 2:
+            img = np.stack([img] * 3, axis=-1)
+        # Ultralytics reads raw arrays as BGR (OpenCV order)
+        return np.ascontiguousarray(img[..., :3][..., ::-1])
+    raise TypeError(f"Unsupported image type: {type(img).__name__}")
+
+
+def iter_batches(items, batch_size):
+    for start in range(0, len(items), batch_size):
+        yield items[start:start + batch_size]
+
+
+def iter_chunks(iterable, size):
+    """Group any iterable (including generators) into lists of `size`."""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def iter_results(model, images, batch_size=None):
+    """Run `model` over `images` in batches, yielding one result per image."""
+    batch_size = max(1, batch_size or YOLO_BATCH_SIZE)
+    inputs = [to_model_input(img) for img in images]
+
+    name = os.path.basename(getattr(model, "path", "") or type(model).__name__)
+    for batch in iter_batches(inputs, batch_size):
+        with metrics.stage(f"yolo:{name}", metrics.YOLO_SECONDS, model=name):
+            results = model(batch, verbose=False)
+        yield from results
+
+
+def predict_max_confidences(model, images, batch_size=None):
+    """Run `model` over `images` in batches and return the best box confidence per image."""
+    return [
+        max([float(b.conf[0]) for b in result.boxes], default=0)
+        for result in iter_results(model, images, batch_size)
+    ]
+
+
+def predict_class_confidences(model, images, class_ids, batch_size=None):
+    """Best box confidence per image for each class in `class_ids` (None -> always 0).
+
+    One forward pass of a multi-class model gives every class's score.
+    """
+    slots = {cls: slot for slot, cls in enumerate(class_ids) if cls is not None}
+    confidences = []
+    for result in iter_results(model, images, batch_size):
+        best = [0.0] * len(class_ids)
+        for b in result.boxes:
+            slot = slots.get(int(b.cls[0]))
+            if slot is not None:
+                best[slot] = max(best[slot], float(b.conf[0]))
+        confidences.append(best)
+    return confidences
@@ -0,0 +1,249 @@
+import os
+import json
+import time
+import uuid
+import sqlite3
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from downloader import download
+
+# ==========================================================
+# ASYNCHRONOUS VERIFICATION JOBS
+# ==========================================================
+# Clients submit a document (upload or URL) and get a job ID back straight
+# away. Jobs run on a bounded worker pool; their status, current stage and
+# result are kept in a local SQLite store so they survive a restart. Each
+# job records the process that owns it, so when a server process exits
+# (a restart, or gunicorn recycling a worker) the next one to start picks
+# up its unfinished jobs.
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+JOB_DIR = os.getenv("JOB_DIR", os.path.join(SCRIPT_DIR, "jobs"))
+JOB_STORE_PATH = os.getenv("JOB_STORE_PATH", os.path.join(JOB_DIR, "jobs.db"))
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Jobs allowed to wait or run at once before new submissions are refused
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", "20"))
+CALLBACK_TIMEOUT = 10
+
+STAGES = ["queued", "download", "extract", "translate", "detect", "score", "done"]
+
+
+class QueueFullError(Exception):
+    """Raised when the job queue is at capacity."""
+
+
+class JobStore:
+    """SQLite-backed record of every job and its result."""
+
+    def __init__(self, path=JOB_STORE_PATH):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        with self._lock:
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    stage TEXT NOT NULL,
+                    source_url TEXT,
+                    input_path TEXT,
+                    filename TEXT,
+                    callback_url TEXT,
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    owner INTEGER
+                )
+            """)
+            columns = {row["name"] for row in self._conn.execute("PRAGMA table_info(jobs)")}
+            if "owner" not in columns:
+                self._conn.execute("ALTER TABLE jobs ADD COLUMN owner INTEGER")
+            self._conn.commit()
+
+    def create(self, source_url=None, input_path=None, filename=None, callback_url=None):
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO jobs (id, status, stage, source_url, input_path, filename, callback_url, created_at, updated_at, owner) "
+                "VALUES (?, 'queued', 'queued', ?, ?, ?, ?, ?, ?, ?)",
+                (job_id, source_url, input_path, filename, callback_url, now, now, os.getpid()),
+            )
+            self._conn.commit()
+        return job_id
+
+    def update(self, job_id, **fields):
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        fields["updated_at"] = time.time()
+        columns = ", ".join(f"{k} = ?" for k in fields)
+        with self._lock:
+            self._conn.execute(f"UPDATE jobs SET {columns} WHERE id = ?", (*fields.values(), job_id))
+            self._conn.commit()
+
+    def get(self, job_id):
+        with self._lock:
+            row = self._conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = dict(row)
+        job["result"] = json.loads(job["result"]) if job["result"] else None
+        return job
+
+    def unfinished(self):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [r["id"] for r in rows]
+
+    def orphaned(self):
+        """Unfinished jobs whose owning process has exited, as (id, owner)."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, owner FROM jobs WHERE status IN ('queued', 'running') ORDER BY created_at"
+            ).fetchall()
+        return [(r["id"], r["owner"]) for r in rows if not _alive(r["owner"])]
+
+    def claim(self, job_id, owner):
+        """Take over a job from `owner`; False if another process got to it first."""
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE jobs SET owner = ?, status = 'queued', stage = 'queued', updated_at = ? "
+                "WHERE id = ? AND owner IS ?",
+                (os.getpid(), time.time(), job_id, owner),
+            )
+            self._conn.commit()
+        return cursor.rowcount == 1
+
+
+def _alive(pid):
+    """Whether `pid` is another running process (our own queue starts out empty)."""
+    if pid is None or pid == os.getpid():
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class JobQueue:
+    """Bounded pool that runs `process` over submitted jobs."""
+
+    def __init__(self, process, store=None, workers=JOB_WORKERS, limit=JOB_QUEUE_LIMIT):
+        self.process = process
+        self.store = store or JobStore()
+        self.limit = limit
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="verify-job")
+        self._active = 0
+        self._lock = threading.Lock()
+
+    def pending(self):
+        return self._active
+
+    def submit(self, source_url=None, input_path=None, filename=None, callback_url=None):
+        """Queue a job and return its ID; raises QueueFullError when at capacity."""
+        with self._lock:
+            if self._active >= self.limit:
+                raise QueueFullError(f"Job queue is full ({self.limit} jobs pending)")
+            self._active += 1
+        job_id = self.store.create(source_url, input_path, filename, callback_url)
+        self._executor.submit(self._run, job_id)
+        return job_id
+
+    def resume(self):
+        """Re-queue unfinished jobs whose server process has exited.
+
+        Every process may call this when it starts; each job is claimed by
+        exactly one of them.
+        """
+        resumed = 0
+        for job_id, owner in self.store.orphaned():
+            if not self.store.claim(job_id, owner):
+                continue
+            job = self.store.get(job_id)
+            if job["input_path"] and not os.path.exists(job["input_path"]):
+                self.store.update(job_id, status="failed", error="Input lost during restart")
+                continue
+            with self._lock:
+                self._active += 1
+            self._executor.submit(self._run, job_id)
+            resumed += 1
+        if resumed:
+            print(f"♻️ Resumed {resumed} unfinished job(s)")
+        return resumed
+
+    def _run(self, job_id):
+        job = self.store.get(job_id)
+        document = job["input_path"]
+        downloaded = None
+        try:
+            self.store.update(job_id, status="running")
+            if not document:
+                self.store.update(job_id, stage="download")
+                downloaded = download(job["source_url"])
+                document = downloaded.source
+
+            def progress(stage):
+                self.store.update(job_id, stage=stage)
+
+            result = self.process(document, progress=progress)
+            self.store.update(job_id, status="done", stage="done", result=result)
+            print(f"✅ Job {job_id} completed")
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {str(e)}")
+            self.store.update(job_id, status="failed", error=str(e))
+        finally:
+            with self._lock:
+                self._active -= 1
+            if downloaded is not None:
+                downloaded.cleanup()
+            if job["input_path"] and os.path.exists(job["input_path"]):
+                os.remove(job["input_path"])
+            self._notify(job_id)
+
+    def _notify(self, job_id):
+        job = self.store.get(job_id)
+        if not job or not job["callback_url"]:
+            return
+        try:
+            requests.post(job["callback_url"], json=public_view(job, include_result=True), timeout=CALLBACK_TIMEOUT)
+        except requests.exceptions.RequestException as e:
+            print(f"⚠️ Callback for job {job_id} failed: {str(e)}")
+
+    def shutdown(self, wait=True, cancel_pending=False):
+        """Stop the pool; cancelled jobs stay queued in the store and are resumed
+        by the next server process to start."""
+        self._executor.shutdown(wait=wait, cancel_futures=cancel_pending)
+
+
+def save_upload(file_storage, ext):
+    """Persist an uploaded file under JOB_DIR so the job survives a restart."""
+    upload_dir = os.path.join(JOB_DIR, "uploads")
+    os.makedirs(upload_dir, exist_ok=True)
+    path = os.path.join(upload_dir, uuid.uuid4().hex + ext)
+    file_storage.save(path)
+    return path
+
+
+def public_view(job, include_result=False):
+    """The job fields returned to API clients."""
+    view = {
+        "jobId": job["id"],
+        "status": job["status"],
+        "stage": job["stage"],
+        "progress": round(STAGES.index(job["stage"]) / (len(STAGES) - 1) * 100),
+        "createdAt": job["created_at"],
+        "updatedAt": job["updated_at"],
+    }
+    if job["error"]:
+        view["error"] = job["error"]
+    if include_result and job["status"] == "done":
+        view["data"] = job["result"]
+    return view
@@ -0,0 +1,248 @@
+import time
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+# ==========================================================
+# HOT-PATH METRICS AND PER-REQUEST TRACES
+# ==========================================================
+# Counters and histograms are kept in-process and rendered in the
+# Prometheus text format by GET /metrics. `stage()` times a block, records
+# it in the stage histogram and, if the current request asked for one,
+# adds it to that request's trace so a slow document shows which stage
+# dominated. Everything is thread-safe; recording costs a lock and a dict
+# update, so it is cheap enough to leave on.
+
+# Seconds; covers fast cached stages up to multi-minute scans
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+COUNT_BUCKETS = (0, 1, 2, 5, 10, 20, 50, 100, 200)
+
+_metrics = []
+_collectors = []
+_trace = ContextVar("verification_trace", default=None)
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _label_str(names, values):
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(v)}"' for n, v in zip(names, values)) + "}"
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def inc(self, amount=1, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(labels.get(n, "") for n in self.labelnames), 0)
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_label_str(self.labelnames, key)} {_number(value)}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}  # labels -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def observe(self, value, **labels):
+        key = tuple(labels.get(n, "") for n in self.labelnames)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series[i] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(labels.get(n, "") for n in self.labelnames))
+        return series[-1] if series else 0
+
+    def render(self):
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        names = self.labelnames + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                for bound, n in zip(self.buckets, series):
+                    lines.append(f"{self.name}_bucket{_label_str(names, key + (_number(bound),))} {n}")
+                lines.append(f"{self.name}_bucket{_label_str(names, key + ('+Inf',))} {series[-1]}")
+                lines.append(f"{self.name}_sum{_label_str(self.labelnames, key)} {_number(round(series[-2], 6))}")
+                lines.append(f"{self.name}_count{_label_str(self.labelnames, key)} {series[-1]}")
+        return lines
+
+
+def add_collector(fn):
+    """Register `fn()` -> list of exposition lines, called on every render."""
+    _collectors.append(fn)
+    return fn
+
+
+def render():
+    """All metrics in the Prometheus text exposition format."""
+    lines = []
+    for metric in _metrics:
+        lines.extend(metric.render())
+    for collector in _collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+STAGE_SECONDS = Histogram(
+    "verification_stage_seconds",
+    "Time spent in each verification stage",
+    ["stage"],
+)
+YOLO_SECONDS = Histogram(
+    "verification_yolo_inference_seconds",
+    "Time spent in one batched forward pass, per model",
+    ["model"],
+)
+DOCUMENT_SECONDS = Histogram(
+    "verification_document_seconds",
+    "End-to-end process_file time per document",
+    ["result"],
+)
+IMAGES_PER_DOCUMENT = Histogram(
+    "verification_images_per_document",
+    "Images analysed per document",
+    buckets=COUNT_BUCKETS,
+)
+DOCUMENTS = Counter(
+    "verification_documents_total",
+    "Documents verified, by outcome (processed, cached, error)",
+    ["result"],
+)
+IMAGES = Counter(
+    "verification_images_total",
+    "Images analysed, by whether YOLO actually ran on them",
+    ["inferred"],
+)
+PAGES = Counter(
+    "verification_pdf_pages_total",
+    "PDF pages read page by page, by whether they were extracted or reused",
+    ["extracted"],
+)
+OCR_PAGES = Counter(
+    "verification_ocr_pages_total",
+    "Scanned PDF pages, by whether their OCR text came from the cache",
+    ["cached"],
+)
+BUNDLES = Counter(
+    "verification_bundles_total",
+    "Multi-file application bundles verified, by outcome (processed, cached, error)",
+    ["result"],
+)
+BUNDLE_SECONDS = Histogram(
+    "verification_bundle_seconds",
+    "End-to-end process_bundle time per bundle",
+    ["result"],
+)
+FILES_PER_BUNDLE = Histogram(
+    "verification_files_per_bundle",
+    "Files in each application bundle",
+    buckets=COUNT_BUCKETS,
+)
+MODEL_INFERENCES = Counter(
+    "verification_model_inferences_total",
+    "Images sent through each detector",
+    ["model"],
+)
+TRANSLATION = Counter(
+    "verification_translation_total",
+    "Translation work: backend calls, spans translated, cache hits, blocks skipped",
+    ["kind"],
+)
+
+
+# ----------------------------------------------------------
+# Timing and traces
+# ----------------------------------------------------------
+
+def start_trace():
+    """Begin recording a stage trace for the current request."""
+    trace = {}
+    _trace.set(trace)
+    return trace
+
+
+def end_trace():
+    """Stop recording; server threads are reused, so every request starts here."""
+    _trace.set(None)
+
+
+def get_trace():
+    """Stage -> {"seconds", "calls"} for the current request, or None."""
+    trace = _trace.get()
+    if trace is None:
+        return None
+    return {name: {"seconds": round(t["seconds"], 4), "calls": t["calls"]} for name, t in trace.items()}
+
+
+def record(name, seconds, histogram=STAGE_SECONDS, **labels):
+    """Record `seconds` for a stage in `histogram` and in the current trace."""
+    histogram.observe(seconds, **(labels or {"stage": name}))
+    trace = _trace.get()
+    if trace is not None:
+        entry = trace.setdefault(name, {"seconds": 0.0, "calls": 0})
+        entry["seconds"] += seconds
+        entry["calls"] += 1
+
+
+@contextmanager
+def stage(name, histogram=STAGE_SECONDS, **labels):
+    """Time the enclosed block as stage `name` (see record)."""
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(name, time.perf_counter() - t0, histogram, **labels)
+
+
+def timed_iter(iterable, name):
+    """Yield from `iterable`, charging only the time spent producing items to `name`.
+
+    Used for lazy image generators whose work is interleaved with inference.
+    """
+    total = 0.0
+    iterator = iter(iterable)
+    try:
+        while True:
+            t0 = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                return
+            finally:
+                total += time.perf_counter() - t0
+            yield item
+    finally:
+        record(name, total)
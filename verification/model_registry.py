@@ -0,0 +1,126 @@
+import os
+import threading
+
+# ==========================================================
+# PROCESS-WIDE YOLO MODEL REGISTRY
+# ==========================================================
+# Each .pt file is loaded once per worker process and kept warm.
+# Entries are keyed by absolute path and remember the file's
+# (mtime, size) so that replacing a model on disk reloads it on
+# the next request without restarting the server.
+
+# "torch" runs the .pt files with ultralytics; "onnx" and "onnx-int8"
+# run their ONNX exports with ONNX Runtime on the CPU (see onnx_backend)
+INFERENCE_BACKENDS = ("torch", "onnx", "onnx-int8")
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "torch").lower()
+if INFERENCE_BACKEND not in INFERENCE_BACKENDS:
+    raise ValueError(f"INFERENCE_BACKEND must be one of {', '.join(INFERENCE_BACKENDS)}")
+
+
+class LoadedModel:
+    """A loaded model plus the lock that serializes its inference."""
+
+    def __init__(self, path, model, fingerprint):
+        self.path = path
+        self.model = model
+        self.fingerprint = fingerprint
+        self.lock = threading.Lock()
+
+    @property
+    def names(self):
+        return getattr(self.model, "names", {})
+
+    def __call__(self, *args, **kwargs):
+        # Ultralytics predictors keep per-call state, so a shared model
+        # must not run two predictions at the same time.
+        with self.lock:
+            return self.model(*args, **kwargs)
+
+
+def load_model(path, backend=None):
+    """Load `path` with the configured inference backend.
+
+    torch and ultralytics are only imported by the torch backend, so an
+    ONNX deployment never pays for them.
+    """
+    backend = backend or INFERENCE_BACKEND
+    if backend == "torch" and not path.endswith(".onnx"):
+        from ultralytics import YOLO
+        return YOLO(path)
+    import onnx_backend
+    return onnx_backend.load(path, int8=backend == "onnx-int8")
+
+
+def _fingerprint(path):
+    st = os.stat(path)
+    return (st.st_mtime_ns, st.st_size)
+
+
+class ModelRegistry:
+    def __init__(self, loader=load_model):
+        self._loader = loader
+        self._models = {}
+        self._load_locks = {}
+        self._lock = threading.Lock()
+
+    def _load_lock(self, path):
+        with self._lock:
+            return self._load_locks.setdefault(path, threading.Lock())
+
+    def get(self, path):
+        """Return the warm model for `path`, loading or reloading it if needed."""
+        path = os.path.abspath(path)
+        fingerprint = _fingerprint(path)
+
+        entry = self._models.get(path)
+        if entry is not None and entry.fingerprint == fingerprint:
+            return entry
+
+        # Only one thread loads a given file; others wait and reuse it.
+        with self._load_lock(path):
+            entry = self._models.get(path)
+            if entry is not None and entry.fingerprint == fingerprint:
+                return entry
+
+            if entry is None:
+                print(f"📦 Loading YOLO model: {path}")
+            else:
+                print(f"🔄 Model changed on disk, reloading: {path}")
+
+            try:
+                model = self._loader(path)
+            except Exception as e:
+                raise Exception(f"Failed to load YOLO model {path}: {str(e)}")
+
+            entry = LoadedModel(path, model, fingerprint)
+            self._models[path] = entry
+            return entry
+
+    def warm_up(self, paths):
+        """Eagerly load every existing model in `paths`; missing files are skipped."""
+        loaded = []
+        for path in paths:
+            if path and os.path.exists(path):
+                self.get(path)
+                loaded.append(path)
+            else:
+                print(f"⚠️ Skipping warm-up, model not found: {path}")
+        return loaded
+
+    def is_loaded(self, path):
+        return os.path.abspath(path) in self._models
+
+    def loaded_paths(self):
+        return list(self._models.keys())
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+
+
+# Shared by every request handled in this process
+registry = ModelRegistry()
+
+
+def get_model(path):
+    return registry.get(path)
@@ -0,0 +1,206 @@
+import os
+import io
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+import metrics
+import result_cache
+from result_cache import stage_key
+from image_extraction import open_pdf
+
+# ==========================================================
+# OCR FALLBACK FOR SCANNED PDF PAGES
+# ==========================================================
+# Pages without a text layer (scans, photographed forms) come out of
+# pdfplumber empty. extract_page_range gives them a fingerprint instead
+# (see pdf_extraction.page_fingerprints); they are rasterized with PyMuPDF
+# and read by a local OCR engine (Tesseract through pytesseract, so nothing
+# leaves the machine) in a process pool. The text is cached per page
+# fingerprint, so a page is never OCR'd twice, even in another document.
+
+# Set to 0 to leave scanned pages empty
+OCR_ENABLED = os.getenv("OCR_ENABLED", "1") == "1"
+# Pages with fewer characters than this in their text layer are OCR'd
+OCR_MIN_CHARS = int(os.getenv("OCR_MIN_CHARS", "10"))
+# Tesseract is most accurate at about 300 DPI; higher only costs time
+OCR_DPI = int(os.getenv("OCR_DPI", "300"))
+# Tesseract language packs, e.g. "eng+hin" for Hindi submissions
+OCR_LANGUAGES = os.getenv("OCR_LANGUAGES", "eng+hin")
+OCR_WORKERS = int(os.getenv("OCR_WORKERS", str(os.cpu_count() or 1)))
+
+
+class TesseractEngine:
+    """Local Tesseract through pytesseract; reads one page image at a time."""
+
+    def __init__(self, languages=OCR_LANGUAGES):
+        import pytesseract
+        pytesseract.get_tesseract_version()  # raises if the binary is missing
+        installed = set(pytesseract.get_languages(config=""))
+        wanted = [lang for lang in languages.split("+") if lang]
+        missing = [lang for lang in wanted if lang not in installed]
+        if len(missing) == len(wanted):
+            raise RuntimeError(f"none of the Tesseract language packs {languages!r} are installed")
+        if missing:
+            print(f"⚠️ Tesseract language pack(s) {', '.join(missing)} not installed; OCR uses the others")
+        self.languages = "+".join(lang for lang in wanted if lang in installed)
+
+    @property
+    def name(self):
+        return f"tesseract-{self.languages}"
+
+    def recognize(self, png):
+        import pytesseract
+        from PIL import Image
+        return pytesseract.image_to_string(Image.open(io.BytesIO(png)), lang=self.languages)
+
+
+# Created on first use; stays None if pytesseract or Tesseract is missing
+_engine = None
+_engine_ready = False
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def set_engine(engine):
+    """Swap the OCR engine (anything picklable with `name` and `recognize(png_bytes)`)."""
+    global _engine, _engine_ready
+    _engine = engine
+    _engine_ready = True
+
+
+def get_engine():
+    global _engine, _engine_ready
+    if not _engine_ready:
+        try:
+            _engine = TesseractEngine()
+        except Exception as e:
+            if OCR_ENABLED:
+                print(f"⚠️ OCR unavailable: {e}")
+            _engine = None
+        _engine_ready = True
+    return _engine
+
+
+def cache_params():
+    """What a page's OCR text depends on, for caches of whole pages."""
+    engine = get_engine() if OCR_ENABLED else None
+    return [OCR_ENABLED, OCR_MIN_CHARS, OCR_DPI, engine.name if engine else None]
+
+
+def needs_ocr(text):
+    return OCR_ENABLED and len(text.strip()) < OCR_MIN_CHARS
+
+
+def _init_worker():
+    # One Tesseract thread per worker; the pool provides the parallelism
+    os.environ.setdefault("OMP_THREAD_LIMIT", "1")
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=OCR_WORKERS, mp_context=multiprocessing.get_context("spawn"),
+                                        initializer=_init_worker)
+        return _pool
+
+
+def shutdown_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def rasterize(doc, page_num, dpi=OCR_DPI):
+    """Greyscale PNG of one page of an open PyMuPDF document."""
+    import fitz
+    return doc[page_num].get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, alpha=False).tobytes("png")
+
+
+def _rasterize(doc, n):
+    try:
+        return rasterize(doc, n)
+    except Exception as e:
+        print(f"⚠️ Could not rasterize page {n + 1} for OCR:", e)
+        return None
+
+
+def _read_page(engine, png, n):
+    """OCR one rasterized page; None if the engine fails on it (e.g. a missing language pack)."""
+    try:
+        return engine.recognize(png)
+    except Exception as e:
+        print(f"⚠️ OCR failed on page {n + 1}:", e)
+        return None
+
+
+def _collect(results, i, n, future):
+    try:
+        results[i] = future.result()
+    except Exception as e:  # the worker itself died
+        print(f"⚠️ OCR failed on page {n + 1}:", e)
+
+
+def _recognize_all(engine, source, page_nums):
+    """OCR text of each page (None where OCR failed), rasterizing just ahead
+    of the pool so only a few page images are held in memory at once."""
+    results = [None] * len(page_nums)
+    with open_pdf(source) as doc:
+        if OCR_WORKERS <= 1 or len(page_nums) < 2:
+            for i, n in enumerate(page_nums):
+                png = _rasterize(doc, n)
+                if png is not None:
+                    results[i] = _read_page(engine, png, n)
+            return results
+        pool = _get_pool()
+        window = []
+        for i, n in enumerate(page_nums):
+            if len(window) >= OCR_WORKERS * 2:
+                _collect(results, *window.pop(0))
+            png = _rasterize(doc, n)
+            if png is not None:
+                window.append((i, n, pool.submit(_read_page, engine, png, n)))
+        for item in window:
+            _collect(results, *item)
+    return results
+
+
+def ocr_pages(source, pages):
+    """Fill in the text of the scanned pages among extract_page_range's `pages`.
+
+    Pages get "ocr": True when their text came from OCR. Pages OCR failed
+    on (or with no engine installed) keep their extracted text and are
+    not cached, so they are read again later. Returns the number of
+    scanned pages left without OCR text.
+    """
+    scanned = [p for p in pages if p.get("scan")]
+    if not scanned:
+        return 0
+    engine = get_engine()
+    if engine is None:
+        print(f"⚠️ {len(scanned)} scanned page(s) without text; install pytesseract and Tesseract for OCR")
+        return len(scanned)
+
+    keys = [stage_key(p["scan"], engine.name, OCR_DPI) for p in scanned]
+    todo = []
+    for page, key in zip(scanned, keys):
+        text = result_cache.ocr.get(key)
+        if text is None:
+            todo.append((page, key))
+        else:
+            page["text"], page["ocr"] = text, True
+    metrics.OCR_PAGES.inc(len(scanned) - len(todo), cached="true")
+
+    if todo:
+        print(f"🔎 OCR on {len(todo)} scanned page(s) at {OCR_DPI} DPI...")
+        with metrics.stage("ocr"):
+            texts = _recognize_all(engine, source, [page["page"] - 1 for page, _ in todo])
+        for (page, key), text in zip(todo, texts):
+            if text is None:
+                continue  # keep the text layer's few characters
+            page["text"], page["ocr"] = text, True
+            result_cache.ocr.set(key, text)
+        metrics.OCR_PAGES.inc(len(todo), cached="false")
+    return sum(1 for page in scanned if not page.get("ocr"))
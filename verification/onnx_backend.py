@@ -0,0 +1,203 @@
+"""ONNX Runtime inference backend for the YOLO models.
+
+Usage:
+    python onnx_backend.py model/*.pt [--int8] [--imgsz 640]
+
+The .pt files stay the source of truth. Each one is exported once to an
+.onnx file next to it (`name.onnx`, or `name.int8.onnx` when quantized),
+and the export is redone whenever the .pt changes. Run this script at
+build time so the servers never need to export; after that, serving with
+INFERENCE_BACKEND=onnx only needs onnxruntime and OpenCV, not torch or
+ultralytics.
+"""
+import os
+import ast
+import sys
+import shutil
+import argparse
+import tempfile
+import numpy as np
+from PIL import Image
+
+# ==========================================================
+# CPU INFERENCE WITH ONNX RUNTIME
+# ==========================================================
+# OnnxDetector is a drop-in for an ultralytics YOLO model as far as
+# inference.py is concerned: it is called with a batch of images and
+# returns one result per image whose `.boxes` carry `conf` and `cls`.
+# Pre-processing mirrors the ultralytics predictor (letterbox, RGB,
+# 0-1 scaling) so scores match the PyTorch backend.
+
+DEFAULT_IMGSZ = 640
+CONF_THRESHOLD = 0.25  # ultralytics' predict default
+PAD_VALUE = 114
+
+
+def onnx_path_for(pt_path, int8=False):
+    """Where the ONNX export of `pt_path` lives."""
+    stem = os.path.splitext(pt_path)[0]
+    return stem + (".int8.onnx" if int8 else ".onnx")
+
+
+def is_stale(pt_path, onnx_path):
+    # Exports carry the mtime of the weights they were made from
+    return not os.path.exists(onnx_path) or os.stat(onnx_path).st_mtime_ns != os.stat(pt_path).st_mtime_ns
+
+
+def export_onnx(pt_path, int8=False, imgsz=DEFAULT_IMGSZ):
+    """Export `pt_path` to ONNX (optionally INT8) next to it; returns the .onnx path.
+
+    INT8 uses dynamic quantization: weights are stored as int8 and
+    activations are quantized on the fly, so no calibration set is needed.
+    The file is written under a temporary name and moved into place, so
+    a worker never loads a half-written export.
+    """
+    from ultralytics import YOLO
+    out = onnx_path_for(pt_path, int8)
+    with tempfile.TemporaryDirectory(dir=os.path.dirname(os.path.abspath(out))) as tmp:
+        # ultralytics writes the export next to the weights it was given
+        staged = os.path.join(tmp, os.path.basename(pt_path))
+        shutil.copy2(pt_path, staged)
+        exported = YOLO(staged).export(format="onnx", imgsz=imgsz, dynamic=True, simplify=False, verbose=False)
+        if int8:
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            quantized = os.path.join(tmp, "int8.onnx")
+            quantize_dynamic(exported, quantized, weight_type=QuantType.QUInt8)
+            exported = quantized
+        mtime = os.stat(pt_path).st_mtime_ns
+        os.utime(exported, ns=(mtime, mtime))
+        os.replace(exported, out)
+    print(f"📦 Exported {pt_path} -> {out}")
+    return out
+
+
+def letterbox(img, size, stride=None):
+    """Resize keeping the aspect ratio and pad to `size` (or, given `stride`,
+    just to the next multiple of it) the way the ultralytics predictor does.
+
+    Uses OpenCV like the predictor: its fixed-point bilinear weights differ
+    from a float resize by a grey level here and there, enough to move scores.
+    """
+    import cv2
+    h, w = img.shape[:2]
+    r = min(size / h, size / w)
+    new_w, new_h = round(w * r), round(h * r)
+    dw, dh = size - new_w, size - new_h
+    if stride:
+        dw, dh = dw % stride, dh % stride
+    dw, dh = dw / 2, dh / 2
+    if (w, h) != (new_w, new_h):
+        img = cv2.resize(img, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    top, bottom = round(dh - 0.1), round(dh + 0.1)
+    left, right = round(dw - 0.1), round(dw + 0.1)
+    return cv2.copyMakeBorder(img, top, bottom, left, right, cv2.BORDER_CONSTANT, value=(PAD_VALUE,) * 3)
+
+
+def to_rgb_array(img):
+    """HWC uint8 RGB array from a PIL image or an inference.to_model_input array (BGR)."""
+    if isinstance(img, Image.Image):
+        return np.asarray(img if img.mode == "RGB" else img.convert("RGB"))
+    return np.ascontiguousarray(img[..., ::-1])
+
+
+class Box:
+    __slots__ = ("conf", "cls")
+
+    def __init__(self, conf, cls):
+        self.conf = np.array([conf], dtype=np.float32)
+        self.cls = np.array([cls], dtype=np.float32)
+
+
+class Result:
+    def __init__(self, boxes):
+        self.boxes = boxes
+
+
+class OnnxDetector:
+    """A YOLO detection model exported to ONNX, run with ONNX Runtime on the CPU."""
+
+    def __init__(self, path, threads=None):
+        self.path = path
+        self.threads = threads if threads is not None else int(os.getenv("OMP_NUM_THREADS", "0"))
+        self._pid = None
+        session = self.session
+        self.input_name = session.get_inputs()[0].name
+
+        meta = session.get_modelmeta().custom_metadata_map
+        self.names = ast.literal_eval(meta["names"]) if "names" in meta else {}
+        self.stride = int(meta.get("stride", 32))
+        imgsz = ast.literal_eval(meta["imgsz"]) if "imgsz" in meta else DEFAULT_IMGSZ
+        self.imgsz = imgsz[0] if isinstance(imgsz, (list, tuple)) else int(imgsz)
+
+    @property
+    def session(self):
+        # A session's thread pool doesn't survive fork, so a gunicorn worker
+        # forked from the preloading master opens its own on first use
+        if self._pid != os.getpid():
+            import onnxruntime as ort
+            options = ort.SessionOptions()
+            options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+            if self.threads:
+                options.intra_op_num_threads = self.threads
+                options.inter_op_num_threads = 1
+            self._session = ort.InferenceSession(self.path, options, providers=["CPUExecutionProvider"])
+            self._pid = os.getpid()
+        return self._session
+
+    def preprocess(self, images):
+        arrays = [to_rgb_array(img) for img in images]
+        # Same-sized batches are padded only to the stride, like the PyTorch predictor
+        stride = self.stride if len({a.shape for a in arrays}) == 1 else None
+        batch = np.stack([letterbox(a, self.imgsz, stride) for a in arrays])
+        return np.ascontiguousarray(batch.transpose(0, 3, 1, 2), dtype=np.float32) / 255.0
+
+    def __call__(self, images, conf=CONF_THRESHOLD, verbose=False, **kwargs):
+        """One result per image with the best box for each class scoring above `conf`.
+
+        Callers only ever read the top confidence per class, and NMS (which
+        is per class) always keeps a class's top box, so it is skipped.
+        """
+        if not isinstance(images, (list, tuple)):
+            images = [images]
+        output = self.session.run(None, {self.input_name: self.preprocess(images)})[0]
+        results = []
+        for scores in output[:, 4:, :]:  # (classes, anchors) for one image
+            cls = scores.argmax(0)
+            best = scores.max(0)
+            keep = best > conf
+            boxes = []
+            for c in np.unique(cls[keep]):
+                boxes.append(Box(float(best[keep & (cls == c)].max()), int(c)))
+            results.append(Result(boxes))
+        return results
+
+
+def load(path, int8=False):
+    """OnnxDetector for a .onnx file, or for a .pt file's export (exporting it if stale)."""
+    if path.endswith(".onnx"):
+        return OnnxDetector(path)
+    onnx_path = onnx_path_for(path, int8)
+    if is_stale(path, onnx_path):
+        export_onnx(path, int8)
+    return OnnxDetector(onnx_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Export YOLO .pt models for INFERENCE_BACKEND=onnx.")
+    parser.add_argument("weights", nargs="+")
+    parser.add_argument("--int8", action="store_true", help="Also write an INT8-quantized copy")
+    parser.add_argument("--imgsz", type=int, default=DEFAULT_IMGSZ)
+    parser.add_argument("--force", action="store_true", help="Re-export even if up to date")
+    args = parser.parse_args(argv)
+
+    for pt in args.weights:
+        for int8 in ((False, True) if args.int8 else (False,)):
+            if args.force or is_stale(pt, onnx_path_for(pt, int8)):
+                export_onnx(pt, int8, args.imgsz)
+            else:
+                print(f"✅ Up to date: {onnx_path_for(pt, int8)}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
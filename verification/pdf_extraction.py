@@ -0,0 +1,275 @@
+import os
+import re
+import time
+import hashlib
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from image_extraction import ImageFilter, iter_pdf_page_images, open_pdf
+from document_source import as_source
+from ocr import needs_ocr, ocr_pages
+
+# ==========================================================
+# PAGE-PARALLEL PDF EXTRACTION
+# ==========================================================
+# Text (pdfplumber) and embedded images (PyMuPDF) are pulled out in one
+# pass. Large documents are split into page ranges that run in a process
+# pool; each worker opens the file once for its whole range, and results
+# are reassembled in page order. Images are filtered and downsampled inside
+# the workers (see image_extraction.py) so only model-sized images travel
+# back to the parent. Tables are read with pdfplumber's table finder in the
+# same pass so key/value tables can be parsed cell by cell. Documents are
+# read from memory when they have no file on disk (see document_source).
+# Each page also has a fingerprint of what its text and images are made
+# of, so a resubmission can skip the pages it shares with an earlier one.
+# Pages without a text layer are OCR'd afterwards (see ocr.py).
+
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(os.cpu_count() or 1)))
+# Documents shorter than this are extracted in-process; the pool isn't worth it
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "16"))
+# Set to 0 to skip pdfplumber's table finder (text-regex fallback only)
+PDF_EXTRACT_TABLES = os.getenv("PDF_EXTRACT_TABLES", "1") == "1"
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool():
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # "spawn" keeps workers independent of the server's threads and
+            # any torch state, and behaves the same on Windows and Linux.
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def shutdown_pool():
+    """Stop the worker pool (it is recreated on the next large document)."""
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=True, cancel_futures=True)
+            _pool = None
+
+
+def page_count(source):
+    with open_pdf(source) as doc:
+        return doc.page_count
+
+
+# Subset fonts get a random "ABCDEF+" prefix each time a PDF is written
+SUBSET_PREFIX = re.compile(r"/[A-Z]{6}\+")
+OBJECT_REF = re.compile(r"(\d+) \d+ R")
+
+
+def _object_digest(doc, xref, seen):
+    """Hash of a PDF object and the objects it references, minus object numbers.
+
+    For a font this takes in its ToUnicode map and embedded font program,
+    which decide what text the page's glyphs extract as.
+    """
+    if xref in seen:
+        return seen[xref]
+    seen[xref] = ""  # guards against reference cycles
+    h = hashlib.sha256()
+    source = SUBSET_PREFIX.sub("/", doc.xref_object(xref, compressed=True))
+    h.update(OBJECT_REF.sub(lambda m: _object_digest(doc, int(m.group(1)), seen), source).encode())
+    if doc.xref_is_stream(xref):
+        h.update(doc.xref_stream(xref) or b"")
+    seen[xref] = h.hexdigest()
+    return seen[xref]
+
+
+def _page_fingerprint(doc, page, fonts=None):
+    fonts = {} if fonts is None else fonts
+    h = hashlib.sha256()
+    h.update(f"{tuple(page.rect)}|{page.rotation}|".encode())
+    h.update(page.read_contents())
+    # Text drawn inside form XObjects isn't in the page's own content stream
+    for xref, *_ in page.get_xobjects():
+        h.update(doc.xref_stream_raw(xref) or b"")
+    for xref, *_ in page.get_fonts(full=True):
+        h.update(f"|{_object_digest(doc, xref, fonts)}".encode())
+    for img in page.get_images(full=True):
+        h.update(doc.xref_stream_raw(img[0]) or b"")
+    return h.hexdigest()
+
+
+def page_fingerprints(source):
+    """Hash of each page's content streams, fonts and embedded image bytes.
+
+    Object numbers are left out, so a page keeps its fingerprint when the
+    PDF around it is edited and saved again.
+    """
+    with open_pdf(source) as doc:
+        fonts = {}  # font digests, shared by the pages that use them
+        return [_page_fingerprint(doc, page, fonts) for page in doc]
+
+
+def extract_page_range(source, start, end, want_text=True, want_images=True, want_tables=False, separate_pages=False):
+    """Extract pages [start, end) of a DocumentSource; runs inside a pool worker.
+
+    Images come back as (content hash, image) pairs so the caller can drop
+    duplicates found by other workers. With `separate_pages`, every page's
+    images are filtered on their own (not against earlier pages), so each
+    page's result stands by itself. Pages that need OCR carry their
+    fingerprint as "scan" (see ocr_pages).
+    """
+    import pdfplumber
+    pages = []
+    image_filter = ImageFilter()
+    fonts = {}
+    stream = source.open() if want_text or want_tables else None
+    plumber = pdfplumber.open(stream) if stream else None
+    doc = open_pdf(source) if want_images else None
+    try:
+        for page_num in range(start, end):
+            t0 = time.perf_counter()
+            if separate_pages:
+                image_filter = ImageFilter()
+            text = ""
+            scan = None
+            images = []
+            tables = []
+            if want_text:
+                try:
+                    text = plumber.pages[page_num].extract_text() or ""
+                except Exception as e:
+                    print(f"PDF extraction error on page {page_num + 1}:", e)
+                if needs_ocr(text):
+                    doc = doc or open_pdf(source)
+                    scan = _page_fingerprint(doc, doc[page_num], fonts)
+            if want_tables:
+                try:
+                    tables = plumber.pages[page_num].extract_tables()
+                except Exception as e:
+                    print(f"PDF table extraction error on page {page_num + 1}:", e)
+            if want_images:
+                try:
+                    images = list(iter_pdf_page_images(doc, page_num, image_filter))
+                except Exception as e:
+                    print(f"PDF image extraction error on page {page_num + 1}:", e)
+            pages.append({
+                "page": page_num + 1,
+                "text": text,
+                "scan": scan,
+                "images": images,
+                "tables": tables,
+                "seconds": round(time.perf_counter() - t0, 4),
+            })
+    finally:
+        if plumber is not None:
+            plumber.close()
+            stream.close()
+        if doc is not None:
+            doc.close()
+    return pages
+
+
+def _split(runs, parts):
+    """Cut runs of consecutive pages [(start, end), ...] into about `parts` ranges."""
+    size = max(1, -(-sum(end - start for start, end in runs) // parts))
+    return [(s, min(s + size, end)) for start, end in runs for s in range(start, end, size)]
+
+
+def _extract_runs(source, runs, workers, want_text, want_images, want_tables, separate_pages=False):
+    """Extract runs of pages, in the pool if there are enough of them; returns (pages, mode)."""
+    count = sum(end - start for start, end in runs)
+    if workers > 1 and count >= PDF_PARALLEL_MIN_PAGES:
+        # A few ranges per worker so one slow range doesn't hold up the rest.
+        # An in-memory document is pickled into every range, so it gets one
+        # range per worker; a file on disk is only referred to by path.
+        ranges = _split(runs, workers * 4 if source.path else workers)
+        pool = _get_pool()
+        futures = [pool.submit(extract_page_range, source, s, e, want_text, want_images, want_tables, separate_pages)
+                   for s, e in ranges]
+        return [page for f in futures for page in f.result()], f"{len(ranges)} ranges on {workers} workers"
+    pages = [page for s, e in runs
+             for page in extract_page_range(source, s, e, want_text, want_images, want_tables, separate_pages)]
+    return pages, "in-process"
+
+
+def extract_pages(path, page_numbers, want_text=True, want_images=True, workers=None, want_tables=False):
+    """Extract only `page_numbers` (0-based) of a PDF given as a path or a DocumentSource.
+
+    Returns extract_page_range's per-page dicts in page order, with each
+    page's images filtered independently of the other pages.
+    """
+    source = as_source(path)
+    runs = []
+    for n in sorted(set(page_numbers)):
+        if runs and runs[-1][1] == n:
+            runs[-1][1] = n + 1
+        else:
+            runs.append([n, n + 1])
+    try:
+        t0 = time.perf_counter()
+        pages, mode = _extract_runs(source, runs, workers or PDF_WORKERS, want_text, want_images,
+                                    want_tables and PDF_EXTRACT_TABLES, separate_pages=True)
+        print(f"📄 Extracted {len(pages)} PDF page(s) ({mode}) in {time.perf_counter() - t0:.2f}s")
+        ocr_pages(source, pages)
+        return pages
+    finally:
+        if source is not path:
+            source.close()
+
+
+def extract_pdf(path, want_text=True, want_images=True, workers=None, want_tables=False):
+    """Extract text, images and (optionally) tables from every page of a PDF
+    given as a path or a DocumentSource.
+
+    Returns {"text": str, "images": [PIL.Image], "tables": [...], "pages":
+    [per-page info]}. Tables are {"page": n, "rows": [[cell, ...], ...]};
+    each page entry carries its number, character, line, image and table
+    counts, and extraction time in seconds. "ocr_pending" counts scanned
+    pages that could not be OCR'd (see ocr.ocr_pages).
+    """
+    source = as_source(path)
+    try:
+        return _extract_pdf(source, want_text, want_images, workers, want_tables and PDF_EXTRACT_TABLES)
+    finally:
+        if source is not path:
+            source.close()
+
+
+def _extract_pdf(source, want_text, want_images, workers, want_tables):
+    workers = workers or PDF_WORKERS
+    try:
+        total = page_count(source)
+    except Exception as e:
+        print("PDF extraction error:", e)
+        return {"text": "", "images": [], "tables": [], "ocr_pending": 0, "pages": []}
+
+    t0 = time.perf_counter()
+    pages, mode = _extract_runs(source, [(0, total)], workers, want_text, want_images, want_tables)
+    elapsed = time.perf_counter() - t0
+    print(f"📄 Extracted {total} PDF pages ({mode}) in {elapsed:.2f}s")
+    ocr_pending = ocr_pages(source, pages)
+
+    # Ranges were filtered independently; apply document-wide dedup and cap
+    image_filter = ImageFilter()
+    images = []
+    for p in pages:
+        for digest, img in p["images"]:
+            if image_filter.new_content(digest) and image_filter.accept():
+                images.append(img)
+
+    return {
+        "text": "".join(p["text"] + "\n" for p in pages),
+        "images": images,
+        "tables": [{"page": p["page"], "rows": rows} for p in pages for rows in p["tables"]],
+        "ocr_pending": ocr_pending,
+        "pages": [
+            {
+                "page": p["page"],
+                "chars": len(p["text"]),
+                "lines": p["text"].count("\n") + 1,
+                "images": len(p["images"]),
+                "tables": len(p["tables"]),
+                "ocr": p.get("ocr", False),
+                "seconds": p["seconds"],
+            }
+            for p in pages
+        ],
+    }
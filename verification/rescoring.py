@@ -0,0 +1,279 @@
+"""Bulk rescoring of a whole application cycle against a (revised) policy.
+
+Usage:
+    python rescoring.py batch_results.jsonl [--policy revised.json] [--out rescored.jsonl]
+
+The extracted details and detected images of every institution are held
+column by column in NumPy arrays (InstitutionTable), so a policy is applied
+to all of them in one vectorized pass. Results are the same, field for
+field, as calculate_and_verify + build_aicte_json on each institution, and
+two policies can be compared over tens of thousands of records in
+milliseconds. The policy file is JSON shaped like ai.AICTE_POLICY.
+"""
+import sys
+import json
+import argparse
+import numpy as np
+import ai
+
+# Numeric text_data fields, stored as int64 columns
+NUMERIC_FIELDS = ("corpus_fund", "students", "faculty", "admin_area", "computers")
+
+
+def py_round(values, ndigits=2):
+    """np.round, matching Python's round() exactly.
+
+    The two only disagree on values within a hair of a tie, which are
+    re-rounded one by one with round().
+    """
+    rounded = np.round(values, ndigits)
+    scaled = values * 10 ** ndigits
+    near_tie = np.abs(scaled - np.floor(scaled) - 0.5) <= 1e-9 * np.maximum(1.0, np.abs(scaled))
+    for i in np.flatnonzero(near_tie):
+        rounded.flat[i] = round(float(values.flat[i]), ndigits)
+    return rounded
+
+
+def draws_from_scores(financial, faculty):
+    """The (financial, faculty) draws that reproduce already-compliant scores, else None."""
+    low, high = ai.COMPLIANT_SCORE_RANGE
+
+    def draw(score):
+        if isinstance(score, (int, float)) and low <= score <= high:
+            return (score - low) / (high - low)
+        return None
+
+    return draw(financial), draw(faculty)
+
+
+class InstitutionTable:
+    """text_data/visual_data of many institutions, as columns.
+
+    `draws` is an (n, 2) array of [0, 1) numbers fixing each institution's
+    compliant financial and faculty scores (see ai.compliant_score). Rows
+    given as None (or no `draws` at all) are random under SCORING_MODE
+    "random" and the middle of the range otherwise, as there is no content
+    hash here to seed them from.
+    """
+
+    def __init__(self, text_data, visual_data, draws=None):
+        self.text_data = list(text_data)
+        self.visual_data = list(visual_data)
+        n = len(self.text_data)
+        if len(self.visual_data) != n:
+            raise ValueError("text_data and visual_data must have one entry per institution")
+
+        self.columns = {
+            field: np.array([t[field] for t in self.text_data], dtype=np.int64)
+            for field in NUMERIC_FIELDS
+        }
+        self.categories = sorted({t["category"] for t in self.text_data})
+        index = {c: i for i, c in enumerate(self.categories)}
+        self.category = np.array([index[t["category"]] for t in self.text_data], dtype=np.int64)
+
+        # One boolean column per image type seen
+        self.image_types = list(ai.SCENE_CLASSES)
+        for visual in self.visual_data:
+            for x in visual:
+                if x["type"] not in self.image_types:
+                    self.image_types.append(x["type"])
+        column = {t: i for i, t in enumerate(self.image_types)}
+        self.found = np.zeros((n, len(self.image_types)), dtype=bool)
+        for row, visual in enumerate(self.visual_data):
+            for x in visual:
+                self.found[row, column[x["type"]]] = True
+
+        self.draws = np.random.random((n, 2)) if ai.SCORING_MODE == "random" else np.full((n, 2), 0.5)
+        if draws is not None:
+            for row, pair in enumerate(draws):
+                for j, value in enumerate(pair or (None, None)):
+                    if value is not None:
+                        self.draws[row, j] = value
+
+    def __len__(self):
+        return len(self.text_data)
+
+    @classmethod
+    def from_results(cls, results):
+        """Table of already-verified institutions (build_aicte_json output).
+
+        Institutions that met a norm keep the score they were given for it.
+        """
+        text_data, visual_data, draws = [], [], []
+        for result in results:
+            details = result["institution_details"]
+            text_data.append({k: v for k, v in details.items() if k != "faculty_ratio"})
+            visual_data.append([{"type": t, "confidence": c}
+                                for t, c in result["visual_detection"].items() if c != "missing"])
+            draws.append(draws_from_scores(result["scores"]["financial_score"], result["scores"]["faculty_score"]))
+        return cls(text_data, visual_data, draws)
+
+    @classmethod
+    def from_jsonl(cls, path):
+        """Table of the successful records in a batch.py results file."""
+        with open(path, "r", encoding="utf-8") as f:
+            records = [json.loads(line) for line in f if line.strip()]
+        return cls.from_results(r["data"] for r in records if r.get("success"))
+
+
+class Rescore:
+    """Scores and red flags of every institution in a table under one policy."""
+
+    def __init__(self, table, policy):
+        self.table = table
+        self.policy = policy
+        cols = table.columns
+
+        def rule(name):
+            return np.array([policy[c][name] for c in table.categories])[table.category]
+
+        corpus_min, ratio, min_area = rule("CORPUS_FUND_MIN"), rule("FACULTY_RATIO"), rule("MIN_ADMIN_AREA")
+        low, high = ai.COMPLIANT_SCORE_RANGE
+        compliant = py_round(low + (high - low) * table.draws)
+
+        # Financial
+        self.corpus_short = cols["corpus_fund"] < corpus_min
+        self.financial = np.where(self.corpus_short, 0.0, compliant[:, 0])
+
+        # Faculty ratio
+        self.no_faculty = cols["faculty"] == 0
+        faculty = np.where(self.no_faculty, 1, cols["faculty"])
+        self.sfr = np.where(self.no_faculty, 0.0, cols["students"] / faculty)
+        self.ratio_high = ~self.no_faculty & (self.sfr > ratio)
+        penalty = py_round(np.maximum(0, 100 - (self.sfr - ratio) * 5))
+        # calculate_and_verify scores these as int 0
+        self.faculty_zero = self.no_faculty | (self.ratio_high & (penalty <= 0))
+        self.faculty = np.where(self.no_faculty, 0.0, np.where(self.ratio_high, penalty, compliant[:, 1]))
+
+        # Infrastructure
+        self.area_short = cols["admin_area"] < min_area
+        self.no_computers = cols["computers"] <= 0
+        self.infra = np.where(self.area_short, 0, 50) + np.where(self.no_computers, 0, 50)
+
+        # Visual
+        self.required = {c: list(dict.fromkeys(policy[c]["REQUIRED_IMAGES"])) for c in table.categories}
+        wanted = np.zeros((len(table.categories), len(table.image_types)), dtype=bool)
+        n_required = np.zeros(len(table.categories))
+        for i, c in enumerate(table.categories):
+            n_required[i] = len(self.required[c])
+            for t in self.required[c]:
+                if t in table.image_types:
+                    wanted[i, table.image_types.index(t)] = True
+        n_found = (table.found & wanted[table.category]).sum(axis=1)
+        self.images_missing = n_found < n_required[table.category]
+        self.visual = py_round((n_found / n_required[table.category]) * 100)
+
+        # Total
+        weights = {k: np.array([policy[c]["WEIGHTAGE"][k] for c in table.categories])[table.category]
+                   for k in ("financial", "faculty", "infra", "visual")}
+        self.total = py_round((self.financial * weights["financial"] + self.faculty * weights["faculty"] +
+                               self.infra * weights["infra"] + self.visual * weights["visual"]) / 100)
+
+        self.approved = ~(self.corpus_short | self.no_faculty | self.ratio_high | self.area_short |
+                          self.no_computers | self.images_missing)
+
+    def red_flags(self, i):
+        """Institution `i`'s red flags, worded and ordered as calculate_and_verify does."""
+        text = self.table.text_data[i]
+        rules = self.policy[text["category"]]
+        flags = []
+        if self.corpus_short[i]:
+            flags.append(f"Corpus fund short by ₹{rules['CORPUS_FUND_MIN'] - text['corpus_fund']:,}")
+        if self.no_faculty[i]:
+            flags.append("No faculty record found")
+        elif self.ratio_high[i]:
+            flags.append(f"Faculty ratio high: 1:{round(float(self.sfr[i]), 2)}")
+        if self.area_short[i]:
+            flags.append(f"Admin area short by {rules['MIN_ADMIN_AREA'] - text['admin_area']} sq ft")
+        if self.no_computers[i]:
+            flags.append("Computers count missing")
+        if self.images_missing[i]:
+            found = {x["type"] for x in self.table.visual_data[i]}
+            missing = [x for x in self.required[text["category"]] if x not in found]
+            flags.append("Missing required images: " + ", ".join(missing))
+        return flags
+
+    def scores(self, i):
+        """Institution `i`'s scores dict, as calculate_and_verify returns it."""
+        return {
+            "breakdown": {
+                "financial": 0 if self.corpus_short[i] else float(self.financial[i]),
+                "faculty": 0 if self.faculty_zero[i] else float(self.faculty[i]),
+                "infra": int(self.infra[i]),
+                "visual": float(self.visual[i]),
+            },
+            "total": float(self.total[i]),
+        }
+
+    def result(self, i):
+        """Institution `i`'s final JSON, as build_aicte_json builds it."""
+        return ai.build_aicte_json(self.table.text_data[i], self.table.visual_data[i],
+                                   self.scores(i), self.red_flags(i))
+
+    def results(self):
+        return [self.result(i) for i in range(len(self.table))]
+
+
+def rescore(table, policy=None):
+    """Apply `policy` (default ai.AICTE_POLICY) to every institution in `table`."""
+    return Rescore(table, policy or ai.AICTE_POLICY)
+
+
+def compare(table, before, after=None):
+    """What-if summary of moving `table` from policy `before` to `after` (default: the current policy)."""
+    old, new = rescore(table, before), rescore(table, after)
+    change = new.total - old.total
+    return {
+        "institutions": len(table),
+        "approved_before": int(old.approved.sum()),
+        "approved_after": int(new.approved.sum()),
+        "newly_rejected": np.flatnonzero(old.approved & ~new.approved),
+        "newly_approved": np.flatnonzero(~old.approved & new.approved),
+        "mean_total_before": round(float(old.total.mean()), 2) if len(table) else 0,
+        "mean_total_after": round(float(new.total.mean()), 2) if len(table) else 0,
+        "score_changed": int(np.count_nonzero(change)),
+        "max_total_drop": round(float(-change.min()), 2) if len(table) else 0,
+    }
+
+
+def print_comparison(summary, table):
+    name = lambda i: table.text_data[i].get("name", "Unknown")
+    print("\n📊 POLICY COMPARISON")
+    print(f"   Institutions:   {summary['institutions']}")
+    print(f"   Approved:       {summary['approved_before']} → {summary['approved_after']}")
+    print(f"   Mean total:     {summary['mean_total_before']} → {summary['mean_total_after']}")
+    print(f"   Scores changed: {summary['score_changed']} (largest drop {summary['max_total_drop']})")
+    for i in summary["newly_rejected"][:20]:
+        print(f"   ❌ Now rejected: {name(i)}")
+    for i in summary["newly_approved"][:20]:
+        print(f"   ✅ Now approved: {name(i)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rescore verified institutions against a revised policy.")
+    parser.add_argument("results", help="batch.py JSONL results file")
+    parser.add_argument("--policy", help="Revised policy JSON (default: the current AICTE_POLICY)")
+    parser.add_argument("--baseline", help="Policy JSON to compare against (default: the current AICTE_POLICY)")
+    parser.add_argument("--out", help="Write the rescored results here as JSONL")
+    args = parser.parse_args(argv)
+
+    def load_policy(path):
+        if not path:
+            return ai.AICTE_POLICY
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    table = InstitutionTable.from_jsonl(args.results)
+    policy = load_policy(args.policy)
+    print_comparison(compare(table, load_policy(args.baseline), policy), table)
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as out:
+            for result in rescore(table, policy).results():
+                out.write(json.dumps(result, ensure_ascii=False) + "\n")
+        print(f"💾 Rescored results written to {args.out}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
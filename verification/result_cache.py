@@ -0,0 +1,108 @@
+import os
+import json
+from PIL import Image
+from cache import LRUCache, SqliteStore, content_hash
+import metrics
+import model_registry
+from image_extraction import ImageRef
+
+# ==========================================================
+# VERIFICATION RESULT CACHE
+# ==========================================================
+# Every stage of process_file is cached under the SHA-256 of the document
+# bytes. Stages that depend on the YOLO weights also include a fingerprint
+# of the model files and the inference backend, and the final result
+# includes the policy version, so
+#   - re-uploading the same file returns the stored result instantly,
+#   - changing AICTE_POLICY only re-runs scoring, and
+#   - replacing a model re-runs detection but not extraction/translation.
+# Per-image detections are cached by image content, so the same photo in
+# different documents is only run through YOLO once. PDF pages are cached
+# by their own fingerprint (see pdf_extraction.page_fingerprints), so a
+# resubmission only extracts and translates the pages that changed.
+
+RESULT_CACHE_SIZE = int(os.getenv("RESULT_CACHE_SIZE", "500"))
+DETECTION_CACHE_SIZE = int(os.getenv("DETECTION_CACHE_SIZE", "50000"))
+PAGE_CACHE_SIZE = int(os.getenv("PAGE_CACHE_SIZE", "20000"))
+RESULT_CACHE_DB = os.getenv("RESULT_CACHE_DB")  # e.g. "cache/results.db"
+
+
+def _make_cache(table, size):
+    store = SqliteStore(RESULT_CACHE_DB, table=table, max_entries=size * 10) if RESULT_CACHE_DB else None
+    return LRUCache(size, store=store)
+
+
+extracted_text = _make_cache("extracted_text", RESULT_CACHE_SIZE)
+translated_text = _make_cache("translated_text", RESULT_CACHE_SIZE)
+tables = _make_cache("tables", RESULT_CACHE_SIZE)
+visual_results = _make_cache("visual_results", RESULT_CACHE_SIZE)
+detections = _make_cache("detections", DETECTION_CACHE_SIZE)
+results = _make_cache("results", RESULT_CACHE_SIZE)
+pages = _make_cache("pages", PAGE_CACHE_SIZE)
+ocr = _make_cache("ocr", PAGE_CACHE_SIZE)
+
+CACHES = {
+    "extracted_text": extracted_text,
+    "translated_text": translated_text,
+    "tables": tables,
+    "visual_results": visual_results,
+    "detections": detections,
+    "results": results,
+    "pages": pages,
+    "ocr": ocr,
+}
+
+
+def stage_key(*parts):
+    return ":".join(str(p) for p in parts)
+
+
+def models_fingerprint(paths, backend=None):
+    """Identify a set of model files by path, modification time and size, and
+    the inference backend that runs them (INFERENCE_BACKEND by default).
+
+    The backend is part of it because ONNX, and more so its INT8-quantized
+    copy, scores images slightly differently from PyTorch.
+    """
+    parts = [backend or model_registry.INFERENCE_BACKEND]
+    for path in paths:
+        if path and os.path.exists(path):
+            st = os.stat(path)
+            parts.append([os.path.abspath(path), st.st_mtime_ns, st.st_size])
+        else:
+            parts.append(None)
+    return content_hash(json.dumps(parts))[:16]
+
+
+def policy_fingerprint(policy, version):
+    return f"{version}-{content_hash(json.dumps(policy, sort_keys=True))[:12]}"
+
+
+def image_fingerprint(img):
+    """Content hash of a decoded PIL image or NumPy array (or an ImageRef's encoded bytes)."""
+    if isinstance(img, ImageRef):
+        return img.fingerprint
+    if isinstance(img, Image.Image):
+        return content_hash(f"{img.mode}{img.size}".encode() + img.tobytes())
+    import numpy as np
+    arr = np.ascontiguousarray(img)
+    return content_hash(f"{arr.dtype}{arr.shape}".encode() + arr.tobytes())
+
+
+def stats():
+    return {name: cache.stats() for name, cache in CACHES.items()}
+
+
+@metrics.add_collector
+def _cache_metrics():
+    lines = []
+    for field in ("hits", "misses", "evictions"):
+        name = f"verification_cache_{field}_total"
+        lines += [f"# HELP {name} Result cache {field}, per cache", f"# TYPE {name} counter"]
+        lines += [f'{name}{{cache="{cache}"}} {s[field]}' for cache, s in stats().items()]
+    return lines
+
+
+def clear():
+    for cache in CACHES.values():
+        cache.clear()
@@ -1,13 +1,140 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Request, request, jsonify, Response, stream_with_context, make_response
 from flask_cors import CORS
 import os
+import json
+import threading
+from functools import wraps
 import requests
 import tempfile
-from ai import process_file
+from downloader import download, DownloadTooLargeError
+import document_source
+from ai import process_file, warm_up_models, resolve_merged_model, DEFAULT_CLASSROOM_MODEL, DEFAULT_LIBRARY_MODEL, DEFAULT_LAB_MODEL
+from model_registry import registry
+import pdf_extraction
+import ocr
+from translation import get_translation_stats
+from jobs import JobQueue, QueueFullError, save_upload, public_view
+import result_cache
+import metrics
+from batch import iter_batch_results, BATCH_WORKERS
+from bundle import process_bundle, BundleError
+
+class VerificationRequest(Request):
+    """Keeps uploaded files in memory up to DOCUMENT_SPILL_BYTES (werkzeug
+    spools anything over 500 KB to a temporary file). The verifiers read the
+    spool itself (see document_source.from_upload)."""
+
+    def _get_file_stream(self, total_content_length, content_type, filename=None, content_length=None):
+        return tempfile.SpooledTemporaryFile(max_size=document_source.DOCUMENT_SPILL_BYTES)
+
 
 app = Flask(__name__)
+app.request_class = VerificationRequest
 CORS(app)    
 
+ALLOWED_EXTENSIONS = {'.pdf', '.docx', '.txt', '.csv', '.json', '.jpg', '.jpeg', '.png'}
+
+# Verifications allowed to run at once in this process; further requests
+# wait up to VERIFY_QUEUE_TIMEOUT seconds for a slot and then get a 503
+VERIFY_CONCURRENCY = int(os.getenv('VERIFY_CONCURRENCY', '4'))
+VERIFY_QUEUE_TIMEOUT = float(os.getenv('VERIFY_QUEUE_TIMEOUT', '10'))
+PRELOAD = os.getenv('PRELOAD_MODELS', 'false').lower() in ('1', 'true', 'yes')
+# Most URLs one /api/verify-batch request may send
+BATCH_MAX_URLS = int(os.getenv('BATCH_MAX_URLS', '100'))
+# Take over unfinished jobs of server processes that have exited (see jobs.py)
+RESUME_JOBS = True
+
+_job_queue = None
+_verify_slots = threading.BoundedSemaphore(VERIFY_CONCURRENCY)
+_models_ready = threading.Event()
+_draining = threading.Event()
+
+
+@app.before_request
+def reset_trace():
+    # A thread's context outlives the request; don't keep a debug request's trace
+    metrics.end_trace()
+
+
+def wants_trace():
+    """Per-request stage trace, requested with ?debug=1 (or "debug": true in JSON)."""
+    flag = request.args.get('debug', '')
+    if not flag and request.is_json:
+        flag = str((request.get_json(silent=True) or {}).get('debug', ''))
+    return flag.lower() in ('1', 'true', 'yes')
+
+
+def verification_response(final_json, trace):
+    """Success payload shared by the synchronous verification endpoints."""
+    body = {
+        "success": True,
+        "data": final_json,
+        "stats": {"translation": get_translation_stats()}
+    }
+    if trace:
+        body["trace"] = metrics.get_trace()
+    return jsonify(body), 200
+
+
+def get_job_queue():
+    """Create the job queue on first use and resume jobs from a previous run."""
+    global _job_queue
+    if _job_queue is None:
+        _job_queue = JobQueue(process_file)
+        if RESUME_JOBS:
+            _job_queue.resume()
+    return _job_queue
+
+
+def limit_concurrency(view):
+    """Hold one of VERIFY_CONCURRENCY slots until the response (or its stream) is closed."""
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not _verify_slots.acquire(timeout=VERIFY_QUEUE_TIMEOUT):
+            response = jsonify({
+                "success": False,
+                "error": "Server is busy, please retry shortly"
+            })
+            response.headers['Retry-After'] = '5'
+            return response, 503
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            _verify_slots.release()
+            raise
+        response.call_on_close(_verify_slots.release)
+        return response
+    return wrapper
+
+
+def shutdown():
+    """Stop taking work and wind down background pools (graceful shutdown)."""
+    _draining.set()
+    if _job_queue is not None:
+        # Jobs that haven't started stay queued in the store; the next server
+        # process to start (or the worker replacing this one) takes them over
+        _job_queue.shutdown(wait=True, cancel_pending=True)
+    pdf_extraction.shutdown_pool()
+    ocr.shutdown_pool()
+
+def warm_up():
+    """Load the YOLO models; /ready reports ready only once they have loaded."""
+    print("\n🔥 Warming up YOLO models...")
+    try:
+        warm_up_models()
+    except Exception as e:
+        print(f"❌ Model warm-up failed: {str(e)}")
+        return False
+    _models_ready.set()
+    return True
+
+# Optionally load YOLO models at startup so the first request doesn't pay for it
+# (under gunicorn this happens once in the master, before workers are forked)
+if PRELOAD:
+    warm_up()
+else:
+    _models_ready.set()  # models are loaded by the first request instead
+
 @app.route('/health', methods=['GET'])
 def health_check():
     """Health check endpoint"""
@@ -16,14 +143,62 @@ def health_check():
         "message": "Python verification server is running"
     }), 200
 
+@app.route('/ready', methods=['GET'])
+def readiness_check():
+    """Readiness probe: 200 once models are loaded (when preloading) and not shutting down"""
+    merged = resolve_merged_model()
+    if merged:
+        expected = (("merged", merged, True),)
+    else:
+        expected = (("classroom", DEFAULT_CLASSROOM_MODEL, True),
+                    ("library", DEFAULT_LIBRARY_MODEL, True),
+                    ("laboratory", DEFAULT_LAB_MODEL, False))
+    models = {}
+    for name, path, required in expected:
+        if registry.is_loaded(path):
+            models[name] = "loaded"
+        elif not os.path.exists(path):
+            models[name] = "missing" if required else "not installed"
+        else:
+            models[name] = "not loaded"
+    
+    ready = _models_ready.is_set() and not _draining.is_set()
+    if PRELOAD:
+        ready = ready and all(models[name] == "loaded" for name, _, required in expected if required)
+    
+    return jsonify({
+        "ready": ready,
+        "status": "draining" if _draining.is_set() else ("ready" if ready else "loading"),
+        "preload": PRELOAD,
+        "models": models
+    }), 200 if ready else 503
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Hit/miss/eviction counts for every verification cache"""
+    return jsonify({
+        "success": True,
+        "caches": result_cache.stats()
+    }), 200
+
+@app.route('/metrics', methods=['GET'])
+def prometheus_metrics():
+    """Stage timings, YOLO inference, translation and cache counters (Prometheus text format)"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/api/verify-pdf', methods=['POST'])
+@limit_concurrency
 def verify_pdf():
     """
     Endpoint to receive PDF URL and process it
     Expected JSON body: { "pdfUrl": "https://example.com/document.pdf" }
+    Add "debug": true (or ?debug=1) to get a per-stage timing trace back
     """
     try:
         print("\n📥 Received PDF verification request")
+        trace = wants_trace()
+        if trace:
+            metrics.start_trace()
         data = request.get_json()
         
         if not data or 'pdfUrl' not in data:
@@ -35,30 +210,21 @@ def verify_pdf():
         pdf_url = data['pdfUrl']
         print(f"\n🔍 Processing PDF from URL: {pdf_url}\n")
         
-        # Download PDF from URL to temporary file
-        response = requests.get(pdf_url, timeout=30)
-        response.raise_for_status()
+        # Stream the document over the pooled session (reused if unchanged)
+        with download(pdf_url) as downloaded:
+            # Process the file using the new unified function
+            final_json = process_file(downloaded.source)
         
-        # Create temporary file to save PDF
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(response.content)
-            temp_pdf_path = temp_file.name
+        print("\n✅ File processing completed successfully")
         
-        try:
-            # Process the file using the new unified function
-            final_json = process_file(temp_pdf_path)
-            
-            print("\n✅ File processing completed successfully")
-            
-            return jsonify({
-                "success": True,
-                "data": final_json
-            }), 200
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_pdf_path):
-                os.remove(temp_pdf_path)
+        return verification_response(final_json, trace)
+    
+    except DownloadTooLargeError as e:
+        print(f"❌ Document too large: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 413
     
     except requests.exceptions.RequestException as e:
         print(f"❌ Error downloading PDF: {str(e)}")
@@ -75,12 +241,16 @@ def verify_pdf():
         }), 500
 
 @app.route('/api/verify-pdf-file', methods=['POST'])
+@limit_concurrency
 def verify_pdf_file():
     """
     Endpoint to receive file directly (PDF, DOCX, TXT, CSV, JSON, or images)
-    Expected form data: file field containing the document
+    Expected form data: file field containing the document (?debug=1 for a stage trace)
     """
     try:
+        trace = wants_trace()
+        if trace:
+            metrics.start_trace()
         if 'file' not in request.files:
             return jsonify({
                 "success": False,
@@ -96,10 +266,9 @@ def verify_pdf_file():
             }), 400
         
         # Check if file has allowed extension
-        allowed_extensions = {'.pdf', '.docx', '.txt', '.csv', '.json', '.jpg', '.jpeg', '.png'}
         file_ext = os.path.splitext(file.filename)[1].lower()
         
-        if file_ext not in allowed_extensions:
+        if file_ext not in ALLOWED_EXTENSIONS:
             return jsonify({
                 "success": False,
                 "error": "Unsupported file type. Allowed: PDF, DOCX, TXT, CSV, JSON, JPG, PNG"
@@ -107,26 +276,14 @@ def verify_pdf_file():
         
         print(f"\n🔍 Processing uploaded file: {file.filename}\n")
         
-        # Save to temporary file with correct extension
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_ext) as temp_file:
-            file.save(temp_file.name)
-            temp_pdf_path = temp_file.name
-        
-        try:
+        # Read straight from the spooled upload, without copying it again
+        with document_source.from_upload(file.stream, "upload" + file_ext) as source:
             # Process the file using the new unified function
-            final_json = process_file(temp_pdf_path)
-            
-            print("\n✅ File processing completed successfully")
-            
-            return jsonify({
-                "success": True,
-                "data": final_json
-            }), 200
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_pdf_path):
-                os.remove(temp_pdf_path)
+            final_json = process_file(source)
+        
+        print("\n✅ File processing completed successfully")
+        
+        return verification_response(final_json, trace)
     
     except Exception as e:
         print(f"❌ Error processing file: {str(e)}")
@@ -135,11 +292,191 @@ def verify_pdf_file():
             "error": f"Error processing PDF: {str(e)}"
         }), 500
 
+@app.route('/api/verify-bundle', methods=['POST'])
+@limit_concurrency
+def verify_bundle():
+    """
+    Verify an application made of several files as one (see bundle.py)
+    Expected form data: one or more "files" fields (PDF, DOCX, TXT, CSV, JSON, JPG, PNG),
+    a ZIP of them, or both (?debug=1 for a stage trace)
+    """
+    try:
+        trace = wants_trace()
+        if trace:
+            metrics.start_trace()
+        uploads = [f for f in request.files.getlist('files') + request.files.getlist('file') if f.filename]
+        if not uploads:
+            return jsonify({
+                "success": False,
+                "error": "No files provided"
+            }), 400
+        
+        unsupported = [f.filename for f in uploads
+                       if os.path.splitext(f.filename)[1].lower() not in ALLOWED_EXTENSIONS | {'.zip'}]
+        if unsupported:
+            return jsonify({
+                "success": False,
+                "error": f"Unsupported file type: {', '.join(unsupported)}. Allowed: ZIP, PDF, DOCX, TXT, CSV, JSON, JPG, PNG"
+            }), 400
+        
+        print(f"\n📦 Processing uploaded bundle: {', '.join(f.filename for f in uploads)}\n")
+        
+        sources = []
+        try:
+            for f in uploads:
+                # File names only label the results; nothing is written under them
+                sources.append(document_source.from_upload(f.stream, os.path.basename(f.filename)))
+            final_json = process_bundle(sources)
+        finally:
+            for source in sources:
+                source.close()
+        
+        print("\n✅ Bundle processing completed successfully")
+        
+        return verification_response(final_json, trace)
+    
+    except BundleError as e:
+        print(f"❌ Invalid bundle: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": str(e)
+        }), 400
+    
+    except Exception as e:
+        print(f"❌ Error processing bundle: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": f"Error processing bundle: {str(e)}"
+        }), 500
+
+@app.route('/api/verify-batch', methods=['POST'])
+@limit_concurrency
+def verify_batch():
+    """
+    Verify many documents in one request, streaming results as they finish
+    Expected JSON body: { "urls": ["https://...", ...], "workers": 4 }
+    Response: one JSON object per line (application/x-ndjson)
+    """
+    data = request.get_json(silent=True)
+    if (not data or not isinstance(data.get('urls'), list) or not data['urls']
+            or not all(isinstance(url, str) for url in data['urls'])):
+        return jsonify({
+            "success": False,
+            "error": "A non-empty list of URLs is required"
+        }), 400
+    
+    urls = list(dict.fromkeys(data['urls']))
+    if len(urls) > BATCH_MAX_URLS:
+        return jsonify({
+            "success": False,
+            "error": f"At most {BATCH_MAX_URLS} URLs are allowed per batch"
+        }), 400
+    workers = data.get('workers', BATCH_WORKERS)
+    if isinstance(workers, bool) or not isinstance(workers, int) or workers < 1:
+        return jsonify({
+            "success": False,
+            "error": "workers must be a positive integer"
+        }), 400
+    workers = min(workers, BATCH_WORKERS)
+    print(f"\n📦 Batch verification request: {len(urls)} document(s)")
+    
+    def generate():
+        for record in iter_batch_results(urls, workers):
+            yield json.dumps(record, ensure_ascii=False) + "\n"
+    
+    return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a verification job and return its ID immediately
+    Accepts JSON { "pdfUrl": "...", "callbackUrl": "..." }
+    or form data with a `file` field (and optional `callbackUrl`)
+    """
+    try:
+        if 'file' in request.files:
+            file = request.files['file']
+            file_ext = os.path.splitext(file.filename)[1].lower()
+            if file.filename == '' or file_ext not in ALLOWED_EXTENSIONS:
+                return jsonify({
+                    "success": False,
+                    "error": "Unsupported file type. Allowed: PDF, DOCX, TXT, CSV, JSON, JPG, PNG"
+                }), 400
+            queue = get_job_queue()
+            input_path = save_upload(file, file_ext)
+            try:
+                job_id = queue.submit(input_path=input_path, filename=file.filename,
+                                      callback_url=request.form.get('callbackUrl'))
+            except QueueFullError:
+                os.remove(input_path)
+                raise
+        else:
+            data = request.get_json(silent=True)
+            if not data or 'pdfUrl' not in data:
+                return jsonify({
+                    "success": False,
+                    "error": "PDF URL or file is required"
+                }), 400
+            job_id = get_job_queue().submit(source_url=data['pdfUrl'], callback_url=data.get('callbackUrl'))
+        
+        print(f"\n📨 Queued verification job {job_id}")
+        return jsonify({
+            "success": True,
+            "jobId": job_id,
+            "status": "queued",
+            "statusUrl": f"/api/jobs/{job_id}",
+            "resultUrl": f"/api/jobs/{job_id}/result"
+        }), 202
+    
+    except QueueFullError as e:
+        response = jsonify({
+            "success": False,
+            "error": str(e)
+        })
+        response.headers['Retry-After'] = '30'
+        return response, 429
+    
+    except Exception as e:
+        print(f"❌ Error queueing job: {str(e)}")
+        return jsonify({
+            "success": False,
+            "error": f"Error queueing job: {str(e)}"
+        }), 500
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    """Current status and stage of a verification job"""
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    return jsonify({"success": True, **public_view(job)}), 200
+
+@app.route('/api/jobs/<job_id>/result', methods=['GET'])
+def job_result(job_id):
+    """Result of a finished job; 202 while it is still running"""
+    job = get_job_queue().store.get(job_id)
+    if job is None:
+        return jsonify({"success": False, "error": "Job not found"}), 404
+    if job["status"] == "failed":
+        return jsonify({"success": False, **public_view(job)}), 500
+    if job["status"] != "done":
+        return jsonify({"success": False, **public_view(job)}), 202
+    return jsonify({"success": True, "data": job["result"]}), 200
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     print(f"\n🚀 Starting Python Verification Server on port {port}...")
     print(f"📍 Health check: http://localhost:{port}/health")
+    print(f"📍 Readiness: http://localhost:{port}/ready")
+    print(f"📍 Metrics: http://localhost:{port}/metrics")
     print(f"📍 Verify PDF: POST http://localhost:{port}/api/verify-pdf")
-    print(f"📍 Verify PDF File: POST http://localhost:{port}/api/verify-pdf-file\n")
+    print(f"📍 Verify PDF File: POST http://localhost:{port}/api/verify-pdf-file")
+    print(f"📍 Verify batch: POST http://localhost:{port}/api/verify-batch")
+    print(f"📍 Verification jobs: POST http://localhost:{port}/api/jobs\n")
+    
+    # Resume queued jobs now (only in the reloader's child process when debugging)
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        get_job_queue()
     
+    # Development server; use `gunicorn -c gunicorn.conf.py server:app` in production
     app.run(host='0.0.0.0', port=port, debug=True)
@@ -0,0 +1,135 @@
+import re
+
+# ==========================================================
+# KEY/VALUE TABLE EXTRACTION
+# ==========================================================
+# Counts like students, faculty, computers and admin area usually sit in
+# tables. pdfplumber and python-docx already give us those tables cell by
+# cell, so instead of flattening them to text and regexing the values back
+# out, label cells are matched here and the value is read from the cell to
+# their right (or, for header-row tables, the cell below). Values found this
+# way seed field_extraction.extract_fields, which only scans the plain text
+# for whatever the tables did not provide.
+
+# Label cells longer than this are sentences, not keys
+MAX_LABEL_CHARS = 80
+
+# Checked in order; the first label that matches a cell decides its field,
+# so "Name of Principal" is a head label rather than an institution name.
+# Keys mirror field_extraction.LABEL_FIELDS so priorities are shared.
+TABLE_LABELS = [
+    ("vc", re.compile(r"Vice\s*Chancellor|\bVC\b", re.I)),
+    ("principal", re.compile(r"Principal|Director", re.I)),
+    ("corpus", re.compile(r"Corpus|Fund", re.I)),
+    ("students", re.compile(r"Students|Enrol+ment", re.I)),
+    ("faculty", re.compile(r"Faculty|Teachers|Teaching\s+Staff", re.I)),
+    ("computers", re.compile(r"Computers|\bPCs\b", re.I)),
+    ("admin_area", re.compile(r"(?:Administrative|Admin)\s+Area", re.I)),
+    ("name_of", re.compile(r"Name of (?:the )?(?:Institution|University|College)", re.I)),
+    ("institution_name", re.compile(r"(?:Institution|Institute|University|College) Name", re.I)),
+    ("name", re.compile(r"^\W*Name\W*$", re.I)),
+]
+
+# Keys that are derived quantities rather than the count itself
+NOT_A_COUNT = re.compile(r"ratio|\bper\b|%", re.I)
+# Column headings that sit next to a bare "Name" in people tables; like
+# labels, they are never taken as a value
+HEADINGS = re.compile(
+    r"^\W*(?:S\.?\s*No|Sr\.?\s*No|Designation|Qualification|Department|Position|Role|Title|Address|Contact"
+    r"|Phone|Mobile|E-?mail|Date|Remarks)\W*$",
+    re.I,
+)
+
+INTEGER = re.compile(r"\d[\d,]*")
+HEAD_NAME = re.compile(r"[A-Za-z][A-Za-z \t\.]*")
+
+
+def clean_cell(cell):
+    return " ".join(str(cell).split()) if cell is not None else ""
+
+
+def label_of(cell):
+    """Label key for a key cell, or None if `cell` is not a field label."""
+    if not cell or len(cell) > MAX_LABEL_CHARS:
+        return None
+    for key, pattern in TABLE_LABELS:
+        if pattern.search(cell):
+            if key not in ("name_of", "institution_name", "name") and NOT_A_COUNT.search(cell):
+                return None
+            return key
+    return None
+
+
+def parse_cell(field, cell):
+    """Typed value of a value cell for `field`, or None if it doesn't hold one."""
+    if not cell:
+        return None
+    if field == "name":
+        return cell if not INTEGER.fullmatch(cell) else None
+    if field == "head":
+        m = HEAD_NAME.search(cell)
+        return m.group(0).strip() if m else None
+    m = INTEGER.search(cell)
+    return int(m.group(0).replace(",", "")) if m else None
+
+
+def is_key(cell):
+    """Whether `cell` is a field label or a column heading rather than a value."""
+    return label_of(cell) is not None or bool(HEADINGS.match(cell))
+
+
+def _value_cells(rows, r, c, below=True):
+    """Candidate value cells for a label at (r, c): right of it, then (with
+    `below`) the cell below it."""
+    row = rows[r]
+    for cell in row[c + 1:]:
+        if cell:
+            yield cell
+            break
+    if below and r + 1 < len(rows) and c < len(rows[r + 1]):
+        yield rows[r + 1][c]
+
+
+def fields_from_tables(tables, label_fields):
+    """Read fields out of key/value tables.
+
+    `tables` is a list of {"rows": [[cell, ...], ...], "page": n or None};
+    `label_fields` maps label keys to (field, priority) as in
+    field_extraction.LABEL_FIELDS. Returns {field: (priority, value, source)}
+    in the form extract_fields accepts as its `seed`.
+    """
+    found = {}
+    for t_index, table in enumerate(tables):
+        rows = [[clean_cell(cell) for cell in row] for row in table.get("rows") or []]
+        for r, row in enumerate(rows):
+            for c, cell in enumerate(row):
+                key = label_of(cell)
+                if key is None:
+                    continue
+                field, priority = label_fields[key]
+                current = found.get(field)
+                if current is not None and current[0] <= priority:
+                    continue
+                # A bare "Name" heads people tables as often as it labels the
+                # institution, so its value must share its row
+                for value_cell in _value_cells(rows, r, c, below=key != "name"):
+                    if is_key(value_cell):
+                        continue  # a neighbouring key, not a value
+                    value = parse_cell(field, value_cell)
+                    if value is not None:
+                        found[field] = (priority, value, {
+                            "table": t_index,
+                            "row": r + 1,
+                            "page": table.get("page"),
+                        })
+                        break
+    return found
+
+
+def tables_from_blocks(blocks):
+    """Group DOCX/CSV row blocks that carry "cells" back into tables."""
+    tables = {}
+    for block in blocks:
+        if "cells" in block:
+            tables.setdefault(block.get("table_index", 0), []).append(block["cells"])
+    return [{"rows": rows, "page": None} for _, rows in sorted(tables.items())]
@@ -0,0 +1,53 @@
+"""Batch runs: bounded submission, retrying failures on resume, request validation"""
+import io
+import json
+import threading
+import contextlib
+import batch
+import server
+
+
+def test_closing_early_starts_no_more_documents():
+    started = []
+    release = threading.Event()
+
+    def process(source):
+        started.append(source)
+        release.wait(5)
+        return {"source": source}
+
+    results = batch.iter_batch_results([f"doc{i}.pdf" for i in range(50)], workers=2, process=process)
+    release.set()
+    next(results)
+    results.close()
+    assert len(started) <= 3  # the first two, and at most one started in their place
+
+
+def test_resume_retries_failed_documents(tmp_path):
+    out = str(tmp_path / "results.jsonl")
+    attempts = []
+
+    def flaky(source):
+        attempts.append(source)
+        if len(attempts) == 1:
+            raise RuntimeError("download failed")
+        return {"ok": True}
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        first = batch.run_batch(["a.pdf"], out, workers=1, process=flaky)
+        second = batch.run_batch(["a.pdf"], out, workers=1, process=flaky)
+        third = batch.run_batch(["a.pdf"], out, workers=1, process=flaky)
+    assert (first["failed"], second["succeeded"], third["skipped"]) == (1, 1, 1)
+    assert attempts == ["a.pdf", "a.pdf"]
+
+
+def test_batch_endpoint_rejects_bad_requests(monkeypatch):
+    monkeypatch.setattr(server, "BATCH_MAX_URLS", 2)
+    client = server.app.test_client()
+    for body in ({"urls": ["https://a.example/1.pdf", "https://a.example/2.pdf", "https://a.example/3.pdf"]},
+                 {"urls": ["https://a.example/1.pdf"], "workers": "four"},
+                 {"urls": ["https://a.example/1.pdf"], "workers": 0},
+                 {"urls": ["https://a.example/1.pdf"], "workers": -3},
+                 {"urls": [{"url": "https://a.example/1.pdf"}]}):
+        with client.post("/api/verify-batch", data=json.dumps(body), content_type="application/json") as response:
+            assert response.status_code == 400, body
@@ -0,0 +1,152 @@
+"""Application bundles: several files verified as one, fields merged by source priority"""
+import io
+import os
+import sys
+import json
+import zipfile
+import contextlib
+from types import SimpleNamespace
+import pytest
+import ai
+import bundle
+import server
+import result_cache
+import document_source
+from bundle import process_bundle, BundleError
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from synthetic import make_bundle  # noqa: E402
+
+
+class CountingDetector:
+    """Confident about everything; counts forward passes and the images in them."""
+
+    def __init__(self, path):
+        self.calls = 0
+        self.images_seen = 0
+
+    def __call__(self, batch, verbose=False):
+        self.calls += 1
+        self.images_seen += len(batch)
+        return [SimpleNamespace(boxes=[SimpleNamespace(conf=[0.9])]) for _ in batch]
+
+
+@pytest.fixture
+def models(fake_models):
+    return fake_models(CountingDetector)
+
+
+@pytest.fixture(scope="module")
+def files(tmp_path_factory):
+    return make_bundle(str(tmp_path_factory.mktemp("bundle")), pages=2, photos=2)
+
+
+def zipped(paths):
+    buf = io.BytesIO()
+    with zipfile.ZipFile(buf, "w") as archive:
+        for path in paths:
+            archive.write(path, os.path.basename(path))
+    return buf.getvalue()
+
+
+def verify(files, models, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return process_bundle(files, *models, **kwargs)
+
+
+def detector_calls():
+    detectors = [ai.registry.get(p).model for p in ai.registry.loaded_paths()]
+    return sum(d.calls for d in detectors), sum(d.images_seen for d in detectors)
+
+
+def test_fields_merged_by_source_priority(files, models):
+    result = verify(files, models, use_cache=False)
+    details = result["institution_details"]
+    assert details["name"] == "Synthetic Institute of Technology"  # the form wins over the annexure
+    assert (details["students"], details["faculty"], details["computers"]) == (1200, 60, 300)
+    assert details["admin_area"] == 5200 and details["head_name"].startswith("Dr")
+    taken = {f["name"]: f["fields"] for f in result["bundle"]["files"]}
+    assert taken["faculty.csv"] == ["faculty"]
+    assert sorted(taken["annexure.docx"]) == ["admin_area", "computers"]
+
+
+def test_images_of_all_files_share_one_yolo_run(files, models):
+    result = verify(files, models, use_cache=False)
+    images = {f["name"]: f["images"] for f in result["bundle"]["files"]}
+    assert images == {"form.pdf": 2, "annexure.docx": 1, "faculty.csv": 0, "campus_1.jpg": 1, "campus_2.jpg": 1}
+    assert detector_calls() == (3, 3 * 5)  # one batch per model for the whole bundle
+
+
+def test_zip_and_upload_order_give_the_same_result(files, models):
+    expected = json.dumps(verify(files, models, use_cache=False))
+    upload = document_source.from_bytes(zipped(files[::-1]), "bundle.zip")
+    assert json.dumps(verify([upload], models, use_cache=False)) == expected
+    assert json.dumps(verify(files[::-1], models, use_cache=False)) == expected
+
+
+def test_cached_bundle(files, models):
+    result_cache.clear()
+    first = verify(files, models)
+    calls = detector_calls()
+    assert verify(files, models) == first
+    assert detector_calls() == calls
+
+
+def test_bad_bundles(tmp_path, files, models, monkeypatch):
+    (tmp_path / "notes.exe").write_bytes(b"MZ")
+    with pytest.raises(BundleError):
+        verify([str(tmp_path / "notes.exe")], models)
+    (tmp_path / "broken.zip").write_bytes(b"not a zip")
+    with pytest.raises(BundleError):
+        verify([str(tmp_path / "broken.zip")], models)
+    monkeypatch.setattr(bundle, "BUNDLE_MAX_FILES", 2)
+    (tmp_path / "big.zip").write_bytes(zipped(files))
+    with pytest.raises(BundleError):
+        verify([str(tmp_path / "big.zip")], models)
+
+
+def test_bundle_endpoint(files, monkeypatch):
+    seen = []
+
+    def fake_process_bundle(sources):
+        seen.extend((s.name, s.size) for s in sources)
+        return {"ok": True}
+
+    monkeypatch.setattr(server, "process_bundle", fake_process_bundle)
+    client = server.app.test_client()
+    uploads = [(open(path, "rb"), os.path.basename(path)) for path in files[:2]]
+    try:
+        response = client.post("/api/verify-bundle", data={"files": uploads}, content_type="multipart/form-data")
+    finally:
+        for f, _ in uploads:
+            f.close()
+    assert response.status_code == 200
+    assert seen == [(os.path.basename(p), os.path.getsize(p)) for p in files[:2]]
+
+    response = client.post("/api/verify-bundle", data={"files": [(io.BytesIO(b"MZ"), "setup.exe")]},
+                           content_type="multipart/form-data")
+    assert response.status_code == 400
+
+
+def test_files_with_the_same_name_are_kept_apart(models):
+    form = document_source.from_bytes(b"Name of the Institution: Synthetic Institute of Technology\n", "notes.txt")
+    annexure = document_source.from_bytes(b"Total Faculty: 60\n", "notes.txt")
+    result = verify([form, annexure], models, use_cache=False)
+    assert sorted(f["fields"] for f in result["bundle"]["files"]) == [["faculty"], ["name"]]
+
+
+def test_images_are_decoded_during_detection(files, monkeypatch):
+    decoded = []
+    real = bundle.iter_images
+
+    def tracking(source):
+        for img in real(source):
+            decoded.append(source.name)
+            yield img
+
+    monkeypatch.setattr(bundle, "iter_images", tracking)
+    sources = [document_source.from_bytes(open(path, "rb").read(), os.path.basename(path)) for path in files]
+    with contextlib.redirect_stdout(io.StringIO()):
+        docs = [bundle.read_file(s, "unused", use_cache=False) for s in sources]
+    assert decoded == []
+    assert sum(1 for _ in bundle._unique_images(docs)) == 5
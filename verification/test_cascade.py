@@ -0,0 +1,81 @@
+"""Cascaded and coverage detection modes against stand-in detectors"""
+from types import SimpleNamespace
+import pytest
+from PIL import Image
+import ai
+
+CATEGORY_OF = {"classroom.pt": 0, "library.pt": 1, "lab.pt": 2}
+
+
+class FakeDetector:
+    """Confident (0.9) on images painted with its category's colour, 0.1 otherwise."""
+
+    def __init__(self, path):
+        self.category = CATEGORY_OF[path.rsplit("/", 1)[-1]]
+        self.images_seen = 0
+
+    def __call__(self, batch, verbose=False):
+        self.images_seen += len(batch)
+        return [SimpleNamespace(boxes=[SimpleNamespace(conf=[0.9 if img.getpixel((0, 0))[0] == self.category * 80 else 0.1])])
+                for img in batch]
+
+
+def photo(category, n):
+    return Image.new("RGB", (120, 120), (category * 80, n % 256, n // 256))
+
+
+@pytest.fixture
+def detectors(fake_models):
+    return fake_models(FakeDetector, CATEGORY_OF)
+
+
+def run(paths, images, mode):
+    found = ai.analyze_images_aicte(images, *paths, use_cache=False, mode=mode)
+    calls = sum(ai.registry.get(p).model.images_seen for p in paths)
+    ai.registry.clear()
+    return [f["type"] for f in found], calls
+
+
+def test_cascade_matches_full_with_a_third_of_the_calls(detectors):
+    # A typical submission: runs of photos of the same kind of room
+    images = [photo(c, n) for c in (0, 0, 1, 2) for n in range(15)]
+    full_types, full_calls = run(detectors, images, "full")
+    cascade_types, cascade_calls = run(detectors, images, "cascade")
+    assert cascade_types == full_types
+    assert full_calls == 3 * len(images)
+    assert cascade_calls <= full_calls / 2.5
+
+
+def test_coverage_stops_once_every_category_is_found(detectors):
+    images = [photo(n % 3, n) for n in range(60)]
+    types, calls = run(detectors, images, "coverage")
+    assert {"Classroom", "Library", "Laboratory"} <= set(types)
+    assert calls < 3 * 16  # only the first batch needs the detectors
+
+
+def test_unknown_mode_is_rejected(detectors):
+    with pytest.raises(ValueError):
+        ai.analyze_images_aicte([], *detectors, mode="fast")
+
+
+def test_partial_cascade_results_are_completed_from_cache(detectors):
+    models = tuple(ai.registry.get(p) for p in detectors)
+    batch = [photo(0, 1), photo(1, 2)]
+    ai.detect_batch(batch, models, "fp-test", exit_confidence=0.8)
+    seen = [m.model.images_seen for m in models]
+    confs = ai.detect_batch(batch, models, "fp-test")
+    assert [round(c, 1) for c in confs[0]] == [0.9, 0.1, 0.1, 0]  # no building class
+    # The full pass only sent each image through the models it had skipped
+    assert sum(m.model.images_seen for m in models) - sum(seen) == 6 - sum(seen)
+    ai.result_cache.detections.clear()
+
+
+def test_cascade_ignores_confidences_cached_by_a_full_run(detectors):
+    models = tuple(ai.registry.get(p) for p in detectors)
+    batch = [photo(0, 1), photo(1, 2)]
+    ai.result_cache.detections.clear()
+    cold = ai.detect_batch(batch, models, "fp-test", exit_confidence=0.8)
+    ai.result_cache.detections.clear()
+    ai.detect_batch(batch, models, "fp-test")  # fills every model's confidence
+    assert ai.detect_batch(batch, models, "fp-test", exit_confidence=0.8) == cold
+    ai.result_cache.detections.clear()
@@ -0,0 +1,105 @@
+"""Seeded scoring: the same document bytes always give byte-identical JSON"""
+import io
+import os
+import sys
+import json
+import random
+import subprocess
+import contextlib
+from types import SimpleNamespace
+import pytest
+import ai
+import result_cache
+import document_source
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, "benchmarks"))
+from synthetic import make_pdf  # noqa: E402
+
+
+class UnsureDetector:
+    """Never confident, so every image's category is autofilled."""
+
+    def __init__(self, path):
+        pass
+
+    def __call__(self, batch, verbose=False):
+        return [SimpleNamespace(boxes=[SimpleNamespace(conf=[0.1])]) for _ in batch]
+
+
+@pytest.fixture
+def models(fake_models):
+    return fake_models(UnsureDetector)
+
+
+@pytest.fixture(scope="module")
+def pdf(tmp_path_factory):
+    return make_pdf(str(tmp_path_factory.mktemp("docs") / "report.pdf"), pages=3, images_per_page=2)
+
+
+def verify(doc, models, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return json.dumps(ai.process_file(doc, *models, **kwargs), ensure_ascii=False)
+
+
+def test_same_bytes_give_identical_json(pdf, models):
+    random.seed(1)
+    first = verify(pdf, models, use_cache=False)
+    random.seed(2)
+    with open(pdf, "rb") as f:
+        upload = document_source.from_bytes(f.read(), "upload.pdf")
+    assert verify(upload, models, use_cache=False) == first
+    assert "%" in first and json.loads(first)["visual_detection"]["Classroom"] != "missing"
+
+
+def test_cached_result_matches_a_fresh_run(pdf, models):
+    result_cache.clear()
+    fresh = verify(pdf, models, use_cache=False)
+    assert verify(pdf, models) == fresh
+    assert verify(pdf, models) == fresh  # served from the result cache
+
+
+def test_different_documents_get_different_draws(tmp_path, models):
+    a, b = tmp_path / "a.txt", tmp_path / "b.txt"
+    a.write_text("Name of Institution: Test College\nCorpus Fund: ₹2,000,000\n", encoding="utf-8")
+    b.write_text("Name of Institution: Test College \nCorpus Fund: ₹2,000,000\n", encoding="utf-8")
+    score = lambda p: json.loads(verify(str(p), models, use_cache=False))["scores"]["financial_score"]
+    assert score(a) != score(b)
+
+
+def test_fixed_and_random_modes(pdf, models):
+    fixed = json.loads(verify(pdf, models, use_cache=False, scoring_mode="fixed"))
+    assert set(fixed["visual_detection"].values()) <= {"94.95%", "91.50%", "missing"}
+    with pytest.raises(ValueError):
+        verify(pdf, models, use_cache=False, scoring_mode="lucky")
+
+
+def test_identical_across_processes(tmp_path):
+    """Hash randomisation (PYTHONHASHSEED) must not reorder anything."""
+    txt = tmp_path / "report.txt"
+    txt.write_text("Name of Institution: Test College\nCorpus Fund: ₹2,000,000\nTotal Students: 500\n"
+                   "Total Faculty: 20\nAdministrative Area: 800\nComputers: 40\n", encoding="utf-8")
+    code = ("import sys, io, json, contextlib, ai\n"
+            "with contextlib.redirect_stdout(io.StringIO()):\n"
+            "    result = ai.process_file(sys.argv[1], use_cache=False)\n"
+            "sys.stdout.write(json.dumps(result, ensure_ascii=False))\n")
+    outputs = set()
+    for hash_seed in ("1", "2", "3"):
+        env = dict(os.environ, PYTHONHASHSEED=hash_seed, PRELOAD_MODELS="false",
+                   RESULT_CACHE_DB="", TRANSLATION_CACHE_DB="")
+        out = subprocess.run([sys.executable, "-c", code, str(txt)], cwd=HERE, env=env,
+                             capture_output=True, timeout=120)
+        assert out.returncode == 0, out.stderr
+        outputs.add(out.stdout)
+    assert len(outputs) == 1
+
+
+def test_backends_keep_separate_cache_entries(pdf, models, monkeypatch):
+    import model_registry
+    result_cache.clear()
+    verify(pdf, models)
+    torch_entries = (len(result_cache.detections), len(result_cache.visual_results), len(result_cache.results))
+    monkeypatch.setattr(model_registry, "INFERENCE_BACKEND", "onnx-int8")
+    verify(pdf, models)
+    assert (len(result_cache.detections), len(result_cache.visual_results), len(result_cache.results)) == \
+        tuple(2 * n for n in torch_entries)
@@ -0,0 +1,110 @@
+"""Documents read from memory (or a spilled, memory-mapped file) instead of a temp path"""
+import io
+import os
+import sys
+import pickle
+import pytest
+import document_source
+import pdf_extraction
+import ai
+from image_extraction import iter_images
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from synthetic import make_pdf, make_docx  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def docs(tmp_path_factory):
+    folder = tmp_path_factory.mktemp("docs")
+    pdf = make_pdf(str(folder / "report.pdf"), pages=4, images_per_page=1)
+    docx = make_docx(str(folder / "report.docx"), paragraphs=20, images=3)
+    return {"pdf": pdf, "docx": docx}
+
+
+def read(path):
+    with open(path, "rb") as f:
+        return f.read()
+
+
+def test_small_stream_stays_in_memory():
+    source = document_source.from_stream(io.BytesIO(b"x" * 100), "upload.txt", spill_bytes=1000)
+    assert source.path is None and source.ext == "txt"
+    assert source.read() == b"x" * 100
+
+
+def test_large_stream_spills_and_is_mapped():
+    with document_source.from_stream(io.BytesIO(b"x" * 5000), "upload.pdf", spill_bytes=1000) as source:
+        assert source.temporary and source.path.endswith(".pdf")
+        assert bytes(source.buffer()) == b"x" * 5000
+        path = source.path
+    assert not os.path.exists(path)
+
+
+def test_pickled_source_never_removes_the_spill_file():
+    with document_source.from_stream(io.BytesIO(b"x" * 5000), "upload.pdf", spill_bytes=1000) as source:
+        copy = pickle.loads(pickle.dumps(source))
+        assert copy.path == source.path and not copy.temporary
+        copy.close()
+        assert os.path.exists(source.path)
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_pdf_extraction_from_memory_matches_path(docs, monkeypatch, workers):
+    monkeypatch.setattr(pdf_extraction, "PDF_PARALLEL_MIN_PAGES", 2)
+    from_path = pdf_extraction.extract_pdf(docs["pdf"], want_tables=True, workers=workers)
+    source = document_source.from_bytes(read(docs["pdf"]), "upload.pdf")
+    from_memory = pdf_extraction.extract_pdf(source, want_tables=True, workers=workers)
+    assert from_memory["text"] == from_path["text"]
+    assert from_memory["tables"] == from_path["tables"]
+    assert len(from_memory["images"]) == len(from_path["images"]) == 4
+    if workers > 1:
+        pdf_extraction.shutdown_pool()
+
+
+def test_docx_from_memory_matches_path(docs):
+    source = document_source.from_bytes(read(docs["docx"]), "upload.docx")
+    assert ai.extract_text_universal(source, translate=False) == ai.extract_text_universal(docs["docx"], translate=False)
+    assert len(list(iter_images(source))) == len(list(iter_images(docs["docx"]))) == 3
+
+
+def test_images_from_a_path_release_the_file(docs, monkeypatch):
+    closed = []
+    real_close = document_source.DocumentSource.close
+    monkeypatch.setattr(document_source.DocumentSource, "close", lambda self: closed.append(self.name) or real_close(self))
+    for path in docs.values():
+        list(iter_images(path))
+    assert sorted(closed) == ["report.docx", "report.pdf"]
+
+    closed.clear()
+    source = document_source.from_bytes(read(docs["pdf"]), "upload.pdf")
+    list(iter_images(source))
+    assert closed == []  # the caller's source stays open
+
+
+@pytest.mark.parametrize("rolled", [False, True])
+def test_spooled_upload_is_read_in_place(docs, rolled):
+    import tempfile
+    data = read(docs["docx"])
+    spool = tempfile.SpooledTemporaryFile(max_size=10 if rolled else len(data) + 1)
+    spool.write(data)
+    spool.seek(0)
+    with document_source.from_upload(spool, "upload.docx") as source:
+        assert source.path is None and source.size == len(data)
+        assert bytes(source.buffer()) == source.read() == data
+        assert ai.extract_text_universal(source, translate=False) == ai.extract_text_universal(docs["docx"], translate=False)
+        assert len(list(iter_images(source))) == 3
+        assert pickle.loads(pickle.dumps(source)).read() == data  # what a worker process gets
+    assert not spool.closed  # werkzeug closes its own spool
+    spool.close()
+
+
+def test_spool_without_the_expected_internals_is_copied(docs):
+    import tempfile
+    data = read(docs["docx"])
+    spool = tempfile.SpooledTemporaryFile(max_size=len(data) + 1)
+    spool.write(data)
+    spool.seek(0)
+    del spool._rolled  # as if a later Python renamed it
+    with document_source.from_upload(spool, "upload.docx") as source:
+        assert source.read() == data
+    spool.close()
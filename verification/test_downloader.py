@@ -0,0 +1,152 @@
+"""Downloader tests against a local HTTP stand-in for the storage host"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+import requests
+from urllib3.exceptions import ReadTimeoutError
+import downloader
+import document_source
+
+BODY = b"%PDF-1.4 fake document " * 1000
+
+
+class StorageHandler(BaseHTTPRequestHandler):
+    requests_seen = []
+    fail_next = 0
+    etag = '"v1"'
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        StorageHandler.requests_seen.append((self.path, dict(self.headers)))
+        if StorageHandler.fail_next:
+            StorageHandler.fail_next -= 1
+            self.send_response(503)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        if self.path.startswith("/etag") and self.headers.get("If-None-Match") == StorageHandler.etag:
+            self.send_response(304)
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", "application/pdf")
+        self.send_header("Content-Length", str(len(BODY)))
+        if self.path.startswith("/etag"):
+            self.send_header("ETag", StorageHandler.etag)
+        self.end_headers()
+        self.wfile.write(BODY)
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_DIR", str(tmp_path / "downloads"))
+    StorageHandler.requests_seen = []
+    StorageHandler.fail_next = 0
+    StorageHandler.etag = '"v1"'
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StorageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_port}"
+    server.shutdown()
+
+
+def test_uncacheable_download_stays_in_memory(storage):
+    with downloader.download(storage + "/plain/doc") as d:
+        assert d.temporary and d.path is None
+        assert d.source.ext == "pdf"
+        assert d.source.read() == BODY
+
+
+def test_large_download_spills_to_temporary_file(storage, monkeypatch):
+    monkeypatch.setattr(document_source, "DOCUMENT_SPILL_BYTES", 1000)
+    with downloader.download(storage + "/plain/doc") as d:
+        assert d.path.endswith(".pdf")
+        assert bytes(d.source.buffer()) == BODY
+        path = d.path
+    assert not downloader.os.path.exists(path)
+
+
+def test_etag_revalidation_reuses_cached_copy(storage):
+    first = downloader.download(storage + "/etag/doc.pdf")
+    second = downloader.download(storage + "/etag/doc.pdf")
+    assert not first.temporary and not first.from_cache
+    assert second.from_cache and second.path == first.path
+    assert StorageHandler.requests_seen[-1][1].get("If-None-Match") == '"v1"'
+    assert open(second.path, "rb").read() == BODY
+
+
+def test_size_cap_aborts_download(storage):
+    with pytest.raises(downloader.DownloadTooLargeError):
+        downloader.download(storage + "/plain/big.pdf", max_bytes=1000)
+
+
+def test_retries_transient_errors(storage):
+    StorageHandler.fail_next = 2
+    assert downloader.download_bytes(storage + "/plain/doc.pdf") == BODY
+    assert len(StorageHandler.requests_seen) == 3
+
+
+def test_only_body_read_errors_are_retried_here(monkeypatch):
+    monkeypatch.setattr(downloader.time, "sleep", lambda seconds: None)
+    calls = []
+
+    def fail(error):
+        def fn():
+            calls.append(error)
+            raise error
+        return fn
+
+    with pytest.raises(requests.exceptions.ConnectTimeout):
+        downloader._with_retries(fail(requests.exceptions.ConnectTimeout("dead host")))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        downloader._with_retries(fail(requests.exceptions.ConnectionError("refused")))
+    assert len(calls) == 2  # the session's Retry already covered these
+
+    calls.clear()
+    with pytest.raises(requests.exceptions.ChunkedEncodingError):
+        downloader._with_retries(fail(requests.exceptions.ChunkedEncodingError("cut short")))
+    stalled = requests.exceptions.ConnectionError(ReadTimeoutError(None, "/doc.pdf", "Read timed out."))
+    with pytest.raises(requests.exceptions.ConnectionError):
+        downloader._with_retries(fail(stalled))
+    assert len(calls) == 2 * (downloader.DOWNLOAD_RETRIES + 1)
+
+
+def test_a_newer_copy_does_not_replace_one_in_use(storage, monkeypatch):
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_MIN_AGE", 0)
+    first = downloader.download(storage + "/etag/doc.pdf")
+    first.source.buffer()  # mapped, as process_file would
+    StorageHandler.etag = '"v2"'
+    second = downloader.download(storage + "/etag/doc.pdf")
+    assert not second.from_cache and second.path != first.path
+    assert bytes(first.source.buffer()) == open(first.path, "rb").read() == BODY
+    first.cleanup()
+    second.cleanup()
+    downloader.download(storage + "/etag/other.pdf").cleanup()  # prunes the superseded copy
+    assert not downloader.os.path.exists(first.path)
+
+
+def test_pruning_skips_files_in_use(storage, monkeypatch):
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_MIN_AGE", 0)
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_MAX_FILES", 1)
+    a = downloader.download(storage + "/etag/a.pdf")
+    b = downloader.download(storage + "/etag/b.pdf")
+    assert downloader.os.path.exists(a.path)  # still being read
+    a.cleanup()
+    b.cleanup()
+    c = downloader.download(storage + "/etag/c.pdf")
+    assert not downloader.os.path.exists(a.path) and not downloader.os.path.exists(b.path)
+    c.cleanup()
+
+
+def test_locked_files_do_not_fail_the_request(storage, monkeypatch):
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_MIN_AGE", 0)
+    monkeypatch.setattr(downloader, "DOWNLOAD_CACHE_MAX_FILES", 1)
+    downloader.download(storage + "/etag/a.pdf").cleanup()
+
+    def locked(path):
+        raise PermissionError(13, "The process cannot access the file", path)
+
+    monkeypatch.setattr(downloader.os, "remove", locked)
+    with downloader.download(storage + "/etag/b.pdf") as d:
+        assert d.source.read() == BODY
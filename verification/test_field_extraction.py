@@ -0,0 +1,54 @@
+"""Field extraction accuracy against the labelled corpus in testdata/"""
+import os
+import json
+import field_extraction
+from field_extraction import extract_fields
+
+CORPUS = os.path.join(os.path.dirname(os.path.abspath(__file__)), "testdata", "field_corpus.json")
+
+
+def load_corpus():
+    with open(CORPUS, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def test_labelled_corpus_accuracy():
+    mismatches = []
+    for doc in load_corpus():
+        data = extract_fields(doc["text"])
+        for field, expected in doc["expected"].items():
+            if data[field] != expected:
+                mismatches.append(f"{doc['id']}.{field}: got {data[field]!r}, expected {expected!r}")
+    assert not mismatches, "\n".join(mismatches)
+
+
+def test_sources_record_line_and_page():
+    text = "Cover page\nName of the Institution: Test College\nTotal Faculty: 12\n"
+    data = extract_fields(text, page_lines=[0, 2])
+    assert data["sources"]["name"] == {"offset": 11, "line": 2, "page": 1}
+    assert data["sources"]["faculty"]["page"] == 2
+
+
+def test_head_name_stays_on_its_line():
+    data = extract_fields("Principal:\nTotal Students: 1200\nPrincipal: Dr. A. Rao\n")
+    assert (data["head_title"], data["head_name"]) == ("Principal", "Dr. A. Rao")
+    data = extract_fields("Vice Chancellor |\nTotal Students: 1200\n")
+    assert data["head_name"] == "N/A" and data["students"] == 1200
+
+
+def test_large_unstructured_text_stays_linear(monkeypatch):
+    # One huge line full of labels and no values used to make `.*` backtrack;
+    # now each label hit reads a bounded window after it, once
+    windows = []
+    real_window = field_extraction._line_window
+
+    def window(text, start):
+        windows.append(real_window(text, start))
+        return windows[-1]
+
+    monkeypatch.setattr(field_extraction, "_line_window", window)
+    text = "Corpus Fund Total Students Admin Area " * 50000
+    data = extract_fields(text + "\nTotal Faculty: 40\n")
+    assert data["faculty"] == 40 and data["corpus_fund"] == 0
+    assert len(windows) <= 4 * 50000 + 1  # one per label hit
+    assert max(map(len, windows)) <= 2 * field_extraction.VALUE_WINDOW + 1
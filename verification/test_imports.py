@@ -0,0 +1,54 @@
+"""Import cost: heavy libraries load only when a document needs them"""
+import os
+import sys
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+# Never needed to start the server or to verify a text-only document
+HEAVY = ("torch", "ultralytics", "onnxruntime", "cv2", "fitz", "pymupdf", "pdfplumber", "docx",
+         "deep_translator", "numpy")
+
+
+def run_python(code, *args):
+    env = dict(os.environ, PRELOAD_MODELS="false", RESULT_CACHE_DB="", TRANSLATION_CACHE_DB="")
+    out = subprocess.run([sys.executable, "-X", "importtime", "-c", code, *args], cwd=HERE, env=env,
+                         capture_output=True, text=True, timeout=120)
+    assert out.returncode == 0, out.stderr
+    return out
+
+
+def import_profile(stderr):
+    """{top-level package: cumulative microseconds} from `-X importtime` output."""
+    profile = {}
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "|" not in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        if cumulative.strip().isdigit():
+            top = name.strip().split(".")[0]
+            profile[top] = max(profile.get(top, 0), int(cumulative))
+    return profile
+
+
+def test_server_import_stays_light():
+    profile = import_profile(run_python("import server").stderr)
+    assert "server" in profile and "ai" in profile
+    assert not [name for name in HEAVY if name in profile]
+
+
+def test_text_only_verification_never_imports_torch(tmp_path):
+    txt = tmp_path / "report.txt"
+    txt.write_text("Name of Institution: Test College\nTotal Students: 500\nTotal Faculty: 25\n")
+    csv = tmp_path / "report.csv"
+    csv.write_text("Field,Value\nName of Institution,Test College\nTotal Students,500\n")
+
+    out = run_python(
+        "import sys, io, contextlib, ai\n"
+        "with contextlib.redirect_stdout(io.StringIO()):\n"
+        "    results = [ai.process_file(p, use_cache=False) for p in sys.argv[1:]]\n"
+        "assert all(r['institution_details']['name'] == 'Test College' for r in results), results\n",
+        str(txt), str(csv),
+    )
+    loaded = import_profile(out.stderr)
+    assert not [name for name in HEAVY if name in loaded]
@@ -0,0 +1,145 @@
+"""Resubmissions: only changed PDF pages are extracted and only new images inferred"""
+import io
+import os
+import sys
+import json
+import contextlib
+from types import SimpleNamespace
+import pytest
+import ai
+import pdf_extraction
+import result_cache
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from synthetic import make_pdf, photo_bytes  # noqa: E402
+
+PAGES = 6
+
+
+class PixelDetector:
+    """Confidence read off the image's top-left pixel; counts the images it sees."""
+
+    def __init__(self, path):
+        self.channel = ["classroom.pt", "library.pt", "lab.pt"].index(os.path.basename(path))
+        self.images_seen = 0
+
+    def __call__(self, batch, verbose=False):
+        self.images_seen += len(batch)
+        return [SimpleNamespace(boxes=[SimpleNamespace(conf=[img.getpixel((0, 0))[self.channel] / 255])])
+                for img in batch]
+
+
+@pytest.fixture
+def models(fake_models):
+    return fake_models(PixelDetector)
+
+
+@pytest.fixture
+def submissions(tmp_path):
+    """The original PDF and a resubmission with text added to page 2 and a photo added to page 4."""
+    import fitz
+    import random
+    original = make_pdf(str(tmp_path / "original.pdf"), pages=PAGES, images_per_page=1, hindi=0)
+    doc = fitz.open(original)
+    doc[1].insert_text((50, 780), "Corrected: Total Faculty: 40")
+    doc[3].insert_image(fitz.Rect(300, 700, 400, 780), stream=photo_bytes(random.Random(99)))
+    resubmitted = str(tmp_path / "resubmitted.pdf")
+    doc.save(resubmitted)
+    doc.close()
+    return original, resubmitted
+
+
+@pytest.fixture
+def extracted(monkeypatch):
+    """Page numbers extract_page_range is asked for."""
+    pages = []
+    real = pdf_extraction.extract_page_range
+
+    def spy(source, start, end, *args, **kwargs):
+        pages.extend(range(start, end))
+        return real(source, start, end, *args, **kwargs)
+
+    monkeypatch.setattr(pdf_extraction, "extract_page_range", spy)
+    result_cache.clear()
+    return pages
+
+
+def verify(path, models, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return ai.process_file(path, *models, **kwargs)
+
+
+def images_seen():
+    return sum(ai.registry.get(p).model.images_seen for p in ai.registry.loaded_paths())
+
+
+def test_fingerprints_survive_a_resave(submissions):
+    original, resubmitted = (pdf_extraction.page_fingerprints(pdf_extraction.as_source(p)) for p in submissions)
+    assert [i for i in range(PAGES) if original[i] != resubmitted[i]] == [1, 3]
+
+
+def test_resubmission_only_reads_changed_pages(submissions, models, extracted):
+    original, resubmitted = submissions
+    verify(original, models)
+    assert extracted == list(range(PAGES))
+    seen = images_seen()
+    assert seen == PAGES * 3
+
+    extracted.clear()
+    result = verify(resubmitted, models)
+    assert extracted == [1, 3]
+    assert images_seen() - seen == 3  # the new photo, once per model
+    assert result == verify(resubmitted, models, use_cache=False)
+
+
+def test_evicted_detections_are_decoded_again(submissions, models, extracted):
+    original, _ = submissions
+    first = verify(original, models)
+    result_cache.results.clear()
+    result_cache.visual_results.clear()
+    result_cache.detections.clear()
+    seen = images_seen()
+
+    extracted.clear()
+    assert verify(original, models) == first
+    assert extracted == []  # images are pulled straight out of the PDF instead
+    assert images_seen() - seen == PAGES * 3
+
+
+def test_incremental_matches_whole_document(submissions, models, monkeypatch):
+    _, resubmitted = submissions
+    result_cache.clear()
+    incremental = verify(resubmitted, models)
+    result_cache.clear()
+    monkeypatch.setattr(ai, "PDF_INCREMENTAL", False)
+    assert json.dumps(verify(resubmitted, models)) == json.dumps(incremental)
+
+
+def to_unicode(five_reads_as):
+    return (b"/CIDInit /ProcSet findresource begin 12 dict begin begincmap\n"
+            b"1 begincodespacerange <00> <FF> endcodespacerange\n"
+            b"2 beginbfchar <30> <0030> <35> <00" + five_reads_as.encode().hex().encode() + b">\nendbfchar\n"
+            b"endcmap CMapName currentdict /CMap defineresource pop end end")
+
+
+def test_fingerprint_covers_the_tounicode_map(tmp_path):
+    """Same content stream and font, but the glyph for "5" maps to "6" in the second file."""
+    import fitz
+    paths = []
+    for digit in "56":
+        doc = fitz.open()
+        page = doc.new_page()
+        page.insert_text((50, 100), "Total Faculty: 500")
+        font = page.get_fonts()[0][0]
+        cmap = doc.get_new_xref()
+        doc.update_object(cmap, "<<>>")
+        doc.update_stream(cmap, to_unicode(digit))
+        doc.xref_set_key(font, "ToUnicode", f"{cmap} 0 R")
+        paths.append(str(tmp_path / f"{digit}.pdf"))
+        doc.save(paths[-1])
+        doc.close()
+    texts = [pdf_extraction.extract_page_range(pdf_extraction.as_source(p), 0, 1, want_images=False)[0]["text"]
+             for p in paths]
+    assert "500" in texts[0] and "600" in texts[1]
+    first, second = (pdf_extraction.page_fingerprints(pdf_extraction.as_source(p)) for p in paths)
+    assert first != second
@@ -0,0 +1,61 @@
+"""Job ownership: unfinished jobs of exited server processes are taken over once"""
+import io
+import os
+import time
+import subprocess
+import contextlib
+import pytest
+from jobs import JobQueue, JobStore
+
+
+@pytest.fixture
+def store(tmp_path):
+    return JobStore(str(tmp_path / "jobs.db"))
+
+
+def dead_pid():
+    proc = subprocess.Popen(["true"])
+    proc.wait()
+    return proc.pid
+
+
+def wait_done(store, job_id):
+    for _ in range(200):
+        if store.get(job_id)["status"] == "done":
+            return
+        time.sleep(0.01)
+    raise AssertionError(store.get(job_id))
+
+
+def test_jobs_of_an_exited_process_are_resumed(store, tmp_path):
+    (tmp_path / "a.pdf").write_bytes(b"%PDF")  # a finished job removes its input
+    job_id = store.create(source_url="https://example.invalid/a.pdf")
+    store.update(job_id, owner=dead_pid(), input_path=str(tmp_path / "a.pdf"))
+    queue = JobQueue(lambda document, progress: {"ok": True}, store=store)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert queue.resume() == 1
+        wait_done(store, job_id)
+    assert store.get(job_id)["owner"] == os.getpid()
+    queue.shutdown()
+
+
+def test_jobs_of_a_live_process_are_left_alone(store):
+    sibling = subprocess.Popen(["sleep", "5"])
+    try:
+        job_id = store.create(source_url="https://example.invalid/a.pdf")
+        store.update(job_id, owner=sibling.pid)
+        queue = JobQueue(lambda document, progress: {"ok": True}, store=store)
+        assert queue.resume() == 0
+        assert store.get(job_id)["status"] == "queued"
+        queue.shutdown()
+    finally:
+        sibling.kill()
+        sibling.wait()
+
+
+def test_a_job_is_claimed_once(store, tmp_path):
+    job_id = store.create(source_url="https://example.invalid/a.pdf")
+    owner = dead_pid()
+    store.update(job_id, owner=owner)
+    other = JobStore(str(tmp_path / "jobs.db"))  # another worker's connection
+    assert [store.claim(job_id, owner), other.claim(job_id, owner)] == [True, False]
@@ -0,0 +1,49 @@
+"""Merged multi-class scene model: class mapping and single-pass analysis"""
+from types import SimpleNamespace
+import pytest
+from PIL import Image
+import ai
+
+NAMES = {0: "classroom", 1: "library", 2: "laboratory", 3: "college_building"}
+
+
+class FakeSceneModel:
+    """Reports the class encoded in the image's red channel with 0.9 confidence."""
+
+    names = NAMES
+
+    def __init__(self, path):
+        self.calls = 0
+
+    def __call__(self, batch, verbose=False):
+        self.calls += len(batch)
+        return [SimpleNamespace(boxes=[SimpleNamespace(cls=[img.getpixel((0, 0))[0] // 80], conf=[0.9]),
+                                       SimpleNamespace(cls=[0], conf=[0.2])])
+                for img in batch]
+
+
+@pytest.fixture
+def merged(fake_models):
+    return fake_models(FakeSceneModel, ["aicte_scenes.pt"])[0]
+
+
+def test_one_pass_per_image_covers_all_classes(merged):
+    images = [Image.new("RGB", (120, 120), (c * 80, n, 0)) for c in range(4) for n in range(5)]
+    found = ai.analyze_images_aicte(images, use_cache=False, merged_model_path=merged)
+    assert [f["type"] for f in found] == [t for t in ai.SCENE_CLASSES for _ in range(5)]
+    assert all(f["confidence"] == "90.00%" for f in found)
+    assert ai.registry.get(merged).model.calls == len(images)
+
+
+def test_class_names_are_matched_loosely():
+    assert ai.scene_class_ids(NAMES) == [0, 1, 2, 3]
+    assert ai.scene_class_ids({0: "Library", 1: "Classroom"}) == [1, 0, None, None]
+    with pytest.raises(ValueError):
+        ai.scene_class_ids({0: "Laboratory"})
+
+
+def test_explicit_separate_models_win_over_default_merged(merged, monkeypatch):
+    monkeypatch.setattr(ai, "MERGED_MODEL", merged)
+    assert ai.resolve_merged_model() == merged
+    assert ai.resolve_merged_model(None, "classroom.pt", "library.pt") is None
+    assert ai.active_model_paths() == [merged]
@@ -0,0 +1,55 @@
+"""Metrics registry, exposition format and per-request traces"""
+import time
+import metrics
+
+
+def test_histogram_buckets_are_cumulative():
+    h = metrics.Histogram("test_latency_seconds", "test", ["stage"], buckets=(0.1, 1))
+    h.observe(0.05, stage="a")
+    h.observe(0.5, stage="a")
+    h.observe(5, stage="a")
+    lines = h.render()
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{stage="a"} 3' in lines
+
+
+def test_counter_labels_are_escaped():
+    c = metrics.Counter("test_events_total", "test", ["kind"])
+    c.inc(kind='say "hi"')
+    c.inc(2, kind='say "hi"')
+    assert c.render()[-1] == 'test_events_total{kind="say \\"hi\\""} 3'
+
+
+def test_trace_collects_stages_for_current_request():
+    metrics.start_trace()
+    with metrics.stage("extract"):
+        time.sleep(0.01)
+    for _ in range(2):
+        with metrics.stage("yolo:test.pt", metrics.YOLO_SECONDS, model="test.pt"):
+            pass
+    list(metrics.timed_iter(iter([1, 2, 3]), "image_extract"))
+    trace = metrics.get_trace()
+    assert trace["extract"]["seconds"] >= 0.01
+    assert trace["yolo:test.pt"]["calls"] == 2
+    assert trace["image_extract"]["calls"] == 1
+    assert metrics.YOLO_SECONDS.count(model="test.pt") >= 2
+
+
+def test_metrics_endpoint():
+    from server import app
+    response = app.test_client().get("/metrics")
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert "# TYPE verification_stage_seconds histogram" in body
+    assert 'verification_cache_hits_total{cache="results"}' in body
+
+
+def test_trace_does_not_outlive_its_request():
+    from server import app
+    metrics.start_trace()  # as left behind by a ?debug=1 request on this thread
+    app.test_client().get("/health")
+    with metrics.stage("extract"):
+        pass
+    assert metrics.get_trace() is None
@@ -0,0 +1,162 @@
+"""OCR fallback: scanned pages are rasterized, read once, and cached by fingerprint"""
+import io
+import os
+import sys
+import types
+import contextlib
+from types import SimpleNamespace
+import pytest
+import ai
+import ocr
+import pdf_extraction
+import result_cache
+from image_extraction import open_pdf
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from synthetic import FIELDS, make_pdf, make_scanned_pdf  # noqa: E402
+from stubs import StubOcrEngine  # noqa: E402
+
+FORM_TEXT = "\n".join(f"{label}: {value}" for label, value in FIELDS)
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    engine = StubOcrEngine(FORM_TEXT)
+    monkeypatch.setattr(ocr, "_engine", engine)
+    monkeypatch.setattr(ocr, "_engine_ready", True)
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 1)
+    result_cache.clear()
+    return engine
+
+
+class BlankDetector:
+    def __init__(self, path):
+        pass
+
+    def __call__(self, batch, verbose=False):
+        return [SimpleNamespace(boxes=[]) for _ in batch]
+
+
+@pytest.fixture
+def models(fake_models):
+    return fake_models(BlankDetector)
+
+
+@pytest.fixture(scope="module")
+def scanned(tmp_path_factory):
+    return make_scanned_pdf(str(tmp_path_factory.mktemp("docs") / "scan.pdf"), pages=3)
+
+
+def extract(path, **kwargs):
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        result = pdf_extraction.extract_pdf(path, workers=1, **kwargs)
+    return result, out.getvalue()
+
+
+def test_scanned_fields_are_read(scanned, engine, models):
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = ai.process_file(scanned, *models, use_cache=False)
+    details = result["institution_details"]
+    assert details["name"] == "Synthetic Institute of Technology"
+    assert (details["students"], details["faculty"]) == (1200, 60)
+    assert engine.calls == 3
+
+
+def test_only_pages_without_text_are_ocrd(tmp_path, engine):
+    import fitz
+    path = make_pdf(str(tmp_path / "mixed.pdf"), pages=2, images_per_page=0, hindi=0)
+    doc = fitz.open(path)
+    doc.insert_pdf(fitz.open(make_scanned_pdf(str(tmp_path / "scan.pdf"), pages=1)))
+    doc.save(str(tmp_path / "both.pdf"))
+    result, _ = extract(str(tmp_path / "both.pdf"))
+    assert [p["ocr"] for p in result["pages"]] == [False, False, True]
+    assert engine.calls == 1
+
+
+def test_ocr_text_is_cached_by_page(scanned, engine):
+    first, _ = extract(scanned)
+    assert engine.calls == 3
+    assert extract(scanned)[0]["text"] == first["text"]
+    assert engine.calls == 3
+
+
+def test_rasterizes_at_ocr_dpi(scanned):
+    from PIL import Image
+    with open_pdf(pdf_extraction.as_source(scanned)) as doc:
+        width = doc[0].rect.width
+        img = Image.open(io.BytesIO(ocr.rasterize(doc, 0, dpi=300)))
+    assert img.mode == "L" and abs(img.width - width * 300 / 72) <= 1
+
+
+def test_without_an_engine_pages_stay_empty_and_uncached(scanned, engine, monkeypatch):
+    monkeypatch.setattr(ocr, "_engine", None)
+    result, out = extract(scanned)
+    assert "install pytesseract" in out
+    assert result["text"].strip() == "" and len(result_cache.ocr) == 0
+    with contextlib.redirect_stdout(io.StringIO()):
+        ai.read_pdf_pages(pdf_extraction.as_source(scanned))
+    assert len(result_cache.pages) == 0  # read again once an engine is installed
+
+
+def test_process_pool(scanned, engine, monkeypatch):
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 2)
+    try:
+        result, _ = extract(scanned)
+    finally:
+        ocr.shutdown_pool()
+    assert result["text"].count("Total Faculty: 60") == 3
+    assert engine.calls == 0  # every page was read in a worker
+
+
+class FailingOcrEngine(StubOcrEngine):
+    """Tesseract without the language pack it was asked for."""
+
+    def recognize(self, png):
+        self.calls += 1
+        raise RuntimeError("Failed loading language 'hin'")
+
+
+def test_scan_read_once_an_engine_is_installed(scanned, engine, models, monkeypatch):
+    """Nothing of a scan read without OCR is cached, so installing an engine fixes it."""
+    monkeypatch.setattr(ocr, "_engine", None)
+    with contextlib.redirect_stdout(io.StringIO()):
+        before = ai.process_file(scanned, *models)
+    assert before["institution_details"]["name"] == "Unknown Institution"
+    monkeypatch.setattr(ocr, "_engine", engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        after = ai.process_file(scanned, *models)
+    assert after["institution_details"]["name"] == "Synthetic Institute of Technology"
+
+
+def test_ocr_errors_fall_back_to_the_text_layer(scanned, engine, models, monkeypatch):
+    monkeypatch.setattr(ocr, "_engine", FailingOcrEngine(""))
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        result = ai.process_file(scanned, *models)
+    assert "OCR failed on page 1" in out.getvalue()
+    assert result["institution_details"]["name"] == "Unknown Institution"
+    assert len(result_cache.ocr) == 0 and len(result_cache.results) == 0
+
+    monkeypatch.setattr(ocr, "_engine", engine)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = ai.process_file(scanned, *models)
+    assert result["institution_details"]["name"] == "Synthetic Institute of Technology"
+
+
+def test_ocr_errors_in_the_pool(scanned, engine, monkeypatch):
+    monkeypatch.setattr(ocr, "_engine", FailingOcrEngine(""))
+    monkeypatch.setattr(ocr, "OCR_WORKERS", 2)
+    try:
+        result, _ = extract(scanned)
+    finally:
+        ocr.shutdown_pool()
+    assert result["ocr_pending"] == 3 and not any(p["ocr"] for p in result["pages"])
+
+
+def test_tesseract_languages_are_checked(monkeypatch):
+    fake = types.SimpleNamespace(get_tesseract_version=lambda: "5.3.0", get_languages=lambda config="": ["eng", "osd"])
+    monkeypatch.setitem(sys.modules, "pytesseract", fake)
+    with contextlib.redirect_stdout(io.StringIO()) as out:
+        assert ocr.TesseractEngine("eng+hin").name == "tesseract-eng"
+    assert "hin" in out.getvalue()
+    with pytest.raises(RuntimeError):
+        ocr.TesseractEngine("hin")
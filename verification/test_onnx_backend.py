@@ -0,0 +1,91 @@
+"""ONNX Runtime backend: exports and scores match the PyTorch models"""
+import os
+import sys
+import numpy as np
+import pytest
+from PIL import Image
+
+pytest.importorskip("onnxruntime")
+pytest.importorskip("onnx")
+pytest.importorskip("ultralytics")
+
+import onnx_backend  # noqa: E402
+from inference import predict_class_confidences, predict_max_confidences  # noqa: E402
+from model_registry import ModelRegistry, load_model  # noqa: E402
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from stubs import _build, MERGED_CLASSES  # noqa: E402
+
+CLASS_IDS = list(MERGED_CLASSES)
+
+
+@pytest.fixture(scope="module")
+def scene_model(tmp_path_factory):
+    """The tiny four-class detector with a class head sharp enough to clear
+    the 0.25 confidence threshold on some images and not on others."""
+    import torch
+    from ultralytics.nn.modules import Detect
+    folder = tmp_path_factory.mktemp("onnx")
+    torch.manual_seed(0)  # the whole model, so every run tests the same weights
+    model = _build(str(folder), len(MERGED_CLASSES), MERGED_CLASSES)
+    for module in model.model.modules():
+        if isinstance(module, Detect):
+            for branch in module.cv3:
+                branch[-1].weight.data.normal_(0, 300)
+                branch[-1].bias.data.fill_(-3)
+    path = str(folder / "aicte_scenes.pt")
+    model.save(path)
+    return path
+
+
+@pytest.fixture(scope="module")
+def images():
+    rng = np.random.default_rng(0)
+    noise = [Image.fromarray(rng.integers(0, 255, (480, 640, 3), dtype=np.uint8)) for _ in range(3)]
+    return noise + [Image.new("RGB", (640, 480), (200, 30, 30)),
+                    Image.fromarray(rng.integers(0, 255, (300, 200, 3), dtype=np.uint8)),
+                    rng.integers(0, 255, (256, 256, 3), dtype=np.uint8)]
+
+
+@pytest.mark.parametrize("batch_size", [1, 4, 16])
+def test_fp32_matches_pytorch(scene_model, images, batch_size):
+    torch_model = load_model(scene_model, "torch")
+    onnx_model = load_model(scene_model, "onnx")
+    assert onnx_model.names == torch_model.names
+
+    expected = predict_class_confidences(torch_model, images, CLASS_IDS, batch_size)
+    actual = predict_class_confidences(onnx_model, images, CLASS_IDS, batch_size)
+    assert any(max(row) > 0 for row in expected)  # not a trivial all-zero comparison
+    np.testing.assert_allclose(actual, expected, atol=1e-4)
+    assert predict_max_confidences(onnx_model, images, batch_size) == pytest.approx(
+        predict_max_confidences(torch_model, images, batch_size), abs=1e-4)
+
+
+def test_int8_close_to_pytorch(scene_model, images):
+    expected = np.array(predict_class_confidences(load_model(scene_model, "torch"), images, CLASS_IDS))
+    actual = np.array(predict_class_confidences(load_model(scene_model, "onnx-int8"), images, CLASS_IDS))
+    assert os.path.exists(onnx_backend.onnx_path_for(scene_model, int8=True))
+    # Quantization moves scores a little; each image's best class and its
+    # confidence are what the analysis acts on
+    np.testing.assert_array_equal(actual.argmax(1), expected.argmax(1))
+    np.testing.assert_allclose(actual.max(1), expected.max(1), atol=0.05)
+
+
+def test_export_is_reused_until_weights_change(scene_model):
+    onnx_path = onnx_backend.onnx_path_for(scene_model)
+    load_model(scene_model, "onnx")
+    exported_at = os.path.getmtime(onnx_path)
+    load_model(scene_model, "onnx")
+    assert os.path.getmtime(onnx_path) == exported_at
+
+    os.utime(scene_model, (exported_at + 10, exported_at + 10))  # weights replaced
+    assert onnx_backend.is_stale(scene_model, onnx_path)
+    load_model(scene_model, "onnx")
+    assert not onnx_backend.is_stale(scene_model, onnx_path)
+
+
+def test_registry_serves_onnx_models(scene_model):
+    registry = ModelRegistry(loader=lambda path: load_model(path, "onnx"))
+    entry = registry.get(scene_model)
+    assert isinstance(entry.model, onnx_backend.OnnxDetector)
+    assert entry.names[1] == "Library"
@@ -0,0 +1,86 @@
+"""Vectorized rescoring gives the scalar path's results, field for field"""
+import os
+import sys
+import copy
+import json
+import numpy as np
+import ai
+import rescoring
+from rescoring import InstitutionTable, rescore, compare
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmarks"))
+from synthetic import make_institutions  # noqa: E402
+
+
+def institutions(n, seed=0):
+    return make_institutions(n, ai.AICTE_POLICY, seed)
+
+
+def scalar_results(text_data, visual_data, draws, policy=None):
+    return [ai.build_aicte_json(t, v, *ai.calculate_and_verify(t, v, policy, d))
+            for t, v, d in zip(text_data, visual_data, draws)]
+
+
+def revised_policy():
+    policy = copy.deepcopy(ai.AICTE_POLICY)
+    policy["INSTITUTE"]["FACULTY_RATIO"] = 18
+    policy["INSTITUTE"]["CORPUS_FUND_MIN"] = 2000000
+    policy["UNIVERSITY"]["REQUIRED_IMAGES"].append("College Building")
+    policy["UNIVERSITY"]["WEIGHTAGE"] = {"financial": 25, "faculty": 25, "infra": 25, "visual": 25}
+    return policy
+
+
+def test_matches_scalar_path():
+    text_data, visual_data, draws = institutions(3000)
+    table = InstitutionTable(text_data, visual_data, draws)
+    for policy in (None, revised_policy()):
+        expected = scalar_results(text_data, visual_data, draws, policy)
+        # Compared as JSON so an int 0 vs 0.0 difference shows up too
+        assert [json.dumps(r) for r in rescore(table, policy).results()] == [json.dumps(r) for r in expected]
+
+
+def test_py_round_matches_round_on_ties():
+    values = [i / 1000 + 0.005 for i in range(0, 100000, 7)] + [2.675, 1.005, 0.125, 99.995]
+    assert rescoring.py_round(np.array(values)).tolist() == [round(v, 2) for v in values]
+
+
+def test_rescoring_stored_results_keeps_compliant_scores():
+    text_data, visual_data, draws = institutions(500, seed=1)
+    stored = scalar_results(text_data, visual_data, draws)
+    table = InstitutionTable.from_results(stored)
+    assert rescore(table).results() == stored
+
+
+def test_what_if_comparison():
+    text_data, visual_data, draws = institutions(2000, seed=2)
+    table = InstitutionTable(text_data, visual_data, draws)
+    policy = revised_policy()
+    summary = compare(table, ai.AICTE_POLICY, policy)
+
+    before = scalar_results(text_data, visual_data, draws)
+    after = scalar_results(text_data, visual_data, draws, policy)
+    approved = lambda results: {i for i, r in enumerate(results) if r["final_decision"]["status"] == "Approved"}
+    assert summary["approved_before"] == len(approved(before))
+    assert summary["approved_after"] == len(approved(after))
+    assert set(summary["newly_rejected"].tolist()) == approved(before) - approved(after)
+    assert set(summary["newly_approved"].tolist()) == approved(after) - approved(before)
+
+
+def test_comparison_does_no_work_per_institution(monkeypatch):
+    """compare() applies each policy once, as array operations over the
+    whole table; nothing is scored one institution at a time."""
+    def one_at_a_time(*args, **kwargs):
+        raise AssertionError("scored one institution at a time")
+
+    for name in ("calculate_and_verify", "build_aicte_json"):
+        monkeypatch.setattr(ai, name, one_at_a_time)
+    for name in ("result", "scores", "red_flags"):
+        monkeypatch.setattr(rescoring.Rescore, name, one_at_a_time)
+    applied = []
+    real_rescore = rescoring.rescore
+    monkeypatch.setattr(rescoring, "rescore", lambda table, policy=None: applied.append(policy) or real_rescore(table, policy))
+
+    text_data, visual_data, draws = institutions(50000, seed=3)
+    summary = compare(InstitutionTable(text_data, visual_data, draws), ai.AICTE_POLICY, revised_policy())
+    assert summary["institutions"] == 50000
+    assert len(applied) == 2
@@ -0,0 +1,98 @@
+"""Serving behaviour: readiness probe and the verification concurrency limit"""
+import io
+import contextlib
+import server
+
+
+def test_ready_reports_model_status(monkeypatch):
+    monkeypatch.setattr(server, "PRELOAD", False)
+    response = server.app.test_client().get("/ready")
+    body = response.get_json()
+    assert set(body["models"]) in ({"classroom", "library", "laboratory"}, {"merged"})
+    assert (response.status_code, body["status"]) == (200, "ready")
+
+
+def test_not_ready_until_warm_up_succeeds(monkeypatch):
+    monkeypatch.setattr(server, "_models_ready", server.threading.Event())
+    client = server.app.test_client()
+    response = client.get("/ready")
+    assert (response.status_code, response.get_json()["status"]) == (503, "loading")
+
+    def broken():
+        raise FileNotFoundError("model/classroom_classification.pt")
+
+    monkeypatch.setattr(server, "warm_up_models", broken)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert not server.warm_up()
+    assert client.get("/ready").status_code == 503
+
+    monkeypatch.setattr(server, "warm_up_models", lambda: None)
+    monkeypatch.setattr(server, "PRELOAD", False)
+    with contextlib.redirect_stdout(io.StringIO()):
+        assert server.warm_up()
+    assert client.get("/ready").status_code == 200
+
+
+def test_ready_fails_while_draining(monkeypatch):
+    monkeypatch.setattr(server, "_draining", server.threading.Event())
+    server._draining.set()
+    response = server.app.test_client().get("/ready")
+    assert response.status_code == 503
+    assert response.get_json()["status"] == "draining"
+
+
+def test_busy_server_returns_503(monkeypatch):
+    monkeypatch.setattr(server, "_verify_slots", server.threading.BoundedSemaphore(1))
+    monkeypatch.setattr(server, "VERIFY_QUEUE_TIMEOUT", 0.01)
+    server._verify_slots.acquire()
+    try:
+        response = server.app.test_client().post("/api/verify-pdf", json={"pdfUrl": "http://example.invalid/a.pdf"})
+        assert response.status_code == 503
+        assert response.headers["Retry-After"] == "5"
+    finally:
+        server._verify_slots.release()
+
+
+def test_slot_is_released_after_response(monkeypatch):
+    monkeypatch.setattr(server, "_verify_slots", server.threading.BoundedSemaphore(1))
+    monkeypatch.setattr(server, "VERIFY_QUEUE_TIMEOUT", 0.01)
+    client = server.app.test_client()
+    for _ in range(2):
+        response = client.post("/api/verify-pdf", json={})
+        assert response.status_code == 400
+        response.close()  # WSGI servers close every response; the slot is freed then
+
+
+def test_upload_is_verified_from_memory(monkeypatch):
+    seen = []
+
+    def fake_process_file(source):
+        seen.append((source.path, source.ext, source.read()))
+        return {"ok": True}
+
+    monkeypatch.setattr(server, "process_file", fake_process_file)
+    body = b"Name of Institution: Test College\n" * 20000  # well past werkzeug's 500 KB spool limit
+    response = server.app.test_client().post(
+        "/api/verify-pdf-file", data={"file": (io.BytesIO(body), "report.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert seen == [(None, "txt", body)]
+
+
+def test_large_upload_is_mapped_from_the_spool(monkeypatch):
+    seen = []
+
+    def fake_process_file(source):
+        seen.append((source.path, source.temporary, type(source.buffer()), source.read()))
+        return {"ok": True}
+
+    monkeypatch.setattr(server, "process_file", fake_process_file)
+    monkeypatch.setattr(server.document_source, "DOCUMENT_SPILL_BYTES", 1000)
+    body = b"Name of Institution: Test College\n" * 100
+    response = server.app.test_client().post(
+        "/api/verify-pdf-file", data={"file": (io.BytesIO(body), "report.txt")},
+        content_type="multipart/form-data",
+    )
+    assert response.status_code == 200
+    assert seen == [(None, False, memoryview, body)]  # no copy of its own on disk
@@ -0,0 +1,91 @@
+"""Key/value table extraction from PDF (pdfplumber) and DOCX (python-docx) tables"""
+import fitz
+from docx import Document
+from field_extraction import extract_fields, LABEL_FIELDS
+from table_extraction import fields_from_tables, tables_from_blocks
+from pdf_extraction import extract_pdf
+from ai import extract_text_from_docx
+
+ROWS = [
+    ["Name of the Institution", "Govt Polytechnic Puri"],
+    ["Principal", "Dr. A. K. Das"],
+    ["Corpus Fund (in Rs.)", "75,00,000"],
+    ["Total Students", "1,240"],
+    ["Student-Faculty Ratio", "20:1"],
+    ["Faculty", "62"],
+]
+
+
+def _fields(tables, text=""):
+    return extract_fields(text, seed=fields_from_tables(tables, LABEL_FIELDS))
+
+
+def test_pdf_ruled_table(tmp_path):
+    doc = fitz.open()
+    page = doc.new_page()
+    y = 72
+    for label, value in ROWS:
+        page.draw_rect(fitz.Rect(72, y, 272, y + 20))
+        page.draw_rect(fitz.Rect(272, y, 472, y + 20))
+        page.insert_text((76, y + 14), label, fontsize=9)
+        page.insert_text((276, y + 14), value, fontsize=9)
+        y += 20
+    path = str(tmp_path / "table.pdf")
+    doc.save(path)
+
+    pdf = extract_pdf(path, want_images=False, want_tables=True, workers=1)
+    data = _fields(pdf["tables"], pdf["text"])
+    assert data["name"] == "Govt Polytechnic Puri"
+    assert (data["head_title"], data["head_name"]) == ("Principal", "Dr. A. K. Das")
+    assert data["corpus_fund"] == 7500000
+    assert data["students"] == 1240  # the text regex alone would stop at the comma
+    assert data["faculty"] == 62  # not the ratio row
+    assert data["sources"]["students"] == {"table": 0, "row": 4, "page": 1}
+
+
+def test_docx_table_with_text_fallback(tmp_path):
+    doc = Document()
+    doc.add_paragraph("Total Computers: 150")
+    table = doc.add_table(rows=len(ROWS), cols=2)
+    for row, cells in zip(table.rows, ROWS):
+        for cell, text in zip(row.cells, cells):
+            cell.text = text
+    path = str(tmp_path / "report.docx")
+    doc.save(path)
+
+    blocks = extract_text_from_docx(path, translate=False)
+    text = "\n".join(b["text"] for b in blocks)
+    data = _fields(tables_from_blocks(blocks), text)
+    assert data["students"] == 1240
+    assert data["computers"] == 150  # not in a table, found by the text scan
+    assert "offset" in data["sources"]["computers"]
+
+
+def test_header_row_layout():
+    tables = [{"page": None, "rows": [
+        ["Total Students", "Faculty", "Computers", "Admin Area"],
+        ["900", "45", "120", "4,000 sq ft"],
+    ]}]
+    data = _fields(tables)
+    assert (data["students"], data["faculty"], data["computers"], data["admin_area"]) == (900, 45, 120, 4000)
+
+
+def test_vice_chancellor_preferred_over_director():
+    tables = [{"page": None, "rows": [["Director", "R. Mehta"], ["Vice Chancellor", "Prof. S. Rao"]]}]
+    data = _fields(tables)
+    assert (data["head_title"], data["head_name"]) == ("Vice Chancellor", "Prof. S. Rao")
+
+
+def test_bare_name_heading_is_not_the_institution():
+    tables = [{"page": None, "rows": [["Name", "Designation"], ["Dr. P. Nayak", "Principal"]]}]
+    assert _fields(tables)["name"] == "Unknown Institution"
+    data = _fields(tables, "Name of the Institution: Sri Jagannath College\n")
+    assert data["name"] == "Sri Jagannath College" and "offset" in data["sources"]["name"]
+
+
+def test_text_label_wins_a_tie_for_the_name():
+    tables = [{"page": None, "rows": [["Name", "Annexure II"]]}]
+    data = _fields(tables, "Name: Sri Jagannath College\n")
+    assert data["name"] == "Sri Jagannath College"
+    data = _fields([{"page": None, "rows": [["Name of the Institution", "Sri Jagannath College"]]}], "Name: Annexure II\n")
+    assert data["name"] == "Sri Jagannath College"  # the table's label has the higher priority
@@ -0,0 +1,91 @@
+"""Translation layer tests using a local stub translator (no network)"""
+import translation
+
+
+class StubTranslator:
+    max_chars = 60
+
+    def __init__(self):
+        self.calls = []
+
+    def translate(self, text):
+        self.calls.append(text)
+        return "\n".join(f"EN({line})" for line in text.split("\n"))
+
+
+def _use_stub():
+    stub = StubTranslator()
+    translation.set_translator(stub)
+    translation.get_cache().clear()
+    return stub
+
+
+def test_identical_blocks_are_translated_once():
+    stub = _use_stub()
+    out = translation.translate_many(["कुल छात्र", "कुल छात्र", "कुल छात्र"])
+    assert out == ["EN(कुल छात्र)"] * 3
+    assert len(stub.calls) == 1
+
+
+def test_cache_is_reused_across_calls():
+    stub = _use_stub()
+    translation.translate_many(["पुस्तकालय"])
+    translation.translate_many(["पुस्तकालय"])
+    assert len(stub.calls) == 1
+    assert translation.get_cache().stats()["hits"] >= 1
+
+
+def test_misses_are_packed_under_provider_limit():
+    stub = _use_stub()
+    rows = [f"पंक्ति {i} संख्या" for i in range(40)]
+    out = translation.translate_many(rows)
+    assert out == [f"EN({r})" for r in rows]
+    assert 1 < len(stub.calls) < len(rows)
+    assert all(len(c) <= stub.max_chars for c in stub.calls)
+
+
+def test_blank_text_passes_through():
+    stub = _use_stub()
+    assert translation.translate_many(["", "   "]) == ["", "   "]
+    assert stub.calls == []
+
+
+def test_english_blocks_skip_the_translator():
+    stub = _use_stub()
+    stats = translation.start_translation_stats()
+    out = translation.translate_many(["Total Students: 500", "Name of Institution: XYZ College"])
+    assert out == ["Total Students: 500", "Name of Institution: XYZ College"]
+    assert stub.calls == []
+    assert stats["blocks_skipped"] == 2 and stats["blocks_translated"] == 0
+
+
+def test_only_non_latin_spans_are_translated():
+    stub = _use_stub()
+    stats = translation.start_translation_stats()
+    out = translation.translate_text("Name: राजकीय महाविद्यालय, Bhubaneswar\nTotal Faculty: 40")
+    assert out == "Name: EN(राजकीय महाविद्यालय), Bhubaneswar\nTotal Faculty: 40"
+    assert stub.calls == ["राजकीय महाविद्यालय"]
+    assert stats["blocks_translated"] == 1
+
+
+def test_detect_script():
+    assert translation.detect_script("Library") == "Latin"
+    assert translation.detect_script("पुस्तकालय") == "Devanagari"
+    assert translation.detect_script("کتب خانہ") == "Arabic"
+    assert translation.detect_script("ପାଠାଗାର") == "Odia"
+    assert translation.detect_script("১২৩ গ্রন্থাগার") == "Bengali"
+
+
+class BlankTranslator(StubTranslator):
+    def translate(self, text):
+        self.calls.append(text)
+        return None
+
+
+def test_blank_responses_keep_the_original_and_are_not_cached():
+    stub = BlankTranslator()
+    translation.set_translator(stub)
+    translation.get_cache().clear()
+    assert translation.translate_many(["कुल छात्र"]) == ["कुल छात्र"]
+    translation.set_translator(StubTranslator())
+    assert translation.translate_many(["कुल छात्र"]) == ["EN(कुल छात्र)"]
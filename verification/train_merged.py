@@ -0,0 +1,150 @@
+"""Train and export the merged multi-class scene model.
+
+Usage:
+    python train_merged.py prepare <images_dir> [--out datasets/aicte_scenes] [--val 0.2]
+    python train_merged.py train [--data datasets/aicte_scenes/data.yaml] [--base yolov8n.pt]
+                                 [--epochs 50] [--imgsz 640] [--batch 16] [--device cpu]
+    python train_merged.py export <best.pt> [--out model/aicte_scenes.pt] [--onnx]
+    python train_merged.py all <images_dir> [train options]
+
+`images_dir` holds one folder per class (classroom/, library/, laboratory/,
+college_building/). Each photo is labelled as a single box covering the
+whole frame, since we classify the scene rather than locate objects in it.
+`export` checks the class names and installs the weights where
+ai.analyze_images_aicte picks them up, replacing the three separate models.
+"""
+import os
+import sys
+import random
+import shutil
+import argparse
+from ai import MODEL_DIR, MERGED_MODEL, SCENE_CLASSES, scene_class_ids
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_DATASET = os.path.join(SCRIPT_DIR, "datasets", "aicte_scenes")
+IMAGE_EXTENSIONS = {".jpg", ".jpeg", ".png", ".bmp", ".webp"}
+
+
+def class_folder_index(name):
+    """SCENE_CLASSES index for a folder name like "college_building", or None."""
+    key = name.strip().lower().replace("_", " ").replace("-", " ")
+    for i, cls in enumerate(SCENE_CLASSES):
+        if cls.lower() == key:
+            return i
+    return None
+
+
+def prepare(images_dir, out=DEFAULT_DATASET, val=0.2, seed=0):
+    """Lay out a YOLO detection dataset from per-class folders; returns data.yaml's path."""
+    rng = random.Random(seed)
+    counts = {}
+    for folder in sorted(os.listdir(images_dir)):
+        cls = class_folder_index(folder)
+        if cls is None:
+            print(f"⚠️ Skipping folder that isn't a scene class: {folder}")
+            continue
+        files = sorted(
+            f for f in os.listdir(os.path.join(images_dir, folder))
+            if os.path.splitext(f)[1].lower() in IMAGE_EXTENSIONS
+        )
+        rng.shuffle(files)
+        n_val = max(1, int(len(files) * val)) if len(files) > 1 else 0
+        for i, name in enumerate(files):
+            split = "val" if i < n_val else "train"
+            stem = f"{cls}_{os.path.splitext(name)[0]}"
+            os.makedirs(os.path.join(out, "images", split), exist_ok=True)
+            os.makedirs(os.path.join(out, "labels", split), exist_ok=True)
+            shutil.copy2(os.path.join(images_dir, folder, name),
+                         os.path.join(out, "images", split, stem + os.path.splitext(name)[1].lower()))
+            with open(os.path.join(out, "labels", split, stem + ".txt"), "w") as f:
+                f.write(f"{cls} 0.5 0.5 1.0 1.0\n")
+        counts[SCENE_CLASSES[cls]] = len(files)
+
+    missing = [c for c in ("Classroom", "Library") if not counts.get(c)]
+    if missing:
+        raise ValueError(f"No training images for: {', '.join(missing)}")
+
+    data_yaml = os.path.join(out, "data.yaml")
+    with open(data_yaml, "w", encoding="utf-8") as f:
+        f.write(f"path: {os.path.abspath(out)}\ntrain: images/train\nval: images/val\nnames:\n")
+        for i, cls in enumerate(SCENE_CLASSES):
+            f.write(f"  {i}: {cls}\n")
+    print(f"📦 Dataset ready at {out}: " + ", ".join(f"{k} {v}" for k, v in counts.items()))
+    return data_yaml
+
+
+def train(data, base="yolov8n.pt", epochs=50, imgsz=640, batch=16, device="cpu"):
+    """Fine-tune `base` on the scene dataset; returns the path of the best weights."""
+    from ultralytics import YOLO
+    model = YOLO(base)
+    model.train(data=data, epochs=epochs, imgsz=imgsz, batch=batch, device=device,
+                project=os.path.join(SCRIPT_DIR, "runs"), name="aicte_scenes", exist_ok=True)
+    best = os.path.join(str(model.trainer.save_dir), "weights", "best.pt")
+    print(f"✅ Training finished: {best}")
+    return best
+
+
+def export(weights, out=None, onnx=False):
+    """Check the class names and install `weights` as the merged model."""
+    from ultralytics import YOLO
+    out = out or MERGED_MODEL or os.path.join(MODEL_DIR, "aicte_scenes.pt")
+    model = YOLO(weights)
+    scene_class_ids(model.names)  # raises if Classroom/Library are missing
+
+    os.makedirs(os.path.dirname(os.path.abspath(out)), exist_ok=True)
+    tmp = out + ".tmp"
+    shutil.copy2(weights, tmp)
+    os.replace(tmp, out)  # the model registry reloads it on the next request
+    print(f"📌 Merged model installed at {out}")
+    if onnx:
+        import onnx_backend
+        onnx_backend.export_onnx(out)  # next to the installed weights, for INFERENCE_BACKEND=onnx
+    return out
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train and export the merged AICTE scene model.")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    def train_options(p):
+        p.add_argument("--base", default="yolov8n.pt", help="Starting weights or model yaml")
+        p.add_argument("--epochs", type=int, default=50)
+        p.add_argument("--imgsz", type=int, default=640)
+        p.add_argument("--batch", type=int, default=16)
+        p.add_argument("--device", default="cpu")
+
+    p = sub.add_parser("prepare", help="Build a YOLO dataset from per-class folders")
+    p.add_argument("images_dir")
+    p.add_argument("--out", default=DEFAULT_DATASET)
+    p.add_argument("--val", type=float, default=0.2, help="Share of images held out for validation")
+
+    p = sub.add_parser("train", help="Train on a prepared dataset")
+    p.add_argument("--data", default=os.path.join(DEFAULT_DATASET, "data.yaml"))
+    train_options(p)
+
+    p = sub.add_parser("export", help="Install trained weights as the merged model")
+    p.add_argument("weights")
+    p.add_argument("--out", default=None)
+    p.add_argument("--onnx", action="store_true", help="Also export it for the ONNX backend")
+
+    p = sub.add_parser("all", help="prepare, train and export in one go")
+    p.add_argument("images_dir")
+    p.add_argument("--out", default=DEFAULT_DATASET)
+    p.add_argument("--val", type=float, default=0.2)
+    train_options(p)
+
+    args = parser.parse_args(argv)
+    if args.command == "prepare":
+        prepare(args.images_dir, args.out, args.val)
+    elif args.command == "train":
+        train(args.data, args.base, args.epochs, args.imgsz, args.batch, args.device)
+    elif args.command == "export":
+        export(args.weights, args.out, args.onnx)
+    else:
+        data = prepare(args.images_dir, args.out, args.val)
+        export(train(data, args.base, args.epochs, args.imgsz, args.batch, args.device))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
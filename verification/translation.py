@@ -0,0 +1,310 @@
+import os
+import re
+from contextvars import ContextVar
+from cache import LRUCache, SqliteStore, content_hash
+import metrics
+
+# ==========================================================
+# CACHED, BATCHED TRANSLATION LAYER
+# ==========================================================
+# Text is translated line by line. Lines that are already English never
+# reach the translator, and in mixed lines only the non-Latin spans are
+# translated. Every unique span is looked up in a content-hash cache that
+# lives for the whole process (and optionally on disk), and only the
+# misses are sent to the translator, packed into as few requests as the
+# provider's size limit allows.
+
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "20000"))
+TRANSLATION_CACHE_DB = os.getenv("TRANSLATION_CACHE_DB")  # e.g. "cache/translations.db"
+TARGET_LANGUAGE = "en"
+
+
+class GoogleBackend:
+    """deep-translator's Google endpoint; one request per packed batch."""
+
+    # Google rejects payloads of 5000 characters or more
+    max_chars = 4500
+
+    def __init__(self, source="auto", target=TARGET_LANGUAGE):
+        from deep_translator import GoogleTranslator
+        self._translator = GoogleTranslator(source=source, target=target)
+
+    def translate(self, text):
+        return self._translator.translate(text)
+
+
+# Created on first use, so documents that need no translation never import
+# deep-translator; stays None if it isn't installed
+_backend = None
+_backend_ready = False
+_cache = LRUCache(
+    TRANSLATION_CACHE_SIZE,
+    store=SqliteStore(TRANSLATION_CACHE_DB, table="translations") if TRANSLATION_CACHE_DB else None,
+)
+
+
+# Unicode blocks of the scripts we receive submissions in
+SCRIPT_RANGES = {
+    "Devanagari": [(0x0900, 0x097F), (0xA8E0, 0xA8FF)],
+    "Bengali": [(0x0980, 0x09FF)],
+    "Gurmukhi": [(0x0A00, 0x0A7F)],
+    "Gujarati": [(0x0A80, 0x0AFF)],
+    "Odia": [(0x0B00, 0x0B7F)],
+    "Tamil": [(0x0B80, 0x0BFF)],
+    "Telugu": [(0x0C00, 0x0C7F)],
+    "Kannada": [(0x0C80, 0x0CFF)],
+    "Malayalam": [(0x0D00, 0x0D7F)],
+    "Arabic": [(0x0600, 0x06FF), (0x0750, 0x077F), (0x08A0, 0x08FF), (0xFB50, 0xFDFF), (0xFE70, 0xFEFF)],
+}
+
+_SCRIPT_CLASS = "".join(
+    f"\\u{lo:04x}-\\u{hi:04x}" for ranges in SCRIPT_RANGES.values() for lo, hi in ranges
+)
+# A run of non-Latin script text; digits, spaces and punctuation inside the
+# run stay with it so phrases like "कुल 500 छात्र" are translated whole.
+FOREIGN_SPAN = re.compile(f"[{_SCRIPT_CLASS}](?:[^A-Za-z\\n]*[{_SCRIPT_CLASS}])?")
+
+# Share of accented Latin letters above which a line is treated as non-English
+LATIN_ACCENT_RATIO = 0.15
+
+_stats = ContextVar("translation_stats", default=None)
+
+
+def start_translation_stats():
+    """Begin counting translation work for the current request."""
+    stats = {"blocks_skipped": 0, "blocks_translated": 0, "spans_translated": 0, "cache_hits": 0}
+    _stats.set(stats)
+    return stats
+
+
+def get_translation_stats():
+    stats = _stats.get()
+    return dict(stats) if stats is not None else None
+
+
+def _count(key, amount=1):
+    metrics.TRANSLATION.inc(amount, kind=key)
+    stats = _stats.get()
+    if stats is not None:
+        stats[key] += amount
+
+
+def _call(backend, text):
+    metrics.TRANSLATION.inc(kind="backend_calls")
+    with metrics.stage("translation_backend"):
+        return backend.translate(text)
+
+
+def detect_script(text):
+    """Return the dominant script of `text`: "Latin", a SCRIPT_RANGES name, or None."""
+    counts = {}
+    latin = 0
+    for ch in text:
+        if ch.isascii():
+            latin += ch.isalpha()
+            continue
+        code = ord(ch)
+        for name, ranges in SCRIPT_RANGES.items():
+            if any(lo <= code <= hi for lo, hi in ranges):
+                counts[name] = counts.get(name, 0) + 1
+                break
+        else:
+            latin += ch.isalpha()
+    if counts:
+        name, n = max(counts.items(), key=lambda kv: kv[1])
+        if n >= latin:
+            return name
+    return "Latin" if latin else None
+
+
+def _accented_latin(line):
+    letters = [ch for ch in line if ch.isalpha()]
+    if not letters:
+        return False
+    accented = sum(1 for ch in letters if not ch.isascii())
+    return accented / len(letters) > LATIN_ACCENT_RATIO
+
+
+def foreign_spans(line):
+    """(start, end) spans of `line` that need translating; empty if it is English."""
+    if line.isascii():
+        return []
+    spans = [m.span() for m in FOREIGN_SPAN.finditer(line)]
+    if spans:
+        return spans
+    if _accented_latin(line):
+        return [(0, len(line))]
+    return []
+
+
+def set_translator(backend):
+    """Swap the translator backend (anything with `translate(text)` and `max_chars`)."""
+    global _backend, _backend_ready
+    _backend = backend
+    _backend_ready = True
+
+
+def get_translator():
+    global _backend, _backend_ready
+    if not _backend_ready:
+        try:
+            _backend = GoogleBackend()
+        except Exception:
+            _backend = None
+        _backend_ready = True
+    return _backend
+
+
+def get_cache():
+    return _cache
+
+
+def clean_text(text):
+    """Remove CID artifacts and decode literal unicode escapes."""
+    text = re.sub(r"\(cid:\d+\)", " ", text)
+    if re.search(r"\\u[0-9a-fA-F]{4}", text):
+        try:
+            text = bytes(text, "utf-8").decode("unicode_escape")
+        except Exception:
+            pass
+    return text
+
+
+def _cache_key(line):
+    return content_hash(f"{TARGET_LANGUAGE}:{line}")
+
+
+def _split_long(line, max_chars):
+    """Split a line that alone exceeds the provider limit at whitespace."""
+    if len(line) <= max_chars:
+        return [line]
+    pieces, current = [], ""
+    for word in line.split(" "):
+        while len(word) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.append(word[:max_chars])
+            word = word[max_chars:]
+        candidate = f"{current} {word}" if current else word
+        if len(candidate) > max_chars:
+            pieces.append(current)
+            current = word
+        else:
+            current = candidate
+    if current:
+        pieces.append(current)
+    return pieces
+
+
+def _pack(lines, max_chars):
+    """Group lines into newline-joined batches no longer than `max_chars`."""
+    batch, size = [], 0
+    for line in lines:
+        if batch and size + len(line) + 1 > max_chars:
+            yield batch
+            batch, size = [], 0
+        batch.append(line)
+        size += len(line) + 1
+    if batch:
+        yield batch
+
+
+def _translate_line(backend, line):
+    """Translate one line piece by piece; None if any piece came back empty."""
+    parts = [_call(backend, p) for p in _split_long(line, backend.max_chars)]
+    if not all(parts):
+        return None
+    return " ".join(parts)
+
+
+def _translate_misses(backend, lines):
+    """Translate unique uncached lines, returning {line: translation}.
+
+    Lines the provider returns blank are left out, so they keep their
+    original text and aren't cached.
+    """
+    results = {}
+    short = [l for l in lines if len(l) <= backend.max_chars]
+    failed = [l for l in lines if len(l) > backend.max_chars]
+
+    for batch in _pack(short, backend.max_chars):
+        print(f"🔤 Translating {len(batch)} text block(s) to English...")
+        parts = (_call(backend, "\n".join(batch)) or "").split("\n")
+        if len(parts) == len(batch) and all(part.strip() for part in parts):
+            results.update(zip(batch, parts))
+        else:
+            # The provider merged, split or dropped lines; retry them one by one
+            failed.extend(batch)
+
+    for line in failed:
+        translated = _translate_line(backend, line)
+        if translated:
+            results[line] = translated
+    return results
+
+
+def translate_many(texts):
+    """Translate a list of texts, skipping English lines and batching what is left."""
+    plans = []
+    pending = {}
+    for text in texts:
+        if not text or text.strip() == "":
+            plans.append(None)
+            continue
+        lines = [(line, foreign_spans(line)) for line in clean_text(text).split("\n")]
+        plans.append(lines)
+        block_spans = 0
+        for line, spans in lines:
+            for start, end in spans:
+                span = line[start:end]
+                block_spans += 1
+                if span not in pending:
+                    pending[span] = _cache_key(span)
+        _count("blocks_translated" if block_spans else "blocks_skipped")
+
+    if not pending:
+        return [_join(text, lines, {}) for text, lines in zip(texts, plans)]
+
+    backend = get_translator()
+    if backend is None:
+        print("⚠️ 'deep-translator' not installed — skipping translation.")
+        return list(texts)
+
+    translations = {}
+    misses = []
+    for span, key in pending.items():
+        cached = _cache.get(key)
+        if cached is None:
+            misses.append(span)
+        else:
+            translations[span] = cached
+    _count("cache_hits", len(translations))
+
+    if misses:
+        try:
+            fresh = _translate_misses(backend, misses)
+            _cache.set_many((pending[span], value) for span, value in fresh.items())
+            translations.update(fresh)
+            _count("spans_translated", len(fresh))
+        except Exception as e:
+            print(f"⚠️ Translation failed: {e}")
+
+    return [_join(text, lines, translations) for text, lines in zip(texts, plans)]
+
+
+def _join(text, lines, translations):
+    """Rebuild a text from its lines, substituting translated spans."""
+    if lines is None:
+        return text
+    out = []
+    for line, spans in lines:
+        for start, end in reversed(spans):
+            span = line[start:end]
+            line = line[:start] + translations.get(span, span) + line[end:]
+        out.append(line)
+    return "\n".join(out)
+
+
+def translate_text(text):
+    return translate_many([text])[0]